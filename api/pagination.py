@@ -0,0 +1,71 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+from books.pagination import InvalidCursor, cached_count, paginate
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the active sort column plus ``id``.
+
+    Views choose the sort with ``?ordering=<field>`` or ``?ordering=-<field>``,
+    limited to the view's ``ordering_fields``; otherwise the view's ``ordering``
+    (default ``'id'``) applies. Sort fields must be non-nullable. ``count`` is
+    the cached or estimated total, so deep pages cost the same as the first.
+    """
+    cursor_query_param = 'cursor'
+    ordering_param = 'ordering'
+
+    def get_ordering(self, request, view):
+        default = getattr(view, 'ordering', 'id')
+        allowed = set(getattr(view, 'ordering_fields', ['id'])) | {'id'}
+        requested = request.query_params.get(self.ordering_param, default)
+        return requested if requested.lstrip('-') in allowed else default
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = settings.REST_FRAMEWORK.get('PAGE_SIZE', 10)
+        self.request = request
+        ordering = self.get_ordering(request, view)
+        try:
+            self.page = paginate(queryset, ordering, request.query_params.get(self.cursor_query_param), page_size)
+        except InvalidCursor:
+            raise NotFound('Invalid cursor')
+        self.count = cached_count(queryset)
+        return list(self.page)
+
+    def _link(self, cursor):
+        if not cursor:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.page.next_cursor)
+
+    def get_previous_link(self):
+        return self._link(self.page.previous_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['count', 'results'],
+            'properties': {
+                'count': {'type': 'integer', 'example': 123},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
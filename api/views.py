@@ -2,14 +2,14 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.utils import timezone
-from books.models import Book, BookIssue, Review, Reservation, Category
+from django.db import transaction
+from books import circulation, model_cache
+from books.models import Book, BookIssue, Review, Reservation, Category, OutboxEmail
 from .serializers import (
     BookSerializer, BookIssueSerializer, ReviewSerializer,
     ReservationSerializer, CategorySerializer, UserSerializer
 )
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.conf import settings
 
 User = get_user_model()
@@ -23,11 +23,22 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    ordering_fields = ['id', 'name']
     permission_classes = [IsAdminOrReadOnly]
 
+    def list(self, request, *args, **kwargs):
+        # Serialized pages are reused until a category changes; the host is part
+        # of the key because the pagination links are absolute
+        data = model_cache.get_or_compute(
+            'api:categories', [Category], lambda: super(CategoryViewSet, self).list(request, *args, **kwargs).data,
+            request.get_host(), request.get_full_path(),
+        )
+        return Response(data)
+
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    ordering_fields = ['id', 'title', 'author', 'created_at', 'publication_date']
     permission_classes = [IsAdminOrReadOnly]
     
     @action(detail=True, methods=['post'])
@@ -35,57 +46,55 @@ class BookViewSet(viewsets.ModelViewSet):
         book = self.get_object()
         user = request.user
         
-        if book.available > 0:
-            reservation = Reservation.objects.create(
-                book=book,
-                user=user,
-                status='pending'
-            )
-            book.available -= 1
-            book.save()
-            
-            # Send email notification
-            send_mail(
-                'Book Reservation Confirmation',
-                f'Your reservation for {book.title} has been confirmed.',
-                settings.EMAIL_HOST_USER,
-                [user.email],
-                fail_silently=False,
+        try:
+            with transaction.atomic():
+                hold = circulation.reserve(user, book)
+                if hold.status == 'waiting':
+                    position = circulation.queue_position(hold)
+                    message = f'You are number {position} in line for {book.title}. We will let you know when a copy is ready.'
+                else:
+                    message = f'Your reservation for {book.title} has been confirmed.'
+                
+                # Queue email notification (delivered by drain_outbox)
+                OutboxEmail.enqueue(
+                    'Book Reservation Confirmation',
+                    message,
+                    settings.EMAIL_HOST_USER,
+                    [user.email],
+                )
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'You already have a reservation for this book'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            return Response({'status': 'reservation created'})
-        return Response(
-            {'error': 'Book not available'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        if hold.status == 'waiting':
+            return Response({'status': 'added to hold queue', 'position': position})
+        return Response({'status': 'reservation created'})
 
 class BookIssueViewSet(viewsets.ModelViewSet):
     queryset = BookIssue.objects.all()
     serializer_class = BookIssueSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'issue_date', 'return_date']
     
     @action(detail=True, methods=['post'])
     def return_book(self, request, pk=None):
         book_issue = self.get_object()
-        book_issue.actual_return_date = timezone.now()
-        
-        # Calculate fine if overdue
-        if book_issue.actual_return_date > book_issue.return_date:
-            days_overdue = (book_issue.actual_return_date - book_issue.return_date).days
-            book_issue.fine_amount = days_overdue * 1.0  # $1 per day
-            book_issue.payment_status = 'overdue'
-        
-        book_issue.save()
-        
-        # Update book availability
-        book = book_issue.book
-        book.available += 1
-        book.save()
-        
+        try:
+            # Records the return and fine and puts the copy back
+            circulation.return_issue(book_issue)
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'Book already returned'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response({'status': 'book returned', 'fine_amount': book_issue.fine_amount})
 
 class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'rating', 'created_at']
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -93,21 +102,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'reservation_date']
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         reservation = self.get_object()
-        if reservation.status == 'pending':
-            reservation.status = 'cancelled'
-            reservation.save()
-            
-            # Update book availability
-            book = reservation.book
-            book.available += 1
-            book.save()
-            
-            return Response({'status': 'reservation cancelled'})
-        return Response(
-            {'error': 'Cannot cancel this reservation'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        try:
+            circulation.cancel_reservation(reservation)
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'Cannot cancel this reservation'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'status': 'reservation cancelled'})
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Book, Category, BookIssue, Review, Reservation
+from .models import Book, Category, BookIssue, Review, Reservation, Broadcast
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -26,6 +26,12 @@ class ReviewAdmin(admin.ModelAdmin):
 
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
-    list_display = ['book', 'user', 'reservation_date', 'status']
+    list_display = ['book', 'user', 'reservation_date', 'status', 'position', 'expires_at']
     list_filter = ['status', 'reservation_date']
     search_fields = ['book__title', 'user__username']
+
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display = ['title', 'audience', 'created_at', 'expires_at']
+    list_filter = ['audience', 'created_at']
+    search_fields = ['title', 'message']
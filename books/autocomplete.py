@@ -0,0 +1,220 @@
+"""
+In-memory typeahead index over book titles, authors and ISBNs.
+
+The index is a single sorted list of ``"<normalized text>\\x00<book id>"``
+strings searched with ``bisect``, so a lookup is one binary search plus a
+short forward scan. Titles and authors are indexed from the start of every
+word ("potter" finds "Harry Potter"); ISBNs by their digits.
+
+Each worker builds its index lazily on the first lookup, and the ``Book``
+signals and bulk catalog writes apply incremental updates once their
+transaction commits. Changes made in other processes are picked up by a
+background rebuild once the index is older than ``AUTOCOMPLETE_MAX_AGE``
+seconds. Edits applied while a build is loading are recorded and replayed
+onto the new index before it is swapped in, so none are lost.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import transaction
+
+SEPARATOR = '\x00'
+MIN_WORD_LENGTH = 2
+
+
+def normalize(text):
+    """Lower-case, accent-free, single-spaced form used for keys and queries."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def word_starts(text):
+    """``text`` plus every suffix of it that begins at a later word."""
+    words = text.split(' ')
+    return [' '.join(words[i:]) for i in range(len(words)) if i == 0 or len(words[i]) >= MIN_WORD_LENGTH]
+
+
+class PrefixIndex:
+    """Sorted-array prefix index; safe for concurrent readers and writers."""
+
+    def __init__(self):
+        self._keys = []
+        self._docs = {}  # book id -> (title, author, isbn)
+        self._lock = threading.Lock()
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self._docs)
+
+    @staticmethod
+    def keys_for(book_id, title, author, isbn):
+        suffix = f'{SEPARATOR}{book_id}'
+        texts = set(word_starts(normalize(title)))
+        texts.update(word_starts(normalize(author)))
+        digits = re.sub(r'\D', '', isbn or '')
+        if digits:
+            texts.add(digits)
+        texts.discard('')
+        return [text + suffix for text in texts]
+
+    @classmethod
+    def build(cls, rows):
+        """Build from ``(id, title, author, isbn)`` rows with a single sort."""
+        index = cls()
+        keys = []
+        for book_id, title, author, isbn in rows:
+            index._docs[book_id] = (title, author, isbn)
+            keys.extend(cls.keys_for(book_id, title, author, isbn))
+        keys.sort()
+        index._keys = keys
+        return index
+
+    def add(self, book_id, title, author, isbn):
+        with self._lock:
+            self._remove(book_id)
+            self._docs[book_id] = (title, author, isbn)
+            for key in self.keys_for(book_id, title, author, isbn):
+                insort(self._keys, key)
+
+    def remove(self, book_id):
+        with self._lock:
+            self._remove(book_id)
+
+    def _remove(self, book_id):
+        doc = self._docs.pop(book_id, None)
+        if doc is None:
+            return
+        for key in self.keys_for(book_id, *doc):
+            position = bisect_left(self._keys, key)
+            if position < len(self._keys) and self._keys[position] == key:
+                del self._keys[position]
+
+    def lookup(self, query, limit=8):
+        """Up to ``limit`` books with a title/author word or ISBN starting with ``query``."""
+        prefix = normalize(query)
+        if not prefix:
+            return []
+        keys = self._keys
+        position = bisect_left(keys, prefix)
+        seen = []
+        # Bound the scan so very short prefixes stay cheap
+        for key in keys[position:position + limit * 20]:
+            if not key.startswith(prefix):
+                break
+            book_id = int(key.rsplit(SEPARATOR, 1)[1])
+            if book_id not in seen:
+                seen.append(book_id)
+                if len(seen) >= limit:
+                    break
+        results = []
+        for book_id in seen:
+            doc = self._docs.get(book_id)
+            if doc:
+                results.append({'id': book_id, 'title': doc[0], 'author': doc[1], 'isbn': doc[2]})
+        return results
+
+
+_index = None
+_build_lock = threading.Lock()
+_rebuilding = False
+_pending = None  # While a build loads: [(book id, (title, author, isbn) or None)] to replay
+_pending_lock = threading.Lock()
+
+
+def _load():
+    from .models import Book
+    rows = Book.objects.values_list('id', 'title', 'author', 'isbn').iterator(chunk_size=5000)
+    return PrefixIndex.build(rows)
+
+
+def _apply(index, book_id, doc):
+    if doc is None:
+        index.remove(book_id)
+    else:
+        index.add(book_id, *doc)
+
+
+def _build():
+    """Load a new index, replay the edits made meanwhile and swap it in."""
+    global _index, _pending
+    with _pending_lock:
+        _pending = []
+    index = None
+    try:
+        index = _load()
+    finally:
+        with _pending_lock:
+            if index is not None:
+                for book_id, doc in _pending:
+                    _apply(index, book_id, doc)
+                _index = index
+            _pending = None
+    return index
+
+
+def _rebuild_in_background():
+    global _rebuilding
+    from django.db import connection
+    try:
+        _build()
+    finally:
+        _rebuilding = False
+        connection.close()
+
+
+def get_index():
+    """This worker's index, built on first use and refreshed when stale."""
+    global _rebuilding
+    if _index is None:
+        with _build_lock:
+            if _index is None:
+                return _build()
+        return _index
+    max_age = getattr(settings, 'AUTOCOMPLETE_MAX_AGE', 900)
+    if max_age and not _rebuilding and time.monotonic() - _index.built_at > max_age:
+        with _build_lock:
+            if not _rebuilding:
+                _rebuilding = True
+                threading.Thread(target=_rebuild_in_background, daemon=True).start()
+    return _index
+
+
+def _record(book_id, doc):
+    """Apply one committed edit to the current index and to any build in progress."""
+    with _pending_lock:
+        if _pending is not None:
+            _pending.append((book_id, doc))
+        index = _index
+    if index is not None:
+        _apply(index, book_id, doc)
+
+
+def update_book(book):
+    """Apply a saved book to this worker's index once the transaction commits."""
+    book_id, doc = book.pk, (book.title, book.author, book.isbn)
+    transaction.on_commit(lambda: _record(book_id, doc))
+
+
+def update_books(book_ids):
+    """Like ``update_book`` for books written in bulk (no signals), by id."""
+    from .models import Book
+    book_ids = list(book_ids)
+
+    def apply():
+        if _index is None and _pending is None:
+            return  # Nothing built or building here; the first build reads them
+        rows = Book.objects.filter(id__in=book_ids).values_list('id', 'title', 'author', 'isbn')
+        for book_id, title, author, isbn in rows:
+            _record(book_id, (title, author, isbn))
+
+    if book_ids:
+        transaction.on_commit(apply)
+
+
+def remove_book(book_id):
+    transaction.on_commit(lambda: _record(book_id, None))
@@ -0,0 +1,155 @@
+"""
+Broadcast notifications.
+
+A ``Broadcast`` is stored once and matched to users at read time by its
+audience, instead of inserting a ``Notification`` per user. It is unread for
+a user until they open it (a sparse ``BroadcastRead`` row) or their read
+watermark passes it (books/notification_counts.py). Users only see
+broadcasts sent after they joined.
+
+Each user's unread broadcast count is cached under the current broadcast
+version, which is bumped whenever a broadcast is saved or deleted, so a new
+announcement invalidates every user's count at once. A user's count is also
+dropped when their loans change (they may join or leave the ``borrowers`` and
+``overdue`` audiences), and it is only cached until the next moment it can
+change on its own: a visible broadcast expiring or an open loan falling due.
+"""
+import heapq
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import BookIssue, Broadcast, BroadcastRead
+from .notification_counts import read_watermark, watermark_mode
+
+VERSION_KEY = 'notifications:broadcasts:version'
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, time.time_ns, None)
+
+
+def bump_version():
+    """Invalidate every user's cached broadcast count once the transaction commits."""
+    transaction.on_commit(lambda: cache.set(VERSION_KEY, time.time_ns(), None))
+
+
+def _key(user_id):
+    return f'notifications:broadcasts:{user_id}:{_version()}'
+
+
+def _invalidate(user_id):
+    key = _key(user_id)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def audiences(user, now=None):
+    """The ``Broadcast.audience`` values that include ``user``."""
+    now = now or timezone.now()
+    matched = ['all', 'staff' if user.is_staff else 'members']
+    if not user.is_staff:
+        loans = BookIssue.objects.filter(user=user, actual_return_date__isnull=True).aggregate(
+            on_loan=Count('id', filter=Q(status__in=['approved', 'active'])),
+            overdue=Count('id', filter=Q(return_date__lt=now)),
+        )
+        if loans['on_loan']:
+            matched.append('borrowers')
+        if loans['overdue']:
+            matched.append('overdue')
+    return matched
+
+
+def visible(user, now=None):
+    """Live broadcasts addressed to ``user``, newest first."""
+    now = now or timezone.now()
+    return Broadcast.objects.filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now),
+        audience__in=audiences(user, now),
+        created_at__gte=user.date_joined,
+    ).order_by('-created_at')
+
+
+def _unread(user):
+    broadcasts = visible(user).exclude(reads__user=user)
+    watermark = read_watermark(user.pk)
+    if watermark is not None:
+        broadcasts = broadcasts.filter(created_at__gt=watermark)
+    return broadcasts
+
+
+def loans_changed(user_id):
+    """Drop ``user_id``'s cached count once the loan change commits; their audiences may differ."""
+    _invalidate(user_id)
+
+
+def _cache_timeout(user, now):
+    """Seconds the count stays valid: until a visible broadcast expires or an open loan falls due."""
+    timeout = getattr(settings, 'NOTIFICATION_COUNT_TIMEOUT', 3600)
+    moments = [
+        visible(user, now).aggregate(at=Min('expires_at'))['at'],
+        BookIssue.objects.filter(
+            user=user, actual_return_date__isnull=True, return_date__gt=now,
+        ).aggregate(at=Min('return_date'))['at'],
+    ]
+    for moment in moments:
+        if moment is not None:
+            timeout = min(timeout, (moment - now).total_seconds())
+    return max(1, int(timeout))
+
+
+def unread_count(user):
+    """Unread broadcasts for ``user``."""
+    key = _key(user.pk)
+    count = cache.get(key)
+    if count is None:
+        now = timezone.now()
+        count = _unread(user).count()
+        cache.set(key, count, _cache_timeout(user, now))
+    return count
+
+
+def with_read_state(user, broadcasts):
+    """Set ``unread`` on each of ``broadcasts`` for ``user``, like the notification annotation."""
+    broadcasts = list(broadcasts)
+    read = set(BroadcastRead.objects.filter(
+        user=user, broadcast__in=broadcasts,
+    ).values_list('broadcast_id', flat=True))
+    watermark = read_watermark(user.pk)
+    for broadcast in broadcasts:
+        broadcast.unread = broadcast.pk not in read and (watermark is None or broadcast.created_at > watermark)
+    return broadcasts
+
+
+def merge(user, notifications, limit=None):
+    """
+    ``notifications`` (newest first, annotated with ``unread``) merged with the
+    broadcasts ``user`` can see, newest first, optionally cut to ``limit``.
+    """
+    broadcasts = visible(user)
+    if limit is not None:
+        broadcasts = broadcasts[:limit]
+        notifications = notifications[:limit]
+    merged = heapq.merge(
+        notifications, with_read_state(user, broadcasts),
+        key=lambda item: item.created_at, reverse=True,
+    )
+    return list(merged)[:limit] if limit is not None else list(merged)
+
+
+def mark_read(user, broadcast):
+    BroadcastRead.objects.get_or_create(user=user, broadcast=broadcast)
+    _invalidate(user.pk)
+
+
+def mark_all_read(user):
+    """Mark every visible broadcast read for ``user`` (watermark mode needs no rows)."""
+    if not watermark_mode():
+        BroadcastRead.objects.bulk_create(
+            [BroadcastRead(user=user, broadcast=broadcast) for broadcast in _unread(user)],
+            ignore_conflicts=True,
+        )
+    _invalidate(user.pk)
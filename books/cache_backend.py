@@ -0,0 +1,289 @@
+"""
+Two-tier cache backend for several worker processes on one host.
+
+The shared tier is a SQLite file (``LOCATION``) that every gunicorn worker
+opens, so rate-limit counters, notification counts and cached query results
+are shared without running memcached or Redis. It runs in WAL mode, so
+readers never wait for writers. Entries carry an absolute expiry time.
+``add`` and ``incr`` are single atomic statements or transactions, which
+rate limiting relies on. Once the table passes ``MAX_ENTRIES``, expired rows
+are deleted first and then the ``1/CULL_FREQUENCY`` of rows closest to
+expiry.
+
+The front tier is a bounded in-process LRU (``FRONT_MAX_ENTRIES``) in front
+of the shared tier. It only holds keys starting with one of
+``FRONT_KEY_PREFIXES``, which must be keys whose value never changes once
+written, such as the generation-stamped keys of books/model_cache.py. A
+write makes those keys unreachable by moving the generation on, and the
+generations themselves are always read from the shared tier. So a front hit
+can never be staler than the shared tier, and no cross-process invalidation
+is needed. Every other key goes straight to the shared tier.
+
+    CACHES = {'default': {
+        'BACKEND': 'books.cache_backend.TwoTierCache',
+        'LOCATION': '/var/lib/library/cache.sqlite3',
+        'OPTIONS': {'MAX_ENTRIES': 50000, 'FRONT_MAX_ENTRIES': 2000, 'FRONT_KEY_PREFIXES': ['modelcache:v:']},
+    }}
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache_entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_entries_expires ON cache_entries (expires);
+'''
+
+# Shared-tier size checks are one COUNT(*) per this many writes per process
+CULL_CHECK_EVERY = 100
+
+
+class FrontTier:
+    """Thread-safe LRU of ``key -> (pickled value, expiry)``."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] is not None and entry[1] <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, pickled, expires):
+        if self.max_entries <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (pickled, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TwoTierCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self.path = location
+        self.front_prefixes = tuple(options.get('FRONT_KEY_PREFIXES', ()))
+        self.front = FrontTier(int(options.get('FRONT_MAX_ENTRIES', 1000)))
+        self.busy_timeout = float(options.get('BUSY_TIMEOUT', 5))
+        self._local = threading.local()
+        self._writes = 0
+
+    # Shared tier
+
+    def _connection(self):
+        """This thread's connection; reopened after a fork (gunicorn ``--preload``)."""
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            local.connection = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level=None)
+            local.connection.execute('PRAGMA journal_mode=WAL')
+            local.connection.execute('PRAGMA synchronous=NORMAL')
+            local.connection.executescript(SCHEMA)
+            local.pid = os.getpid()
+        return local.connection
+
+    def _after_write(self, db):
+        self._writes += 1
+        if self._writes % CULL_CHECK_EVERY == 0:
+            self._cull(db)
+
+    def _cull(self, db):
+        now = time.time()
+        db.execute('DELETE FROM cache_entries WHERE expires <= ?', [now])
+        (count,) = db.execute('SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache_entries')
+            return
+        db.execute(
+            'DELETE FROM cache_entries WHERE key IN ('
+            'SELECT key FROM cache_entries ORDER BY expires IS NULL, expires LIMIT ?)',
+            [count // self._cull_frequency],
+        )
+
+    def _fetch(self, keys):
+        """``{key: (pickled, expires)}`` for the live entries among ``keys``."""
+        found = {}
+        keys = list(keys)
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._connection().execute(
+                f'SELECT key, value, expires FROM cache_entries WHERE key IN ({",".join("?" * len(chunk))}) '
+                'AND (expires IS NULL OR expires > ?)',
+                [*chunk, time.time()],
+            )
+            found.update((key, (value, expires)) for key, value, expires in rows)
+        return found
+
+    # Front tier
+
+    def _in_front(self, key):
+        return bool(self.front_prefixes) and key.startswith(self.front_prefixes)
+
+    def _remember(self, raw_key, key, pickled, expires):
+        if self._in_front(raw_key):
+            self.front.set(key, pickled, expires)
+
+    # Cache API
+
+    def get(self, key, default=None, version=None):
+        raw_key, key = key, self.make_and_validate_key(key, version=version)
+        if self._in_front(raw_key):
+            pickled = self.front.get(key)
+            if pickled is not None:
+                return pickle.loads(pickled)
+        entry = self._fetch([key]).get(key)
+        if entry is None:
+            return default
+        self._remember(raw_key, key, *entry)
+        return pickle.loads(entry[0])
+
+    def get_many(self, keys, version=None):
+        keys = {self.make_and_validate_key(raw_key, version=version): raw_key for raw_key in keys}
+        result, missing = {}, []
+        for key, raw_key in keys.items():
+            pickled = self.front.get(key) if self._in_front(raw_key) else None
+            if pickled is None:
+                missing.append(key)
+            else:
+                result[raw_key] = pickle.loads(pickled)
+        for key, entry in self._fetch(missing).items():
+            self._remember(keys[key], key, *entry)
+            result[keys[key]] = pickle.loads(entry[0])
+        return result
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self.get_backend_timeout(timeout)
+        rows = {
+            raw_key: (self.make_and_validate_key(raw_key, version=version), pickle.dumps(value, self.pickle_protocol), expires)
+            for raw_key, value in data.items()
+        }
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires',
+                rows.values(),
+            )
+            self._after_write(db)
+        for raw_key, row in rows.items():
+            if self._in_front(raw_key):
+                self.front.set(*row)
+            else:
+                self.front.discard(row[0])
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        raw_key, key = key, self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        pickled = pickle.dumps(value, self.pickle_protocol)
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            added = db.execute(
+                'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires = excluded.expires '
+                'WHERE cache_entries.expires <= ?',
+                [key, pickled, expires, time.time()],
+            ).rowcount
+            self._after_write(db)
+        if added:
+            self._remember(raw_key, key, pickled, expires)
+        return bool(added)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        expires = self.get_backend_timeout(timeout)
+        self.front.discard(key)
+        touched = self._connection().execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            [expires, key, time.time()],
+        ).rowcount
+        return bool(touched)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        db = self._connection()
+        with db:
+            db.execute('BEGIN IMMEDIATE')  # Serializes concurrent increments across processes
+            row = db.execute(
+                'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                [key, time.time()],
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?', [pickle.dumps(value, self.pickle_protocol), key],
+            )
+        self.front.discard(key)
+        return value
+
+    def has_key(self, key, version=None):
+        raw_key, key = key, self.make_and_validate_key(key, version=version)
+        if self._in_front(raw_key) and self.front.get(key) is not None:
+            return True
+        return bool(self._fetch([key]))
+
+    def delete(self, key, version=None):
+        return bool(self._delete_keys([self.make_and_validate_key(key, version=version)]))
+
+    def delete_many(self, keys, version=None):
+        self._delete_keys([self.make_and_validate_key(key, version=version) for key in keys])
+
+    def _delete_keys(self, keys):
+        for key in keys:
+            self.front.discard(key)
+        deleted = 0
+        db = self._connection()
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            deleted += db.execute(
+                f'DELETE FROM cache_entries WHERE key IN ({",".join("?" * len(chunk))})', chunk,
+            ).rowcount
+        return deleted
+
+    def clear(self):
+        """Empty the shared tier and this process's front tier."""
+        self.front.clear()
+        self._connection().execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Django closes caches after every request; the connections are kept per thread instead
+        pass
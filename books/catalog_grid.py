@@ -0,0 +1,103 @@
+"""
+Cached catalog grid for ``book_list_view``.
+
+The grid (book cards, pagination links and the total) depends only on the
+filters, never on who is looking. It is rendered once per normalized filter
+set and catalog version and then reused for every user (books/model_cache.py).
+The per-user chrome around it, such as the header and notification badge,
+is rendered by ``base.html`` on each request, so a cached browse page runs
+no ``Book`` query.
+
+Requests that spell the same filters differently share one entry, for
+example ``q`` vs ``search``, ``newest`` vs ``-created_at``, or extra
+parameters. The grid's pagination links are built from the normalized
+filters, so the cached links are right for all of them.
+"""
+from django.core.paginator import Paginator
+from django.template.loader import render_to_string
+from django.utils.http import urlencode
+
+from . import model_cache, search
+from .models import Book, Category
+from .pagination import InvalidCursor, cached_count, paginate
+
+# Sort options of the catalog page -> keyset ordering column
+ORDERINGS = {
+    'title': 'title', '-title': '-title',
+    'author': 'author', '-author': '-author',
+    'created_at': 'created_at', '-created_at': '-created_at',
+    'newest': '-created_at', 'oldest': 'created_at',
+    'relevance': 'title',
+}
+
+PER_PAGE = 12
+
+
+def normalize_filters(params):
+    """
+    The values of query dict ``params`` that the grid depends on:
+    ``search``, ``category``, ``availability``, ``sort`` (the ordering
+    actually applied, or ``'relevance'``) and either ``page`` or ``cursor``.
+    """
+    search_query = ' '.join((params.get('search', '') or params.get('q', '')).split()).casefold()
+    category = params.get('category', '')
+    availability = params.get('availability', '')
+    sort_by = params.get('sort') or ('relevance' if search_query else 'title')
+    if sort_by == 'relevance' and search_query and search.backend():
+        sort = 'relevance'
+    else:
+        sort = ORDERINGS.get(sort_by, 'id')
+    filters = {
+        'search': search_query,
+        'category': category if category.isdigit() else '',
+        'availability': availability if availability in ('available', 'unavailable') else '',
+        'sort': sort,
+    }
+    # Keyset cursor by default; numbered pages for ?page= and relevance sort
+    if sort == 'relevance' or 'page' in params:
+        page = params.get('page', '')
+        filters['page'] = int(page) if page.isdigit() and int(page) > 0 else 1
+    else:
+        filters['cursor'] = params.get('cursor', '')
+    return filters
+
+
+def base_query(filters):
+    """Query string of ``filters`` without the page, for pagination links."""
+    return urlencode([
+        (name, filters[name]) for name in ('search', 'category', 'availability', 'sort') if filters[name]
+    ])
+
+
+def build(filters):
+    """``{'html', 'total'}`` for one grid page; runs the catalog queries."""
+    books = Book.objects.select_related('category')
+    if filters['search']:
+        books = search.search_books(books, filters['search'])
+    if filters['category']:
+        books = books.filter(category_id=filters['category'])
+    if filters['availability'] == 'available':
+        books = books.filter(available__gt=0)
+    elif filters['availability'] == 'unavailable':
+        books = books.filter(available=0)
+
+    ordering = filters['sort']
+    if ordering == 'relevance':
+        books = books.order_by('-search_rank', 'id')
+        page_obj = Paginator(books, PER_PAGE).get_page(filters['page'])
+    elif 'page' in filters:
+        books = books.order_by(*([ordering, 'id'] if ordering != 'id' else ['id']))
+        page_obj = Paginator(books, PER_PAGE).get_page(filters['page'])
+    else:
+        try:
+            page_obj = paginate(books, ordering, filters['cursor'] or None, PER_PAGE)
+        except InvalidCursor:
+            page_obj = paginate(books, ordering, None, PER_PAGE)
+
+    html = render_to_string('partials/book_grid.html', {'books': page_obj, 'base_query': base_query(filters)})
+    return {'html': html, 'total': cached_count(books)}
+
+
+def grid(filters):
+    """``build(filters)``, cached until a book or category changes."""
+    return model_cache.get_or_compute('catalog_grid', [Book, Category], lambda: build(filters), sorted(filters.items()))
@@ -0,0 +1,291 @@
+"""
+Bulk catalog import used by the ``import_catalog`` management command.
+
+Records are streamed from a CSV (header row required) or JSON Lines file and
+written in batches with one ``INSERT ... ON CONFLICT (isbn) DO UPDATE`` per
+batch, so memory stays flat and the cost per row is a fraction of a
+``save()``. ISBNs are normalized to ISBN-13 digits before matching, and
+category names are resolved through an in-memory map that creates missing
+categories the first time they are seen.
+
+Each batch commits on its own and reports the byte offset just past its last
+record; passing that offset back resumes an interrupted import without
+redoing committed work. Existing books only get the descriptive fields the
+record has a value for refreshed; ``quantity`` and ``available`` are
+circulation state and are set only for new books.
+"""
+import csv
+import json
+import os
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from . import autocomplete, model_cache, search
+from .models import Book, Category, DataVersion
+
+FORMATS = ('csv', 'jsonl')
+
+# Columns refreshed when the ISBN already exists; the optional ones only if the record has a value
+UPDATE_FIELDS = ['title', 'author', 'updated_at']
+OPTIONAL_FIELDS = ['category', 'price', 'publication_date', 'description']
+
+MAX_REPORTED_ERRORS = 20
+
+
+class RowError(ValueError):
+    pass
+
+
+def _isbn13_check_digit(digits):
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(digits[:12]))
+    return str((10 - total % 10) % 10)
+
+
+def normalize_isbn(value):
+    """
+    ``value`` as 13 ISBN digits, converting ISBN-10 to its 978 form; hyphens
+    and spaces are ignored. Raises ``RowError`` if it is not a valid ISBN.
+    """
+    raw = str(value or '').replace('-', '').replace(' ', '').upper()
+    if len(raw) == 10 and raw[:9].isdigit() and (raw[9].isdigit() or raw[9] == 'X'):
+        check = sum((10 - i) * int(d) for i, d in enumerate(raw[:9])) + (10 if raw[9] == 'X' else int(raw[9]))
+        if check % 11:
+            raise RowError(f'bad ISBN-10 check digit: {value}')
+        digits = '978' + raw[:9]
+        return digits + _isbn13_check_digit(digits)
+    if len(raw) == 13 and raw.isdigit():
+        if raw[12] != _isbn13_check_digit(raw):
+            raise RowError(f'bad ISBN-13 check digit: {value}')
+        return raw
+    raise RowError(f'not an ISBN: {value!r}')
+
+
+def parse_date(value):
+    """``YYYY``, ``YYYY-MM`` or ``YYYY-MM-DD`` as a ``date``."""
+    text = str(value or '').strip()
+    try:
+        parts = [int(part) for part in text.split('-')]
+        return date(*(parts + [1, 1])[:3])
+    except (TypeError, ValueError):
+        raise RowError(f'bad publication_date: {value!r}')
+
+
+def _decimal(value):
+    try:
+        return Decimal(str(value).strip() or '0')
+    except InvalidOperation:
+        raise RowError(f'bad price: {value!r}')
+
+
+def _quantity(value):
+    try:
+        quantity = int(value) if str(value).strip() else 1
+    except ValueError:
+        raise RowError(f'bad quantity: {value!r}')
+    if quantity < 0:
+        raise RowError(f'bad quantity: {value!r}')
+    return quantity
+
+
+class _Lines:
+    """Decoded lines of a binary stream, tracking the byte offset after the last one read."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.offset = stream.tell()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        line = self.stream.readline()
+        if not line:
+            raise StopIteration
+        self.offset = self.stream.tell()
+        return line.decode('utf-8')
+
+
+def read_csv(stream, offset=0):
+    """Yield ``(record, end_offset)`` for each CSV row at or after byte ``offset``."""
+    header_line = stream.readline().decode('utf-8-sig')
+    header = [name.strip().lower() for name in next(csv.reader([header_line]))]
+    stream.seek(max(offset, stream.tell()))
+    lines = _Lines(stream)
+    for row in csv.reader(lines):
+        if row:
+            yield dict(zip(header, row)), lines.offset
+
+
+def read_jsonl(stream, offset=0):
+    """Yield ``(record, end_offset)`` for each JSON object line at or after byte ``offset``."""
+    stream.seek(offset)
+    lines = _Lines(stream)
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            record = RowError(f'bad JSON: {exc}')
+        yield record, lines.offset
+
+
+def detect_format(path):
+    return 'jsonl' if os.path.splitext(path)[1].lower() in ('.jsonl', '.ndjson', '.json') else 'csv'
+
+
+class CategoryMap:
+    """Category ids by case-insensitive name, creating missing categories on first use."""
+
+    def __init__(self):
+        self.ids = {}
+        for category_id, name in Category.objects.order_by('-id').values_list('id', 'name'):
+            self.ids[name.strip().casefold()] = category_id  # Lowest id wins for duplicate names
+        self.created = 0
+
+    def get(self, name):
+        name = (name or '').strip()[:100]
+        if not name:
+            return None
+        key = name.casefold()
+        if key not in self.ids:
+            self.ids[key] = Category.objects.create(name=name).pk
+            self.created += 1
+        return self.ids[key]
+
+
+def build_book(record, categories):
+    """Unsaved ``Book`` for one input record; raises ``RowError`` for unusable rows."""
+    if isinstance(record, RowError):
+        raise record
+    if not isinstance(record, dict):
+        raise RowError('record is not an object')
+    title = str(record.get('title') or '').strip()
+    author = str(record.get('author') or '').strip()
+    if not title or not author:
+        raise RowError('title and author are required')
+    book = Book(
+        title=title[:200],
+        author=author[:200],
+        isbn=normalize_isbn(record.get('isbn')),
+        quantity=_quantity(record.get('quantity', '')),
+        price=_decimal(record.get('price', '')),
+        publication_date=parse_date(record.get('publication_date')),
+        description=str(record.get('description') or ''),
+    )
+    book.available = book.quantity
+    book.category_id = categories.get(record.get('category'))  # Last, so rejected rows create nothing
+    book.import_fields = tuple(UPDATE_FIELDS + [
+        field for field in OPTIONAL_FIELDS if str(record.get(field) or '').strip()
+    ])
+    return book
+
+
+def upsert(books):
+    """
+    Insert or refresh ``books`` (unique ISBNs), one statement per set of
+    supplied fields (normally one per batch); returns ``(created, updated)``.
+    """
+    isbns = [book.isbn for book in books]
+    existing = set(Book.objects.filter(isbn__in=isbns).values_list('isbn', flat=True))
+    groups = {}
+    for book in books:
+        groups.setdefault(book.import_fields, []).append(book)
+    with transaction.atomic():
+        for fields, group in groups.items():
+            Book.objects.bulk_create(group, update_conflicts=True, unique_fields=['isbn'], update_fields=list(fields))
+        # bulk_create sends no post_save, so refresh the search and typeahead indexes here
+        book_ids = list(Book.objects.filter(isbn__in=isbns).values_list('id', flat=True))
+        search.index_books(book_ids)
+        autocomplete.update_books(book_ids)
+    return len(books) - len(existing), len(existing)
+
+
+def import_catalog(path, fmt=None, offset=0, batch_size=2000, progress=None):
+    """
+    Import ``path`` starting at byte ``offset``. ``progress(stats)`` is called
+    after every committed batch; ``stats['offset']`` is then the resume point.
+    Returns the final stats.
+    """
+    fmt = fmt or detect_format(path)
+    reader = read_jsonl if fmt == 'jsonl' else read_csv
+    categories = CategoryMap()
+    stats = {
+        'rows': 0, 'created': 0, 'updated': 0, 'skipped': 0, 'categories': 0,
+        'offset': offset, 'elapsed': 0.0, 'errors': [],
+    }
+    started = time.monotonic()
+    batch = {}
+    batch_end = offset
+
+    def flush():
+        created, updated = upsert(list(batch.values()))
+        stats['created'] += created
+        stats['updated'] += updated
+        stats['offset'] = batch_end
+        stats['categories'] = categories.created
+        stats['elapsed'] = time.monotonic() - started
+        batch.clear()
+        if progress:
+            progress(stats)
+
+    with open(path, 'rb') as stream:
+        for record, end in reader(stream, offset):
+            stats['rows'] += 1
+            batch_end = end
+            try:
+                book = build_book(record, categories)
+            except RowError as exc:
+                stats['skipped'] += 1
+                if len(stats['errors']) < MAX_REPORTED_ERRORS:
+                    stats['errors'].append((end, str(exc)))
+                continue
+            batch[book.isbn] = book  # A repeated ISBN in one batch keeps its last record
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+    stats['offset'] = batch_end
+    stats['elapsed'] = time.monotonic() - started
+    if stats['created'] or stats['updated']:
+        DataVersion.bump(Book._meta.label_lower)
+        model_cache.bump(Book)
+    if categories.created:
+        DataVersion.bump(Category._meta.label_lower)
+        model_cache.bump(Category)
+    return stats
+
+
+def normalize_existing_isbns():
+    """
+    Rewrite stored ISBNs into the normalized form used for matching.
+    Returns ``(changed, unparseable, conflicts)``; a book whose normalized
+    ISBN is already taken is left alone and counted as a conflict.
+    """
+    rows = list(Book.objects.values_list('id', 'isbn'))
+    taken = {isbn for _, isbn in rows}
+    changed, unparseable, conflicts = [], 0, 0
+    for book_id, isbn in rows:
+        try:
+            normalized = normalize_isbn(isbn)
+        except RowError:
+            unparseable += 1
+            continue
+        if normalized == isbn:
+            continue
+        if normalized in taken:
+            conflicts += 1
+            continue
+        taken.add(normalized)
+        changed.append(Book(pk=book_id, isbn=normalized))
+    with transaction.atomic():
+        Book.objects.bulk_update(changed, ['isbn'], batch_size=1000)
+        search.index_books([book.pk for book in changed])
+        autocomplete.update_books([book.pk for book in changed])
+    if changed:
+        DataVersion.bump(Book._meta.label_lower)
+        model_cache.bump(Book)
+    return len(changed), unparseable, conflicts
@@ -0,0 +1,262 @@
+"""
+Circulation: checking books out and in, and the hold queue.
+
+Every change to ``Book.available`` is a single conditional ``UPDATE``
+(``available = available - 1 WHERE available > 0``) run by the database, so
+concurrent checkouts of the same title can neither lose an update nor hand
+out more copies than exist. Loan and reservation state changes are guarded
+the same way (``WHERE actual_return_date IS NULL``, ``WHERE status =
+'pending'``), so a double-submitted return or cancel is a no-op instead of
+putting a copy back twice.
+
+Holds (``Reservation``) queue per book in FIFO order of ``position``; the
+``(book, status, position)`` index makes joining the queue and taking its
+head single index seeks however long the queue is. A hold is ``pending``
+(ready) while a copy is set aside for the patron. Whenever a copy comes
+back (return, cancelled or expired hold) ``promote`` hands it to the head of
+the queue in the same transaction and notifies them. Unclaimed holds lapse
+after ``HOLD_PICKUP_DAYS`` (``expire_holds``).
+
+``update()`` skips model signals, so the ``DataVersion`` counters that cached
+reports depend on, and the query cache generations (books/model_cache.py),
+are bumped here once the transaction commits.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from . import broadcasts, model_cache
+from .models import Book, BookIssue, DataVersion, Notification, OutboxEmail, Reservation
+from .reminders import FINE_PER_DAY
+
+# Loan statuses that hold a copy of the book
+ON_LOAN = ('active', 'approved')
+
+# Hold statuses that are still open
+OPEN_HOLDS = ('waiting', 'pending')
+
+
+class CirculationError(Exception):
+    pass
+
+
+class NotAvailable(CirculationError):
+    """No copy of the book is left."""
+
+
+class InvalidState(CirculationError):
+    """The loan or reservation was already moved on (approved, returned, cancelled)."""
+
+
+def _changed(*models):
+    names = [model._meta.label_lower for model in models]
+    transaction.on_commit(lambda: [DataVersion.bump(name) for name in names])
+    model_cache.bump(*models)
+
+
+def take_copy(book_id):
+    """Take one copy of ``book_id`` off the shelf; ``False`` if none is left."""
+    taken = Book.objects.filter(pk=book_id, available__gt=0).update(available=F('available') - 1)
+    if taken:
+        _changed(Book)
+    return bool(taken)
+
+
+def put_back_copy(book_id):
+    """Put one copy of ``book_id`` back, never above its ``quantity``."""
+    returned = Book.objects.filter(pk=book_id, available__lt=F('quantity')).update(available=F('available') + 1)
+    if returned:
+        _changed(Book)
+    return bool(returned)
+
+
+def checkout(user, book, return_date, status='active'):
+    """
+    Create a loan of ``book`` for ``user``. An ``active`` loan takes a copy
+    and raises ``NotAvailable`` if there is none; a ``requested`` loan waits
+    for ``approve``.
+    """
+    with transaction.atomic():
+        if status in ON_LOAN and not _take_held_or_free_copy(user.pk, book.pk):
+            raise NotAvailable(book.title)
+        return BookIssue.objects.create(book=book, user=user, return_date=return_date, status=status)
+
+
+def approve(issue):
+    """Activate a requested (or previously rejected) loan, taking a copy."""
+    with transaction.atomic():
+        if not BookIssue.objects.filter(pk=issue.pk, status__in=['requested', 'rejected']).update(status='active'):
+            raise InvalidState(issue.pk)
+        if not _take_held_or_free_copy(issue.user_id, issue.book_id):
+            raise NotAvailable(issue.book.title)  # Rolls the status change back
+        _changed(BookIssue)
+        broadcasts.loans_changed(issue.user_id)  # update() sends no signals
+    issue.status = 'active'
+    return issue
+
+
+def return_issue(issue, when=None):
+    """
+    Close ``issue``: record the return, persist the fine and put the copy
+    back if the loan held one. Raises ``InvalidState`` if it was already
+    returned.
+    """
+    when = when or timezone.now()
+    values = {'actual_return_date': when, 'status': 'returned'}
+    overdue_days = (when - issue.return_date).days if issue.return_date and when > issue.return_date else 0
+    if overdue_days > 0:
+        values.update(fine_amount=overdue_days * FINE_PER_DAY, payment_status='overdue')
+    open_loan = BookIssue.objects.filter(pk=issue.pk, actual_return_date__isnull=True)
+    with transaction.atomic():
+        if open_loan.filter(status__in=ON_LOAN).update(**values):
+            release_copy(issue.book_id, when)
+        elif not open_loan.update(**values):
+            raise InvalidState(issue.pk)
+        _changed(BookIssue)
+        broadcasts.loans_changed(issue.user_id)
+    for field, value in values.items():
+        setattr(issue, field, value)
+    return issue
+
+
+def release_copy(book_id, now=None):
+    """Put a copy of ``book_id`` back and hand it to the head of its hold queue, if any."""
+    put_back_copy(book_id)
+    return promote(book_id, now)
+
+
+# Hold queue ------------------------------------------------------------------
+
+def pickup_window():
+    return timedelta(days=getattr(settings, 'HOLD_PICKUP_DAYS', 3))
+
+
+def queue(book_id):
+    """Waiting holds on ``book_id``, head of the queue first."""
+    return Reservation.objects.filter(book_id=book_id, status='waiting').order_by('position')
+
+
+def open_hold(user, book_id):
+    """``user``'s waiting or ready hold on ``book_id``, or ``None``."""
+    return Reservation.objects.filter(user=user, book_id=book_id, status__in=OPEN_HOLDS).first()
+
+
+def queue_position(hold):
+    """1-based place of a waiting ``hold`` in its queue."""
+    return queue(hold.book_id).filter(position__lt=hold.position).count() + 1
+
+
+def _enqueue(user, book, attempts=3):
+    # Concurrent joins can pick the same tail; the unique (book, position) constraint makes one retry
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                tail = Reservation.objects.filter(book=book).aggregate(tail=Max('position'))['tail'] or 0
+                return Reservation.objects.create(book=book, user=user, status='waiting', position=tail + 1)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+
+
+def _take_held_or_free_copy(user_id, book_id):
+    """Turn ``user_id``'s ready hold on ``book_id`` into the loan's copy, else take a free one."""
+    # A user has at most one ready hold per book (``reserve`` refuses a second)
+    if Reservation.objects.filter(user_id=user_id, book_id=book_id, status='pending').update(status='fulfilled'):
+        return True
+    return take_copy(book_id)
+
+
+def _notify_ready(hold):
+    expires = timezone.localtime(hold.expires_at).strftime('%B %d, %Y')
+    Notification.create_notification(
+        user=hold.user,
+        notification_type='hold_ready',
+        title=f'Hold Ready: {hold.book.title}',
+        message=f'A copy of "{hold.book.title}" is set aside for you until {expires}.',
+        link=f'/books/{hold.book_id}/',
+    )
+    OutboxEmail.enqueue(
+        f'Your hold is ready: {hold.book.title}',
+        f'Hello {hold.user.username},\n\nA copy of "{hold.book.title}" is now set aside for you.\n\n'
+        f'Please collect it by {expires}, after which it goes to the next person in line.\n\n'
+        'Thank you,\nLibrary Management',
+        settings.EMAIL_HOST_USER,
+        [hold.user.email],
+    )
+
+
+def promote(book_id, now=None):
+    """
+    Give free copies of ``book_id`` to the head of its queue, one hold at a
+    time; each promotion claims the hold and a copy atomically and notifies
+    the patron. Returns the promoted holds.
+    """
+    now = now or timezone.now()
+    expires_at = now + pickup_window()
+    promoted = []
+    while True:
+        head = queue(book_id).select_related('book', 'user').first()
+        if head is None:
+            return promoted
+        with transaction.atomic():
+            claimed = Reservation.objects.filter(pk=head.pk, status='waiting').update(
+                status='pending', ready_at=now, expires_at=expires_at,
+            )
+            if claimed and not take_copy(book_id):
+                transaction.set_rollback(True)  # No copy left for the head of the queue
+                return promoted
+            if claimed:
+                head.status, head.ready_at, head.expires_at = 'pending', now, expires_at
+                _notify_ready(head)
+                promoted.append(head)
+
+
+def reserve(user, book, now=None):
+    """
+    Place a hold on ``book``. It is ready at once when a copy is free and
+    nobody is waiting, otherwise it joins the end of the queue. Raises
+    ``InvalidState`` if ``user`` already has an open hold on the book.
+    """
+    now = now or timezone.now()
+    if open_hold(user, book.pk):
+        raise InvalidState(book.pk)
+    with transaction.atomic():
+        if not queue(book.pk).exists() and take_copy(book.pk):
+            return Reservation.objects.create(
+                book=book, user=user, status='pending', ready_at=now, expires_at=now + pickup_window(),
+            )
+        return _enqueue(user, book)
+
+
+def cancel_reservation(reservation):
+    """Cancel an open hold; a ready hold's copy goes to the next in line."""
+    with transaction.atomic():
+        if Reservation.objects.filter(pk=reservation.pk, status='pending').update(status='cancelled'):
+            release_copy(reservation.book_id)
+        elif not Reservation.objects.filter(pk=reservation.pk, status='waiting').update(status='cancelled'):
+            raise InvalidState(reservation.pk)
+    reservation.status = 'cancelled'
+    return reservation
+
+
+def expire_holds(now=None, batch_size=500):
+    """Lapse ready holds not collected in time and pass their copies on; returns the number expired."""
+    now = now or timezone.now()
+    expired = 0
+    after_id = 0
+    while True:
+        batch = list(
+            Reservation.objects.filter(status='pending', expires_at__lt=now, id__gt=after_id)
+            .order_by('id').values_list('id', 'book_id')[:batch_size]
+        )
+        if not batch:
+            return expired
+        for hold_id, book_id in batch:
+            with transaction.atomic():
+                if Reservation.objects.filter(pk=hold_id, status='pending').update(status='expired'):
+                    release_copy(book_id, now)
+                    expired += 1
+        after_id = batch[-1][0]
@@ -1,16 +1,28 @@
 """
 Context processors for adding global template variables
 """
+from django.utils.functional import SimpleLazyObject
+
+from . import broadcasts
+from .notification_counts import unread_count, with_read_state
+
 
 def notifications_context(request):
     """
-    Add unread notifications count to all templates
+    Add the unread notifications count and the latest notifications (broadcasts
+    included) to all templates. Evaluated lazily, so pages that never show them never look them up.
     """
     if request.user.is_authenticated:
-        unread_count = request.user.notifications.filter(is_read=False).count()
+        user = request.user
         return {
-            'unread_notifications_count': unread_count
+            'unread_notifications_count': SimpleLazyObject(
+                lambda: unread_count(user.pk) + broadcasts.unread_count(user)
+            ),
+            'recent_notifications': SimpleLazyObject(
+                lambda: broadcasts.merge(user, with_read_state(user.notifications.all(), user.pk), limit=5)
+            ),
         }
     return {
-        'unread_notifications_count': 0
+        'unread_notifications_count': 0,
+        'recent_notifications': [],
     }
@@ -0,0 +1,145 @@
+"""
+Pre-sized book cover variants.
+
+Uploading a cover only stores the original and marks the book ``pending``.
+The ``build_cover_variants`` command renders a small and a medium variant as
+WebP plus a JPEG fallback (books/images.py) in a process pool and records
+their names in ``Book.cover_variants``. Templates serve them through
+``srcset`` (``partials/book_cover.html``) and fall back to the original until
+variants built from the current cover exist.
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from . import images, model_cache
+from .models import Book
+
+# Bounding boxes in pixels; medium is the 2x version of the grid tile
+SIZES = {
+    'thumb': (240, 300),
+    'medium': (480, 600),
+}
+
+VARIANT_DIR = 'book_covers/variants'
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def build(task):
+    """
+    Render and store the variants of one cover; runs in a worker process and
+    touches only storage. ``task`` is ``(book_id, cover_name)``; returns
+    ``(book_id, cover_name, variants or None, error or None)``.
+    """
+    book_id, source = task
+    try:
+        with default_storage.open(source, 'rb') as fileobj:
+            rendered = images.render_variants(fileobj, SIZES)
+        stem = os.path.splitext(os.path.basename(source))[0]
+        variants = {'source': source, 'sizes': {}}
+        for size, result in rendered.items():
+            entry = {'width': result['width'], 'height': result['height']}
+            for fmt, extension in EXTENSIONS.items():
+                entry[fmt] = default_storage.save(
+                    f'{VARIANT_DIR}/{stem}-{size}.{extension}', ContentFile(result[fmt]),
+                )
+            variants['sizes'][size] = entry
+        return book_id, source, variants, None
+    except Exception as exc:
+        return book_id, source, None, f'{type(exc).__name__}: {exc}'
+
+
+def files(variants):
+    """Storage names of every file listed in a ``cover_variants`` value."""
+    return [
+        entry[fmt]
+        for entry in (variants or {}).get('sizes', {}).values()
+        for fmt in EXTENSIONS if fmt in entry
+    ]
+
+
+def delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def sources(book):
+    """
+    ``{'webp': srcset, 'jpeg': srcset, 'src': url}`` for ``book``'s cover
+    variants, or ``None`` if none have been built from its current cover.
+    """
+    variants = book.cover_variants or {}
+    if not book.cover_image or variants.get('source') != book.cover_image.name or not variants.get('sizes'):
+        return None
+    ordered = sorted(variants['sizes'].values(), key=lambda entry: entry['width'])
+    result = {
+        fmt: ', '.join(f"{default_storage.url(entry[fmt])} {entry['width']}w" for entry in ordered)
+        for fmt in EXTENSIONS
+    }
+    result['src'] = default_storage.url(ordered[0]['jpeg'])
+    return result
+
+
+def pending():
+    """Books with a cover whose variants still have to be built."""
+    return Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True).filter(cover_state='pending')
+
+
+def with_covers():
+    return Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True)
+
+
+def record(book_id, source, variants, error, previous=None):
+    """
+    Store a ``build`` result unless the book's cover changed meanwhile, and
+    delete the files that are no longer referenced. Returns ``True`` if built.
+    """
+    current = Book.objects.filter(pk=book_id, cover_image=source)
+    if error:
+        current.update(cover_state='failed')
+        return False
+    if current.update(cover_variants=variants, cover_state='ready'):
+        model_cache.bump(Book)
+        delete_files(set(files(previous)) - set(files(variants)))
+        return True
+    delete_files(files(variants))  # Superseded by a newer upload, which is pending again
+    return False
+
+
+def process(books, processes=None, batch_size=100, progress=None):
+    """
+    Build variants for the books in queryset ``books`` with a pool of
+    ``processes`` workers, ``batch_size`` books at a time in id order.
+    ``progress(book_id, source, error)`` is called per book. Returns
+    ``(built, failed)``.
+    """
+    built = failed = 0
+    after_id = 0
+    with ProcessPoolExecutor(processes, initializer=_init_worker) as pool:
+        while True:
+            batch = list(
+                books.filter(pk__gt=after_id).order_by('pk')
+                .values_list('pk', 'cover_image', 'cover_variants')[:batch_size]
+            )
+            if not batch:
+                return built, failed
+            after_id = batch[-1][0]
+            previous = {book_id: variants for book_id, _, variants in batch}
+            for book_id, source, variants, error in pool.map(build, [(book_id, name) for book_id, name, _ in batch]):
+                if record(book_id, source, variants, error, previous[book_id]):
+                    built += 1
+                elif error:
+                    failed += 1
+                if progress:
+                    progress(book_id, source, error)
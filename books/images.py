@@ -0,0 +1,64 @@
+"""
+Pillow helpers for pre-sized image variants.
+
+``render_variants`` decodes an uploaded image once, applies its EXIF
+orientation and re-encodes a downscaled copy per size as WebP and JPEG.
+Re-encoding writes no metadata, so EXIF (camera, GPS) never reaches the
+variants. Nothing here touches the database, so it is safe to run in worker
+processes.
+"""
+import io
+
+from PIL import Image, ImageOps
+
+FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def open_image(fileobj):
+    """Decode ``fileobj`` as an upright RGB image (transparency flattened onto white)."""
+    with Image.open(fileobj) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+            image = image.convert('RGBA')
+            flattened = Image.new('RGB', image.size, 'white')
+            flattened.paste(image, mask=image.getchannel('A'))
+            return flattened
+        return image.convert('RGB')
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, **FORMATS[fmt])
+    return buffer.getvalue()
+
+
+def fit(image, box, crop=False):
+    """
+    ``image`` scaled down into ``box``. With ``crop`` it is centre-cropped to
+    the box's aspect ratio first (e.g. square avatars). Never upscales.
+    """
+    if not crop:
+        image = image.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        return image
+    scale = min(1, image.width / box[0], image.height / box[1])
+    return ImageOps.fit(image, (max(1, round(box[0] * scale)), max(1, round(box[1] * scale))), Image.LANCZOS)
+
+
+def render_variants(fileobj, sizes, formats=tuple(FORMATS), crop=False):
+    """
+    ``{name: {'width', 'height', <format>: bytes, ...}}`` for each
+    ``name -> (max_width, max_height)`` in ``sizes``. Images keep their
+    aspect ratio unless ``crop`` is set, and are never upscaled.
+    """
+    source = open_image(fileobj)
+    rendered = {}
+    for name, box in sizes.items():
+        image = fit(source, box, crop)
+        rendered[name] = {'width': image.width, 'height': image.height}
+        for fmt in formats:
+            rendered[name][fmt] = encode(image, fmt)
+    return rendered
@@ -0,0 +1,196 @@
+"""
+Pooled SMTP delivery.
+
+``PooledEmailBackend`` keeps a process-wide pool of persistent connections to
+the mail server and fans batches out over a bounded thread pool. Each message
+is retried with exponential backoff on transient failures (dropped
+connections, 4xx replies). Permanent failures (5xx replies, refused
+recipients) are not retried.
+
+Enable it with ``EMAIL_BACKEND = 'books.mail.PooledEmailBackend'``; the
+connections it pools are created from ``EMAIL_POOL_BACKEND``.
+"""
+import atexit
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def is_transient(exc):
+    """True for failures worth retrying on a fresh connection."""
+    if isinstance(exc, (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused)):
+        return False
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return isinstance(exc, (smtplib.SMTPException, OSError))
+
+
+class ConnectionPool:
+    """
+    Bounded pool of open email backend connections.
+
+    At most ``size`` connections exist at once; callers block in ``acquire``
+    until one is free. Connections idle for longer than ``idle_timeout``
+    seconds are reopened, since most servers drop idle sessions.
+    """
+
+    def __init__(self, backend=DEFAULT_POOL_BACKEND, size=4, idle_timeout=60):
+        self.backend = backend
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self):
+        connection = get_connection(self.backend, fail_silently=False)
+        connection.open()
+        return connection
+
+    def acquire(self):
+        self._slots.acquire()
+        try:
+            while True:
+                try:
+                    connection, last_used = self._idle.get_nowait()
+                except queue.Empty:
+                    return self._connect()
+                if time.monotonic() - last_used < self.idle_timeout:
+                    return connection
+                self._close(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, discard=False):
+        if discard:
+            self._close(connection)
+        else:
+            self._idle.put((connection, time.monotonic()))
+        self._slots.release()
+
+    def close_all(self):
+        while True:
+            try:
+                connection, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(connection)
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    """Process-wide connection pool, created on first use."""
+    global _pool
+    if _pool is None:
+        with _lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    backend=_setting('EMAIL_POOL_BACKEND', DEFAULT_POOL_BACKEND),
+                    size=_setting('EMAIL_POOL_SIZE', 4),
+                    idle_timeout=_setting('EMAIL_POOL_IDLE_TIMEOUT', 60),
+                )
+                atexit.register(_pool.close_all)
+    return _pool
+
+
+def get_executor():
+    """Process-wide sender threads, one per pooled connection."""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_setting('EMAIL_POOL_SIZE', 4),
+                    thread_name_prefix='mail',
+                )
+    return _executor
+
+
+def send_with_retry(message, pool=None):
+    """
+    Send one message over a pooled connection, retrying transient failures.
+    Returns 1 if sent, 0 if the message had no recipients; raises the last
+    error once retries are exhausted.
+    """
+    pool = pool or get_pool()
+    retries = _setting('EMAIL_MAX_RETRIES', 3)
+    backoff = _setting('EMAIL_RETRY_BACKOFF', 0.5)
+    attempt = 0
+    while True:
+        connection = None
+        try:
+            connection = pool.acquire()  # Opening a connection can fail transiently too
+            sent = connection.send_messages([message])
+        except Exception as exc:
+            if connection is not None:
+                pool.release(connection, discard=True)
+            if attempt >= retries or not is_transient(exc):
+                raise
+            delay = backoff * (2 ** attempt)
+            attempt += 1
+            logger.warning('Email to %s failed (%s); retry %d in %.1fs', message.to, exc, attempt, delay)
+            time.sleep(delay)
+            continue
+        pool.release(connection)
+        return sent or 0
+
+
+def deliver_each(messages):
+    """
+    Send ``messages`` concurrently over the pool. Returns one outcome per
+    message, in order: the number sent (0 or 1) or the exception raised.
+    """
+    messages = list(messages)
+    if len(messages) == 1:
+        return [_deliver(messages[0])]
+    return list(get_executor().map(_deliver, messages))
+
+
+def _deliver(message):
+    try:
+        return send_with_retry(message)
+    except Exception as exc:
+        logger.error('Email to %s could not be delivered: %s', message.to, exc)
+        return exc
+
+
+class PooledEmailBackend(BaseEmailBackend):
+    """
+    Email backend that reuses pooled connections and sends batches concurrently.
+    Single messages (the request path) are sent inline on the calling thread.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        outcomes = deliver_each(email_messages)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, Exception)]
+        if errors and not self.fail_silently:
+            raise errors[0]
+        return sum(outcome for outcome in outcomes if not isinstance(outcome, Exception))
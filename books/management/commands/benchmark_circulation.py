@@ -0,0 +1,111 @@
+import threading
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+from books import circulation
+from books.models import Book, BookIssue
+
+User = get_user_model()
+
+
+def legacy_checkout(user, book_id, return_date):
+    """The read-modify-save checkout the views used before ``books.circulation``."""
+    book = Book.objects.get(pk=book_id)
+    if book.available <= 0:
+        raise circulation.NotAvailable(book.title)
+    BookIssue.objects.create(book=book, user=user, return_date=return_date, status='active')
+    book.available = max(0, book.available - 1)
+    book.save()
+
+
+def service_checkout(user, book_id, return_date):
+    circulation.checkout(user, Book(pk=book_id, title='benchmark'), return_date)
+
+
+MODES = {'legacy': legacy_checkout, 'conditional': service_checkout}
+
+
+class Command(BaseCommand):
+    help = ('Stress concurrent checkouts of one title with the legacy read-modify-save path and the '
+            'conditional UPDATE path, then check the copy counts (benchmark rows are deleted afterwards)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent workers (default: 8)')
+        parser.add_argument('--attempts', type=int, default=100, help='Checkout attempts per worker (default: 100)')
+        parser.add_argument('--copies', type=int, default=200, help='Copies of the contended title (default: 200)')
+        parser.add_argument('--mode', choices=sorted(MODES), nargs='+', default=['legacy', 'conditional'])
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='circulation-benchmark', password=None)
+        try:
+            for mode in options['mode']:
+                self._run(mode, user, options['threads'], options['attempts'], options['copies'])
+        finally:
+            Book.objects.filter(isbn__startswith='CIRC-BENCH').delete()
+            user.delete()
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite serializes all writers; run against PostgreSQL for representative throughput'
+            ))
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished, synthetic rows removed'))
+
+    def _run(self, mode, user, threads, attempts, copies):
+        book = Book.objects.create(
+            title=f'Circulation benchmark ({mode})',
+            author='Benchmark Author',
+            isbn=f'CIRC-BENCH-{mode}',
+            quantity=copies,
+            available=copies,
+            price=0,
+            publication_date=timezone.localdate(),
+        )
+        checkout = MODES[mode]
+        return_date = timezone.now() + timedelta(days=14)
+        results = {'issued': 0, 'refused': 0, 'errors': 0}
+        lock = threading.Lock()
+        start = threading.Barrier(threads)
+
+        def worker():
+            counts = {'issued': 0, 'refused': 0, 'errors': 0}
+            try:
+                start.wait()
+                for _ in range(attempts):
+                    try:
+                        checkout(user, book.pk, return_date)
+                        counts['issued'] += 1
+                    except circulation.NotAvailable:
+                        counts['refused'] += 1
+                    except DatabaseError:
+                        counts['errors'] += 1  # e.g. "database is locked" on SQLite
+            finally:
+                connection.close()
+                with lock:
+                    for key, value in counts.items():
+                        results[key] += value
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.monotonic()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.monotonic() - started
+
+        book.refresh_from_db()
+        loans = BookIssue.objects.filter(book=book).count()
+        correct = loans == copies - book.available and loans <= copies
+        self.stdout.write(
+            f'⏱ {mode:>11}: {threads * attempts:,} attempts in {elapsed:.2f}s, '
+            f'{results["issued"] / elapsed:,.0f} checkouts/s, {results["refused"]:,} refused, '
+            f'{results["errors"]:,} errors'
+        )
+        style = self.style.SUCCESS if correct else self.style.ERROR
+        self.stdout.write(style(
+            f'📊 {mode:>11}: {loans:,} loans for {copies:,} copies, {book.available:,} left on the shelf'
+            f' ({"consistent" if correct else "LOST UPDATES"})'
+        ))
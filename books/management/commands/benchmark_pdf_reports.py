@@ -0,0 +1,95 @@
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from books.models import Book, BookIssue
+from books.pdf_reports import render_issues
+
+User = get_user_model()
+
+
+class _Rollback(Exception):
+    pass
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the issues PDF report against synthetic data (nothing is kept in the database)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000],
+                            help='Issue counts to render, smallest first (default: 10000 100000 500000)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per INSERT while seeding')
+
+    def handle(self, *args, **options):
+        sizes = sorted(options['rows'])
+        self.stdout.write(f'📊 Baseline peak RSS: {peak_rss_mb():.1f} MB')
+        try:
+            with transaction.atomic():
+                book, user = self._fixtures()
+                seeded = 0
+                for size in sizes:
+                    self._seed(book, user, size - seeded, options['batch_size'])
+                    seeded = size
+                    self._measure(size)
+                raise _Rollback
+        except _Rollback:
+            pass
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished, synthetic rows rolled back'))
+
+    def _fixtures(self):
+        user = User.objects.create_user(username='pdf-benchmark', password=None)
+        book = Book.objects.create(
+            title='PDF benchmark book with a fairly long title',
+            author='Benchmark Author',
+            isbn='9999999999999',
+            quantity=1,
+            available=1,
+            price=0,
+            publication_date=timezone.localdate(),
+        )
+        return book, user
+
+    def _seed(self, book, user, count, batch_size):
+        now = timezone.now()
+        batch = []
+        for index in range(count):
+            batch.append(BookIssue(
+                book=book,
+                user=user,
+                return_date=now + timedelta(days=index % 30),
+                status='returned' if index % 3 else 'active',
+                fine_amount=index % 7,
+            ))
+            if len(batch) >= batch_size:
+                BookIssue.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            BookIssue.objects.bulk_create(batch)
+
+    def _measure(self, size):
+        total = BookIssue.objects.count()
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as out:
+            started = time.monotonic()
+            render_issues(out)
+            elapsed = time.monotonic() - started
+            out.flush()
+            file_size = os.path.getsize(out.name)
+        self.stdout.write(
+            f'⏱ {size:>8,} rows ({total:,} issues): {elapsed:7.1f}s, '
+            f'{total / elapsed:,.0f} rows/s, {file_size / (1024 * 1024):6.1f} MB PDF, '
+            f'peak RSS {peak_rss_mb():.1f} MB'
+        )
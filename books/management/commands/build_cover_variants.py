@@ -0,0 +1,51 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from books import covers
+
+
+class Command(BaseCommand):
+    help = ('Build WebP/JPEG thumbnail and medium variants of uploaded book covers in a process pool '
+            '(backfills existing covers; --watch keeps running as a worker)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count(), help='Worker processes (default: CPU count)')
+        parser.add_argument('--batch-size', type=int, default=100, help='Books read per query (default: 100)')
+        parser.add_argument('--all', action='store_true', help='Rebuild every cover, e.g. after changing the sizes')
+        parser.add_argument('--watch', action='store_true', help='Keep polling for newly uploaded covers')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --watch (default: 5)')
+
+    def handle(self, *args, **options):
+        def progress(book_id, source, error):
+            if error:
+                self.stdout.write(self.style.ERROR(f'✗ Book #{book_id} ({source}): {error}'))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'✓ Book #{book_id} ({source})')
+
+        total_built = total_failed = 0
+        try:
+            while True:
+                books = covers.with_covers() if options['all'] else covers.pending()
+                if books.exists():
+                    started = time.monotonic()
+                    built, failed = covers.process(
+                        books,
+                        processes=max(1, options['processes'] or 1),
+                        batch_size=max(1, options['batch_size']),
+                        progress=progress,
+                    )
+                    elapsed = time.monotonic() - started
+                    total_built += built
+                    total_failed += failed
+                    rate = (built + failed) / elapsed if elapsed else 0
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Built variants for {built} cover(s), {failed} failed in {elapsed:.1f}s ({rate:.1f} covers/s)'
+                    ))
+                options['all'] = False  # A full rebuild happens once; later polls only pick up new uploads
+                if not options['watch']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nStopping cover worker...')
+        self.stdout.write(self.style.SUCCESS(f'📊 Built: {total_built}, failed: {total_failed}'))
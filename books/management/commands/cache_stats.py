@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from books import model_cache
+
+
+class Command(BaseCommand):
+    help = 'Show hit/miss counts of the versioned query cache, summed over every worker sharing the cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after printing them')
+
+    def handle(self, *args, **options):
+        summary = model_cache.stats()
+        if not summary:
+            self.stdout.write('No cached lookups recorded yet')
+        hits = misses = 0
+        for name, entry in summary.items():
+            hits += entry['hits']
+            misses += entry['misses']
+            self.stdout.write(
+                f'📊 {name:<20} {entry["hits"]:>10,} hits {entry["misses"]:>10,} misses {entry["hit_rate"]:>7.1%}'
+            )
+        if hits + misses:
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ {hits:,} hits, {misses:,} misses overall ({hits / (hits + misses):.1%} hit rate)'
+            ))
+        if options['reset']:
+            model_cache.reset_stats()
+            self.stdout.write(self.style.SUCCESS('✓ Counters reset'))
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+from books import outbox
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches (runs as a polling worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Emails claimed per batch (default: 100)')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty (default: 5)')
+        parser.add_argument('--once', action='store_true', help='Drain what is due now and exit instead of polling')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        total_sent = total_failed = 0
+        self.stdout.write('Outbox worker started' + (' (single pass)' if options['once'] else ''))
+        try:
+            while True:
+                rows = outbox.claim_batch(batch_size)
+                if rows:
+                    sent, failed = outbox.deliver_batch(rows)
+                    total_sent += sent
+                    total_failed += failed
+                    style = self.style.SUCCESS if not failed else self.style.WARNING
+                    self.stdout.write(style(f'✓ Batch of {len(rows)}: {sent} sent, {failed} failed'))
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nStopping outbox worker...')
+        self.stdout.write(self.style.SUCCESS(f'📊 Sent: {total_sent}, failed: {total_failed}'))
@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+from books import circulation
+
+
+class Command(BaseCommand):
+    help = 'Lapse ready holds that were not collected in time and pass their copies to the next in line (run hourly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Holds read per query (default: 500)')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        expired = circulation.expire_holds(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f'✓ Expired {expired} uncollected hold(s)'))
+        self.stdout.write(self.style.SUCCESS(f'⏱ Finished in {time.monotonic() - started:.2f}s'))
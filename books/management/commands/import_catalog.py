@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from books import catalog_import
+
+
+class Command(BaseCommand):
+    help = ('Bulk import books from a CSV (with header row) or JSON Lines file, upserting on ISBN. '
+            'Columns: title, author, isbn, category, quantity, price, publication_date, description')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or .jsonl file')
+        parser.add_argument('--format', choices=catalog_import.FORMATS, help='Input format (default: from the file extension)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Books per upsert statement (default: 2000)')
+        parser.add_argument('--offset', type=int, default=0, help='Byte offset to resume from (printed after every batch)')
+        parser.add_argument('--normalize-existing', action='store_true',
+                            help='First rewrite stored ISBNs (e.g. with hyphens) into the normalized form used for matching')
+
+    def handle(self, *args, **options):
+        if options['normalize_existing']:
+            changed, unparseable, conflicts = catalog_import.normalize_existing_isbns()
+            self.stdout.write(self.style.SUCCESS(
+                f'✓ Normalized {changed} stored ISBN(s) ({unparseable} unparseable, {conflicts} conflicting left as is)'
+            ))
+
+        committed = {'offset': options['offset']}
+
+        def progress(stats):
+            committed['offset'] = stats['offset']
+            rate = stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0
+            self.stdout.write(
+                f'⏱ {stats["rows"]:,} rows ({stats["created"]:,} new, {stats["updated"]:,} updated, '
+                f'{stats["skipped"]:,} skipped), {rate:,.0f} rows/s, offset {stats["offset"]}'
+            )
+
+        try:
+            stats = catalog_import.import_catalog(
+                options['path'],
+                fmt=options['format'],
+                offset=options['offset'],
+                batch_size=max(1, options['batch_size']),
+                progress=progress,
+            )
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except Exception as exc:
+            raise CommandError(
+                f'Import stopped: {exc}. Committed up to byte {committed["offset"]}; '
+                f're-run with --offset {committed["offset"]} to resume.'
+            )
+
+        rate = stats['rows'] / stats['elapsed'] if stats['elapsed'] else 0
+        self.stdout.write(self.style.SUCCESS('📊 Import summary:'))
+        self.stdout.write(f'  • Rows read: {stats["rows"]:,}')
+        self.stdout.write(f'  • Books created: {stats["created"]:,}')
+        self.stdout.write(f'  • Books updated: {stats["updated"]:,}')
+        self.stdout.write(f'  • Rows skipped: {stats["skipped"]:,}')
+        self.stdout.write(f'  • Categories created: {stats["categories"]:,}')
+        for offset, message in stats['errors']:
+            self.stdout.write(self.style.WARNING(f'  ! row ending at byte {offset}: {message}'))
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Finished in {stats["elapsed"]:.2f}s ({rate:,.0f} rows/s), end offset {stats["offset"]}'
+        ))
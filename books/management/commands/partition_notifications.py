@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from books import retention
+
+
+class Command(BaseCommand):
+    help = ('PostgreSQL only: partition the notification table by month on created_at (--convert, once), '
+            'then keep future monthly partitions created (run monthly)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Future monthly partitions to keep ready (default: 3)')
+        parser.add_argument('--convert', action='store_true',
+                            help='Convert the existing table (takes an exclusive lock while it runs)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Notification partitioning needs PostgreSQL.')
+        months_ahead = max(0, options['months_ahead'])
+        if not retention.is_partitioned():
+            if not options['convert']:
+                raise CommandError('The notification table is not partitioned yet. Re-run with --convert.')
+            retention.convert_to_partitions(months_ahead)
+            self.stdout.write(self.style.SUCCESS('✓ Notification table converted to monthly partitions'))
+        created = retention.ensure_partitions(months_ahead)
+        for name, moved in created:
+            detail = f' ({moved} rows moved from the default partition)' if moved else ''
+            self.stdout.write(self.style.SUCCESS(f'✓ Created partition {name}{detail}'))
+        self.stdout.write(self.style.SUCCESS(f'📊 {len(retention.partitions())} partitions, {len(created)} new'))
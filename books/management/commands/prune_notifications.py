@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+from books import retention
+
+
+class Command(BaseCommand):
+    help = 'Delete notifications past their per-type retention period in small, throttled batches (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows deleted per transaction (default: 1000)')
+        parser.add_argument('--pause', type=float, default=0.1, help='Seconds to sleep between batches (default: 0.1)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        pause = max(0.0, options['pause'])
+        dry_run = options['dry_run']
+        verb = 'Would delete' if dry_run else 'Deleted'
+        started = time.monotonic()
+
+        for name in retention.drop_expired_partitions(dry_run=dry_run):
+            self.stdout.write(self.style.SUCCESS(f'✓ {"Would drop" if dry_run else "Dropped"} partition {name}'))
+
+        deleted = retention.prune_notifications(batch_size=batch_size, pause=pause, dry_run=dry_run)
+        days = retention.retention_days()
+        self.stdout.write(self.style.SUCCESS(f'📊 {verb} notifications:'))
+        for notification_type, count in deleted.items():
+            self.stdout.write(f'  • {notification_type} (older than {days[notification_type]} days): {count}')
+
+        broadcasts = retention.prune_broadcasts(dry_run=dry_run)
+        ledger = retention.prune_ledger(batch_size=batch_size, pause=pause, dry_run=dry_run)
+        self.stdout.write(f'  • expired broadcasts: {broadcasts}')
+        self.stdout.write(f'  • reminder ledger rows: {ledger}')
+        self.stdout.write(self.style.SUCCESS(f'⏱ Finished in {time.monotonic() - started:.2f}s'))
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from books import stats
+from books.models import DailyStats
+
+
+class Command(BaseCommand):
+    help = 'Roll up daily catalog and circulation statistics (run once a day, after midnight)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365,
+                            help='Days to backfill on the first run or with --rebuild (default: 365)')
+        parser.add_argument('--rebuild', action='store_true', help='Recompute existing rows as well')
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        latest = DailyStats.objects.filter(computed_at__isnull=False).order_by('-date').first()
+        if options['rebuild'] or latest is None:
+            days = max(1, options['days'])
+        else:
+            days = (yesterday - latest.date).days
+        if days <= 0:
+            self.stdout.write(self.style.SUCCESS(f'✓ Statistics already rolled up through {latest.date}'))
+            return
+
+        started = time.monotonic()
+        written = stats.rollup(yesterday, days)
+        first_day = yesterday - timedelta(days=written - 1)
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Rolled up {written} day(s): {first_day} to {yesterday} ({time.monotonic() - started:.2f}s)'
+        ))
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from books import report_jobs
+
+
+class Command(BaseCommand):
+    help = 'Render queued PDF reports in the background (runs as a polling worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when no job is queued (default: 2)')
+        parser.add_argument('--once', action='store_true', help='Run the queued jobs and exit instead of polling')
+
+    def handle(self, *args, **options):
+        done = failed = 0
+        self.stdout.write('Report worker started' + (' (single pass)' if options['once'] else ''))
+        try:
+            while True:
+                job = report_jobs.claim_job()
+                if job:
+                    started = time.monotonic()
+                    report_jobs.run_job(job)
+                    elapsed = time.monotonic() - started
+                    if job.status == 'done':
+                        done += 1
+                        self.stdout.write(self.style.SUCCESS(f'✓ {job.get_kind_display()} #{job.pk} rendered in {elapsed:.1f}s'))
+                    else:
+                        failed += 1
+                        self.stdout.write(self.style.ERROR(f'✗ {job.get_kind_display()} #{job.pk} failed: {job.error.strip().splitlines()[-1]}'))
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nStopping report worker...')
+        self.stdout.write(self.style.SUCCESS(f'📊 Rendered: {done}, failed: {failed}'))
@@ -1,191 +1,117 @@
+import time
+
 from django.core.management.base import BaseCommand
+from django.core.mail import get_connection
+from django.db import transaction
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
-from books.models import BookIssue, Notification
-from datetime import timedelta
+from books.models import NotificationDispatch, NotificationRun
+from books import reminders
 
 
 class Command(BaseCommand):
     help = 'Send email notifications for due/overdue books'
 
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Loans per checkpointed chunk, notification insert and email batch (default: 500)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help="Rescan from the first loan even if today's run finished; the ledger still skips sent reminders",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        verbose = options['verbosity'] >= 2
+        today = timezone.localdate()
+        timings = {'query': 0.0, 'notifications': 0.0, 'emails': 0.0}
+        counts = {bucket['key']: 0 for bucket in reminders.BUCKETS}
         self.stdout.write('Checking for due and overdue books...')
-        
-        # Find books due in 2 days
-        two_days = timezone.now() + timedelta(days=2)
-        due_in_two = BookIssue.objects.filter(
-            actual_return_date__isnull=True,
-            return_date__date=two_days.date(),
-            status__in=['approved', 'active']
-        ).select_related('book', 'user')
-        
-        for issue in due_in_two:
-            # Create notification first (don't depend on email)
-            Notification.create_notification(
-                user=issue.user,
-                notification_type='due_soon',
-                title=f'Book Due in 2 Days: {issue.book.title}',
-                message=f'Please return "{issue.book.title}" by {issue.return_date.strftime("%B %d, %Y")} to avoid fines.',
-                link='/my-books/'
-            )
-            
-            try:
-                # Send email (fail silently if email fails)
-                subject = f'Reminder: Book "{issue.book.title}" Due in 2 Days'
-                message = f"""
-Hello {issue.user.username},
-
-This is a reminder that the book "{issue.book.title}" is due for return in 2 days ({issue.return_date.strftime('%B %d, %Y')}).
-
-Please plan to return it on time to avoid late fees (₹5 per day).
-
-Thank you,
-Library Management System
-"""
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [issue.user.email],
-                    fail_silently=True
-                )
-                self.stdout.write(self.style.SUCCESS(f'✓ Sent 2-day reminder to {issue.user.email}'))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'⚠ Email failed for {issue.user.email}: {str(e)} (notification created)'))
-        
-        # Find books due in 1 day (tomorrow)
-        tomorrow = timezone.now() + timedelta(days=1)
-        due_tomorrow = BookIssue.objects.filter(
-            actual_return_date__isnull=True,
-            return_date__date=tomorrow.date(),
-            status__in=['approved', 'active']
-        ).select_related('book', 'user')
-        
-        for issue in due_tomorrow:
-            # Create notification first
-            Notification.create_notification(
-                user=issue.user,
-                notification_type='due_soon',
-                title=f'⚠️ Due Tomorrow: {issue.book.title}',
-                message=f'URGENT: Return "{issue.book.title}" by tomorrow ({issue.return_date.strftime("%B %d, %Y")}) to avoid ₹5/day fine.',
-                link='/my-books/'
-            )
-            
-            try:
-                # Send email
-                subject = f'⚠️ Urgent: Book "{issue.book.title}" Due Tomorrow'
-                message = f"""
-Hello {issue.user.username},
-
-URGENT REMINDER: The book "{issue.book.title}" is due for return TOMORROW ({issue.return_date.strftime('%B %d, %Y')}).
 
-Please return it on time to avoid late fees (₹5 per day starting the next day).
-
-Thank you,
-Library Management System
-"""
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [issue.user.email],
-                    fail_silently=True
+        run, _ = NotificationRun.objects.get_or_create(run_date=today)
+        if options['restart']:
+            run.last_issue_id = 0
+            run.completed_at = None
+            run.save(update_fields=['last_issue_id', 'completed_at'])
+        elif run.completed_at:
+            self.stdout.write(self.style.WARNING(
+                f"Today's run already completed at {run.completed_at:%H:%M}. Use --restart to rescan."
+            ))
+            return
+        elif run.last_issue_id:
+            self.stdout.write(self.style.WARNING(f'Resuming after loan #{run.last_issue_id}'))
+
+        connection = get_connection(fail_silently=True)
+        chunks = reminders.loan_chunks(today, after_id=run.last_issue_id, size=batch_size)
+        while True:
+            # Phase 1: next keyset page of active loans, grouped in memory
+            started = time.perf_counter()
+            rows = next(chunks, None)
+            if rows is None:
+                timings['query'] += time.perf_counter() - started
+                break
+            grouped = reminders.drop_dispatched(reminders.group_loans(rows, today), today)
+            timings['query'] += time.perf_counter() - started
+
+            # Phase 2: ledger, notifications and checkpoint commit together
+            started = time.perf_counter()
+            with transaction.atomic():
+                NotificationDispatch.objects.bulk_create(
+                    [reminders.build_dispatch(bucket, ctx, today)
+                     for bucket in reminders.BUCKETS for ctx in grouped[bucket['key']]],
+                    batch_size=batch_size,
+                    ignore_conflicts=True,
                 )
-                self.stdout.write(self.style.WARNING(f'✓ Sent urgent 1-day reminder to {issue.user.email}'))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'⚠ Email failed for {issue.user.email}: {str(e)} (notification created)'))
-        
-        # Find books due TODAY (last day)
-        today = timezone.now().date()
-        due_today = BookIssue.objects.filter(
-            actual_return_date__isnull=True,
-            return_date__date=today,
-            status__in=['approved', 'active']
-        ).select_related('book', 'user')
-        
-        for issue in due_today:
-            # Create notification first
-            Notification.create_notification(
-                user=issue.user,
-                notification_type='due_soon',
-                title=f'🚨 DUE TODAY: {issue.book.title}',
-                message=f'FINAL NOTICE: Return "{issue.book.title}" TODAY ({issue.return_date.strftime("%B %d, %Y")}) to avoid fines!',
-                link='/my-books/'
-            )
-            
-            try:
-                # Send email
-                subject = f'🚨 FINAL NOTICE: Book "{issue.book.title}" Due TODAY'
-                message = f"""
-Hello {issue.user.username},
-
-FINAL NOTICE: The book "{issue.book.title}" is due for return TODAY ({issue.return_date.strftime('%B %d, %Y')}).
-
-Please return it before the library closes today to avoid late fees (₹5 per day starting tomorrow).
-
-Thank you,
-Library Management System
-"""
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [issue.user.email],
-                    fail_silently=True
-                )
-                self.stdout.write(self.style.ERROR(f'✓ Sent FINAL notice to {issue.user.email}'))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'⚠ Email failed for {issue.user.email}: {str(e)} (notification created)'))
-        
-        # Find overdue books
-        overdue = BookIssue.objects.filter(
-            actual_return_date__isnull=True,
-            return_date__lt=timezone.now(),
-            status__in=['approved', 'active']
-        ).select_related('book', 'user')
-        
-        for issue in overdue:
-            days_overdue = (timezone.now().date() - issue.return_date.date()).days
-            fine = days_overdue * 5
-            
-            # Create notification first
-            Notification.create_notification(
-                user=issue.user,
-                notification_type='overdue',
-                title=f'⛔ OVERDUE: {issue.book.title}',
-                message=f'{days_overdue} days overdue. Fine: ₹{fine}. Please return immediately to avoid additional charges!',
-                link='/my-books/'
-            )
-            
-            try:
-                subject = f'⛔ OVERDUE NOTICE: Book "{issue.book.title}" - ₹{fine} Fine'
-                message = f"""
-Hello {issue.user.username},
-
-The book "{issue.book.title}" is now {days_overdue} day(s) OVERDUE.
-
-Current fine: ₹{fine} (₹5 per day)
-Return due date was: {issue.return_date.strftime('%B %d, %Y')}
-
-Please return the book IMMEDIATELY to avoid further charges.
-
-Thank you,
-Library Management System
-"""
-                send_mail(
-                    subject,
-                    message,
-                    settings.EMAIL_HOST_USER,
-                    [issue.user.email],
-                    fail_silently=True
+                reminders.save_notifications(
+                    [reminders.build_notification(bucket, ctx)
+                     for bucket in reminders.BUCKETS for ctx in grouped[bucket['key']]],
+                    batch_size=batch_size,
                 )
-                self.stdout.write(self.style.ERROR(f'✓ Sent overdue notice to {issue.user.email} (₹{fine})'))
-            except Exception as e:
-                self.stdout.write(self.style.WARNING(f'⚠ Email failed for {issue.user.email}: {str(e)} (notification created)'))
-        
-        self.stdout.write(self.style.SUCCESS(f'\n📊 Summary:'))
-        self.stdout.write(self.style.SUCCESS(f'  • 2 days before: {due_in_two.count()}'))
-        self.stdout.write(self.style.SUCCESS(f'  • 1 day before: {due_tomorrow.count()}'))
-        self.stdout.write(self.style.ERROR(f'  • Due today: {due_today.count()}'))
-        self.stdout.write(self.style.ERROR(f'  • Overdue: {overdue.count()}'))
+                run.last_issue_id = rows[-1][0]
+                run.save(update_fields=['last_issue_id'])
+            timings['notifications'] += time.perf_counter() - started
+
+            # Phase 3: emails only after the chunk is committed (at most once per loan and day)
+            started = time.perf_counter()
+            for bucket in reminders.BUCKETS:
+                items = grouped[bucket['key']]
+                counts[bucket['key']] += len(items)
+                self.send_bucket(connection, bucket, [ctx for ctx in items if ctx['email'] and not ctx['digest']], verbose)
+            timings['emails'] += time.perf_counter() - started
+
+        # Phase 4: one digest email per digest-mode user, queued for drain_outbox
+        started = time.perf_counter()
+        digests = reminders.queue_digests(today, batch_size)
+        timings['emails'] += time.perf_counter() - started
+
+        run.completed_at = timezone.now()
+        run.save(update_fields=['completed_at'])
+
+        self.stdout.write(self.style.SUCCESS('\n📊 Summary:'))
+        for bucket in reminders.BUCKETS:
+            style = getattr(self.style, bucket['summary_style'])
+            self.stdout.write(style(f'  • {bucket["label"]}: {counts[bucket["key"]]}'))
+        self.stdout.write(self.style.SUCCESS(f'  • Digest emails queued: {digests}'))
+
+        self.stdout.write(self.style.SUCCESS('\n⏱ Timings:'))
+        for phase, seconds in timings.items():
+            self.stdout.write(f'  • {phase}: {seconds:.3f}s')
+
+    def send_bucket(self, connection, bucket, items, verbose):
+        """Send one bucket's emails over the shared connection (fail silently)."""
+        if not items:
+            return
+        style = getattr(self.style, bucket['style'])
+        messages = [reminders.build_email(bucket, ctx, connection) for ctx in items]
+        try:
+            connection.send_messages(messages)
+        except Exception as e:
+            self.stdout.write(self.style.WARNING(f'⚠ Email batch failed: {str(e)} (notifications created)'))
+            return
+        if verbose:
+            for ctx in items:
+                self.stdout.write(style(bucket['log'].format(**ctx)))
@@ -0,0 +1,52 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(
+                "CREATE VIRTUAL TABLE books_book_fts USING fts5("
+                "title, author, isbn, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            # SQLite built without FTS5: search falls back to icontains
+            return
+        schema_editor.execute(
+            "INSERT INTO books_book_fts (rowid, title, author, isbn) "
+            "SELECT id, title, author, isbn FROM books_book"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            "CREATE TABLE books_book_search ("
+            "book_id bigint PRIMARY KEY REFERENCES books_book (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX books_book_search_document_gin ON books_book_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "INSERT INTO books_book_search (book_id, document) SELECT id, "
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(isbn, '')), 'A') FROM books_book"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS books_book_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS books_book_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_outboxemail'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
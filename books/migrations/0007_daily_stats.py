@@ -0,0 +1,57 @@
+# Generated by Django 5.2.8 on 2026-10-18 04:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_book_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('total_books', models.IntegerField(default=0)),
+                ('total_users', models.IntegerField(default=0)),
+                ('total_members', models.IntegerField(default=0)),
+                ('open_issues', models.IntegerField(default=0)),
+                ('overdue_issues', models.IntegerField(default=0)),
+                ('category_counts', models.JSONField(blank=True, default=dict)),
+                ('books_added', models.IntegerField(default=0)),
+                ('issues_opened', models.IntegerField(default=0)),
+                ('issues_returned', models.IntegerField(default=0)),
+                ('books_removed', models.IntegerField(default=0)),
+                ('users_removed', models.IntegerField(default=0)),
+                ('members_removed', models.IntegerField(default=0)),
+                ('open_issues_removed', models.IntegerField(default=0)),
+                ('overdue_issues_removed', models.IntegerField(default=0)),
+                ('computed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily stats',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['created_at'], name='books_book_created_572b47_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(fields=['issue_date'], name='books_booki_issue_d_e85921_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(fields=['return_date'], name='books_booki_return__e069a6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(fields=['actual_return_date'], name='books_booki_actual__2424cc_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0012_notification_retention'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationdispatch',
+            name='in_digest',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name='notificationdispatch',
+            index=models.Index(fields=['run_date', 'in_digest'], name='books_notif_run_dat_278c41_idx'),
+        ),
+    ]
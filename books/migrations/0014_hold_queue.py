@@ -0,0 +1,68 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:24
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def start_pickup_windows(apps, schema_editor):
+    """
+    Reservations made before the queue already hold a copy, so they start
+    their pickup window from the reservation date and lapse through
+    expire_holds like any other ready hold.
+    """
+    Reservation = apps.get_model('books', 'Reservation')
+    Reservation.objects.filter(status='pending', expires_at__isnull=True).update(
+        ready_at=models.F('reservation_date'),
+        expires_at=models.F('reservation_date') + timedelta(days=getattr(settings, 'HOLD_PICKUP_DAYS', 3)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0013_reminder_digests'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reservation',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='position',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='ready_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='notification',
+            name='notification_type',
+            field=models.CharField(choices=[('issue_approved', 'Issue Approved'), ('issue_rejected', 'Issue Rejected'), ('due_soon', 'Due Soon'), ('overdue', 'Overdue'), ('returned', 'Book Returned'), ('fine_added', 'Fine Added'), ('fine_paid', 'Fine Paid'), ('hold_ready', 'Hold Ready'), ('system', 'System Notification')], max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('waiting', 'Waiting'), ('pending', 'Ready for pickup'), ('fulfilled', 'Fulfilled'), ('cancelled', 'Cancelled'), ('expired', 'Expired')], max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['book', 'status', 'position'], name='books_reser_book_id_dd14d0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['status', 'expires_at'], name='books_reser_status_4cda5f_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=models.UniqueConstraint(fields=('book', 'position'), name='reservation_book_position'),
+        ),
+        migrations.RunPython(start_pickup_windows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:30
+
+from django.db import migrations, models
+
+
+def queue_existing_covers(apps, schema_editor):
+    """Existing covers get their variants from the first build_cover_variants run."""
+    Book = apps.get_model('books', 'Book')
+    Book.objects.exclude(cover_image='').exclude(cover_image__isnull=True).update(cover_state='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0014_hold_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='cover_state',
+            field=models.CharField(blank=True, choices=[('', 'No variants'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='book',
+            name='cover_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(queue_existing_covers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0015_cover_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bookissue',
+            index=models.Index(fields=['actual_return_date', 'return_date'], name='books_booki_actual__b58cb1_idx'),
+        ),
+    ]
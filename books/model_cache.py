@@ -0,0 +1,171 @@
+"""
+Query results cached under per-model generations.
+
+Every tracked model (``Book``, ``Category``, ``BookIssue``, ``Review``) has a
+generation number in the cache. Signals replace it after each committed save
+or delete (books/signals.py), and bulk writes that send no signals replace it
+themselves (circulation, catalog import, cover variants). A cached value is
+stored under a key that includes the generation of every model it was
+computed from, so a write makes the old entries unreachable rather than
+deleting them: readers never get stale rows and callers write no
+invalidation code. Orphaned entries just expire.
+
+The generations are read before the query runs, so a value computed while a
+write commits is filed under the old generation and never served. They are
+``time.time_ns()`` values rather than counters, so an evicted generation
+never comes back as a number an old entry was stored under.
+
+Hits and misses are counted per cache name in-process and added to shared
+counters in the cache every ``STATS_FLUSH_EVERY`` lookups; ``stats()`` and
+the ``cache_stats`` command report them across workers.
+"""
+import hashlib
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+PREFIX = 'modelcache'
+NAMES_KEY = f'{PREFIX}:stats:names'
+STATS_FLUSH_EVERY = 50
+
+_MISSING = object()
+
+_lock = threading.Lock()
+_local = Counter()    # (name, 'hits' | 'misses') -> lookups by this process
+_pending = Counter()  # Not yet added to the shared counters
+
+
+def default_timeout():
+    return getattr(settings, 'MODEL_CACHE_TIMEOUT', 3600)
+
+
+def _label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def _generation_key(label):
+    return f'{PREFIX}:gen:{label}'
+
+
+def generations(models):
+    """``{label: generation}`` for ``models`` (classes or labels), starting missing ones."""
+    keys = {_generation_key(label): label for label in sorted({_label(model) for model in models})}
+    found = cache.get_many(list(keys))
+    return {
+        label: found[key] if key in found else cache.get_or_set(key, time.time_ns, None)
+        for key, label in keys.items()
+    }
+
+
+def bump(*models):
+    """Make everything cached from ``models`` unreachable once the current transaction commits."""
+    keys = [_generation_key(_label(model)) for model in models]
+    transaction.on_commit(lambda: cache.set_many({key: time.time_ns() for key in keys}, None))
+
+
+def make_key(name, models, *parts):
+    stamp = ';'.join(f'{label}:{generation}' for label, generation in generations(models).items())
+    digest = hashlib.md5(repr((stamp, parts)).encode()).hexdigest()
+    return f'{PREFIX}:v:{name}:{digest}'
+
+
+def get_or_compute(name, models, compute, *parts, timeout=None):
+    """
+    ``compute()``, cached as ``name`` for the current generations of
+    ``models`` and the values in ``parts`` (e.g. filter arguments).
+    """
+    key = make_key(name, models, *parts)
+    value = cache.get(key, _MISSING)
+    _record(name, value is not _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, default_timeout() if timeout is None else timeout)
+    return value
+
+
+def cached_list(name, queryset, models=None, timeout=None):
+    """
+    The rows of ``queryset`` as a list, cached until ``queryset.model`` (or
+    any of ``models``, for querysets that join or annotate others) changes.
+    """
+    return get_or_compute(
+        name, models or [queryset.model], lambda: list(queryset), str(queryset.query), timeout=timeout,
+    )
+
+
+def _stats_key(name, field):
+    return f'{PREFIX}:stats:{name}:{field}'
+
+
+def _record(name, hit):
+    field = 'hits' if hit else 'misses'
+    with _lock:
+        _local[name, field] += 1
+        _pending[name, field] += 1
+        if _pending.total() < STATS_FLUSH_EVERY:
+            return
+        pending = dict(_pending)
+        _pending.clear()
+    _add_shared(pending)
+
+
+def _add_shared(pending):
+    names = cache.get(NAMES_KEY) or set()
+    new_names = {name for name, _ in pending} - names
+    if new_names:
+        cache.set(NAMES_KEY, names | new_names, None)  # A name lost to a race is re-added by the next flush
+    for (name, field), count in pending.items():
+        key = _stats_key(name, field)
+        if not cache.add(key, count, None):
+            try:
+                cache.incr(key, count)
+            except ValueError:  # Evicted between add() and incr()
+                cache.set(key, count, None)
+
+
+def flush_stats():
+    """Add this process's uncounted lookups to the shared counters."""
+    with _lock:
+        pending = dict(_pending)
+        _pending.clear()
+    if pending:
+        _add_shared(pending)
+
+
+def _summary(counts, names):
+    summary = {}
+    for name in sorted(names):
+        hits, misses = counts.get((name, 'hits'), 0), counts.get((name, 'misses'), 0)
+        summary[name] = {'hits': hits, 'misses': misses, 'hit_rate': hits / (hits + misses) if hits + misses else 0.0}
+    return summary
+
+
+def stats():
+    """``{name: {'hits', 'misses', 'hit_rate'}}`` summed over every process sharing the cache."""
+    flush_stats()
+    names = cache.get(NAMES_KEY) or set()
+    found = cache.get_many([_stats_key(name, field) for name in names for field in ('hits', 'misses')])
+    counts = {
+        (name, field): found.get(_stats_key(name, field), 0)
+        for name in names for field in ('hits', 'misses')
+    }
+    return _summary(counts, names)
+
+
+def local_stats():
+    """Like ``stats()``, for the lookups made by this process only."""
+    with _lock:
+        counts = dict(_local)
+    return _summary(counts, {name for name, _ in counts})
+
+
+def reset_stats():
+    with _lock:
+        _local.clear()
+        _pending.clear()
+    names = cache.get(NAMES_KEY) or set()
+    cache.delete_many([_stats_key(name, field) for name in names for field in ('hits', 'misses')] + [NAMES_KEY])
@@ -1,8 +1,11 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
+from django.urls import reverse
 from django.utils import timezone
 
+from .notification_counts import adjust_unread, move_watermark, refresh_unread, watermark_mode
+
 User = get_user_model()
 
 class Category(models.Model):
@@ -23,15 +26,40 @@ class Book(models.Model):
     quantity = models.IntegerField(validators=[MinValueValidator(0)])
     available = models.IntegerField(validators=[MinValueValidator(0)])
     cover_image = models.ImageField(upload_to='book_covers/', null=True, blank=True)
+    # Pre-sized WebP/JPEG copies of the cover built off the request path (books/covers.py)
+    cover_variants = models.JSONField(default=dict, blank=True)
+    cover_state = models.CharField(max_length=10, blank=True, default='', db_index=True, choices=[
+        ('', 'No variants'),
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ])
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     publication_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
     def __str__(self):
         return self.title
 
+    def set_cover(self, upload):
+        """Replace the cover; its variants are rebuilt by ``build_cover_variants``."""
+        self.cover_image = upload
+        self.cover_state = 'pending' if upload else ''
+
+    @property
+    def cover_sources(self):
+        """``srcset`` strings for the cover variants, or ``None`` while they are not built."""
+        from .covers import sources
+
+        return sources(self)
+
 class BookIssue(models.Model):
     PAYMENT_STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -56,6 +84,14 @@ class BookIssue(models.Model):
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS_CHOICES, default='pending')
     status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
     notes = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue_date']),
+            models.Index(fields=['return_date']),
+            models.Index(fields=['actual_return_date']),
+            models.Index(fields=['actual_return_date', 'return_date']),
+        ]
     
     def __str__(self):
         return f"{self.book.title} - {self.user.username}"
@@ -83,16 +119,9 @@ class BookIssue(models.Model):
 
     def finalize_return(self):
         """Mark book as returned, compute and persist fine, update status & availability."""
-        if not self.actual_return_date:
-            self.actual_return_date = timezone.now()
-        # Check for None before comparison
-        if self.return_date and self.actual_return_date > self.return_date:
-            overdue_days = (self.actual_return_date - self.return_date).days
-            self.fine_amount = overdue_days * 5  # Persist fine using current rate
-            if overdue_days > 0:
-                self.payment_status = 'overdue'
-        self.status = 'returned'
-        self.save()
+        from .circulation import return_issue
+
+        return return_issue(self, self.actual_return_date)
 
 class Review(models.Model):
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='reviews')
@@ -108,14 +137,33 @@ class Review(models.Model):
         return f"{self.book.title} - {self.user.username} - {self.rating}"
 
 class Reservation(models.Model):
+    """
+    A hold on a book. ``waiting`` holds form a FIFO queue per book ordered by
+    ``position``; a ``pending`` hold has a copy set aside for pickup until
+    ``expires_at``. See books/circulation.py.
+    """
     book = models.ForeignKey(Book, on_delete=models.CASCADE)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     reservation_date = models.DateTimeField(auto_now_add=True)
     status = models.CharField(max_length=20, choices=[
-        ('pending', 'Pending'),
+        ('waiting', 'Waiting'),
+        ('pending', 'Ready for pickup'),
         ('fulfilled', 'Fulfilled'),
-        ('cancelled', 'Cancelled')
+        ('cancelled', 'Cancelled'),
+        ('expired', 'Expired'),
     ])
+    position = models.PositiveBigIntegerField(null=True, blank=True)  # Place in the book's queue
+    ready_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['book', 'position'], name='reservation_book_position'),
+        ]
+        indexes = [
+            models.Index(fields=['book', 'status', 'position']),
+            models.Index(fields=['status', 'expires_at']),
+        ]
     
     def __str__(self):
         return f"{self.book.title} - {self.user.username}"
@@ -133,6 +181,7 @@ class Notification(models.Model):
         ('returned', 'Book Returned'),
         ('fine_added', 'Fine Added'),
         ('fine_paid', 'Fine Paid'),
+        ('hold_ready', 'Hold Ready'),
         ('system', 'System Notification'),
     ]
     
@@ -143,12 +192,15 @@ class Notification(models.Model):
     link = models.CharField(max_length=255, blank=True, null=True)  # Optional link to related page
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
+    # Repeated notices with the same key (e.g. a loan's daily overdue notice) update one row
+    collapse_key = models.CharField(max_length=64, blank=True, null=True, db_index=True)
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'is_read']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['notification_type', 'created_at']),
         ]
     
     def __str__(self):
@@ -157,15 +209,278 @@ class Notification(models.Model):
     @classmethod
     def create_notification(cls, user, notification_type, title, message, link=None):
         """Helper method to create notifications"""
-        return cls.objects.create(
+        notification = cls.objects.create(
             user=user,
             notification_type=notification_type,
             title=title,
             message=message,
             link=link
         )
+        adjust_unread(user.pk, 1, notification.created_at)
+        return notification
     
     @classmethod
     def mark_all_read(cls, user):
         """Mark all notifications as read for a user"""
+        if watermark_mode():
+            move_watermark(user.pk)
+            return
         cls.objects.filter(user=user, is_read=False).update(is_read=True)
+        refresh_unread(user.pk)
+
+    @property
+    def read_url(self):
+        return reverse('notification_read', args=[self.pk])
+
+    def mark_read(self):
+        """Mark this notification as read"""
+        if self.is_read:
+            return
+        updated = Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True)
+        self.is_read = True
+        adjust_unread(self.user_id, -updated, self.created_at)
+
+
+class Broadcast(models.Model):
+    """
+    Announcement shown to every user in ``audience`` without a per-user row.
+    Merged with each user's notifications at read time (books/broadcasts.py);
+    only users who read it get a ``BroadcastRead`` row.
+    """
+    AUDIENCE_CHOICES = [
+        ('all', 'Everyone'),
+        ('members', 'Members'),
+        ('staff', 'Staff'),
+        ('borrowers', 'Members with books on loan'),
+        ('overdue', 'Members with overdue books'),
+    ]
+
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    link = models.CharField(max_length=255, blank=True, null=True)
+    audience = models.CharField(max_length=20, choices=AUDIENCE_CHOICES, default='all')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(null=True, blank=True)  # Hidden after this
+
+    notification_type = 'system'  # Rendered like a system notification
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['audience', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_audience_display()} - {self.title}"
+
+    @property
+    def read_url(self):
+        return reverse('broadcast_read', args=[self.pk])
+
+
+class BroadcastRead(models.Model):
+    """A user has read a broadcast (sparse: no row means unread)."""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name='reads')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    read_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'broadcast'], name='unique_broadcast_read'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.broadcast_id}"
+
+
+class NotificationCounter(models.Model):
+    """
+    Per-user notification read state: the denormalized unread count, kept in
+    step by ``Notification.create_notification``, ``mark_all_read`` and
+    ``mark_read``, and the ``last_read_at`` watermark. Read through
+    books/notification_counts.py, which caches both.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True,
+                                related_name='notification_counter')
+    unread = models.IntegerField(default=0)
+    last_read_at = models.DateTimeField(null=True, blank=True)  # Everything up to here is read
+
+    def __str__(self):
+        return f"{self.user_id} - {self.unread} unread"
+
+
+class NotificationDispatch(models.Model):
+    """
+    Ledger of reminders already dispatched: one row per loan, reminder kind and day.
+    Lets send_notifications be re-run safely without duplicating notices.
+    """
+    issue = models.ForeignKey(BookIssue, on_delete=models.CASCADE, related_name='dispatches')
+    kind = models.CharField(max_length=20)
+    run_date = models.DateField()
+    created_at = models.DateTimeField(default=timezone.now)
+    in_digest = models.BooleanField(default=False)  # Included in a queued digest email
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['issue', 'kind', 'run_date'], name='unique_dispatch_per_day'),
+        ]
+        indexes = [
+            models.Index(fields=['run_date', 'in_digest']),
+        ]
+
+    def __str__(self):
+        return f"{self.issue_id} - {self.kind} - {self.run_date}"
+
+
+class NotificationRun(models.Model):
+    """Checkpoint cursor for a day's reminder run, so an interrupted run can resume."""
+    run_date = models.DateField(unique=True)
+    last_issue_id = models.BigIntegerField(default=0)
+    started_at = models.DateTimeField(default=timezone.now)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.run_date} (cursor {self.last_issue_id})"
+
+
+class OutboxEmail(models.Model):
+    """
+    Email queued for delivery by the ``drain_outbox`` worker.
+    Views write rows inside their own transaction instead of calling SMTP inline.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipients = models.TextField()  # Comma-separated addresses
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)  # Next attempt / lease expiry
+    created_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.recipients} - {self.subject}"
+
+    @classmethod
+    def enqueue(cls, subject, message, from_email, recipient_list):
+        """Queue an email; call inside the transaction that caused it."""
+        recipients = [address for address in recipient_list if address]
+        if not recipients:
+            return None
+        return cls.objects.create(
+            subject=subject,
+            body=message,
+            from_email=from_email or '',
+            recipients=','.join(recipients),
+        )
+
+
+class DailyStats(models.Model):
+    """
+    End-of-day snapshot of the catalog and circulation counters.
+
+    Rows are written by the ``rollup_stats`` command. The ``*_removed`` counters
+    are bumped by signals when rows that existed at the start of the day are
+    deleted, since deletions leave no timestamp to count from. See books/stats.py.
+    """
+    date = models.DateField(unique=True)
+    total_books = models.IntegerField(default=0)
+    total_users = models.IntegerField(default=0)
+    total_members = models.IntegerField(default=0)  # Non-staff users
+    open_issues = models.IntegerField(default=0)
+    overdue_issues = models.IntegerField(default=0)
+    category_counts = models.JSONField(default=dict, blank=True)
+    books_added = models.IntegerField(default=0)
+    issues_opened = models.IntegerField(default=0)
+    issues_returned = models.IntegerField(default=0)
+    books_removed = models.IntegerField(default=0)
+    users_removed = models.IntegerField(default=0)
+    members_removed = models.IntegerField(default=0)
+    open_issues_removed = models.IntegerField(default=0)
+    overdue_issues_removed = models.IntegerField(default=0)
+    computed_at = models.DateTimeField(null=True, blank=True)  # Null until the day is rolled up
+
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = 'Daily stats'
+
+    def __str__(self):
+        return f"Stats for {self.date}"
+
+
+class DataVersion(models.Model):
+    """
+    Change counter per model, bumped by signals on every save and delete.
+    Report artifacts are keyed by these counters, so they are reused until
+    the data behind them changes.
+    """
+    name = models.CharField(max_length=100, unique=True)  # Model label, e.g. 'books.book'
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+
+    @classmethod
+    def bump(cls, name):
+        if not cls.objects.filter(name=name).update(version=models.F('version') + 1):
+            obj, created = cls.objects.get_or_create(name=name, defaults={'version': 1})
+            if not created:
+                cls.objects.filter(name=name).update(version=models.F('version') + 1)
+
+    @classmethod
+    def current(cls, names):
+        """``'name:version'`` pairs for ``names`` as one stable string."""
+        versions = dict(cls.objects.filter(name__in=names).values_list('name', 'version'))
+        return ';'.join(f"{name}:{versions.get(name, 0)}" for name in sorted(names))
+
+
+class ReportJob(models.Model):
+    """
+    A PDF report rendered in the background by ``run_report_jobs``.
+    A finished job's artifact is served again while ``data_version`` matches.
+    """
+    KIND_CHOICES = [
+        ('books', 'Books Report'),
+        ('issues', 'Book Issues Report'),
+        ('fines', 'Fines Report'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    data_version = models.CharField(max_length=255)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    artifact = models.CharField(max_length=255, blank=True)  # File name under REPORT_ARTIFACT_DIR
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['kind', 'data_version']),
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_kind_display()} ({self.status})"
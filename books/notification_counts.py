@@ -0,0 +1,156 @@
+"""
+Per-user notification read state: the unread counter and the read watermark.
+
+A notification is read when its ``is_read`` flag is set or it was created at
+or before the user's ``last_read_at`` watermark. With
+``NOTIFICATION_READ_TRACKING = 'watermark'``, "mark all as read" only moves
+the watermark (one row write) and ``is_read`` becomes a per-row override for
+notifications newer than it. With the default ``'rows'`` it flags every
+unread row, as before. The watermark is honoured in both modes, so switching
+between them is safe.
+
+Both values live on the ``NotificationCounter`` row and are served from the
+cache. The row is created from a ``COUNT`` the first time a user's state is
+needed. Writers adjust it inside their own transaction and drop the cached
+value once it commits.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Case, Count, F, Q, Value, When
+from django.utils import timezone
+
+
+def _key(user_id):
+    return f'notifications:state:{user_id}'
+
+
+def _invalidate(user_ids):
+    keys = [_key(user_id) for user_id in user_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def watermark_mode():
+    return getattr(settings, 'NOTIFICATION_READ_TRACKING', 'rows') == 'watermark'
+
+
+def _state(user_id):
+    """``(unread, last_read_at)`` for ``user_id``."""
+    key = _key(user_id)
+    state = cache.get(key)
+    if state is None:
+        state = _stored_state(user_id)
+        cache.set(key, state, getattr(settings, 'NOTIFICATION_COUNT_TIMEOUT', 3600))
+    return state
+
+
+def _stored_state(user_id):
+    from .models import NotificationCounter
+
+    state = NotificationCounter.objects.filter(pk=user_id).values_list('unread', 'last_read_at').first()
+    if state is None:
+        state = (refresh_unread(user_id), None)
+    return state
+
+
+def unread_count(user_id):
+    """Unread notifications for ``user_id``."""
+    return max(_state(user_id)[0], 0)
+
+
+def read_watermark(user_id):
+    """Notifications created at or before this are read (``None`` if never set)."""
+    return _state(user_id)[1]
+
+
+def unread_filter(watermark):
+    """``Q`` matching unread notifications for a user with ``watermark``."""
+    condition = Q(is_read=False)
+    if watermark is not None:
+        condition &= Q(created_at__gt=watermark)
+    return condition
+
+
+def with_read_state(queryset, user_id):
+    """Annotate a user's notifications with ``unread``, honouring the watermark."""
+    return queryset.annotate(unread=Case(
+        When(unread_filter(read_watermark(user_id)), then=Value(True)),
+        default=Value(False),
+        output_field=BooleanField(),
+    ))
+
+
+def refresh_unread(user_id):
+    """Recount ``user_id``'s unread notifications into the counter row."""
+    return refresh_unread_many([user_id])[user_id]
+
+
+def refresh_unread_many(user_ids):
+    """Recount unread notifications for ``user_ids`` in one query; returns ``{user_id: count}``."""
+    from .models import Notification, NotificationCounter
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    counts = dict(
+        Notification.objects.filter(user_id__in=user_ids, is_read=False)
+        .filter(Q(user__notification_counter__last_read_at__isnull=True)
+                | Q(created_at__gt=F('user__notification_counter__last_read_at')))
+        .order_by().values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    counts = {user_id: counts.get(user_id, 0) for user_id in user_ids}
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id, unread=count) for user_id, count in counts.items()],
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['unread'],
+    )
+    _invalidate(user_ids)
+    return counts
+
+
+def move_watermark(user_id, when=None):
+    """Mark everything up to ``when`` (default now) as read with a single row write."""
+    from .models import NotificationCounter
+
+    NotificationCounter.objects.update_or_create(
+        user_id=user_id,
+        defaults={'last_read_at': when or timezone.now(), 'unread': 0},
+    )
+    _invalidate([user_id])
+
+
+def adjust_unread(user_id, delta, created_at):
+    """
+    Add ``delta`` to ``user_id``'s counter for notifications created at
+    ``created_at``; ignored if the watermark already covers them. A missing
+    row is recounted on the next read.
+    """
+    _adjust([user_id], delta, created_at)
+
+
+def record_created(notifications):
+    """Count bulk-created ``notifications`` towards their users' counters."""
+    notifications = list(notifications)
+    if not notifications:
+        return
+    created_at = min(n.created_at for n in notifications)
+    users_by_delta = defaultdict(list)
+    for user_id, created in Counter(n.user_id for n in notifications).items():
+        users_by_delta[created].append(user_id)
+    for delta, user_ids in users_by_delta.items():
+        _adjust(user_ids, delta, created_at)
+
+
+def _adjust(user_ids, delta, created_at):
+    from .models import NotificationCounter
+
+    if not delta or not user_ids:
+        return
+    NotificationCounter.objects.filter(
+        Q(last_read_at__isnull=True) | Q(last_read_at__lt=created_at),
+        pk__in=user_ids,
+    ).update(unread=F('unread') + delta)
+    _invalidate(user_ids)
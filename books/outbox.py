@@ -0,0 +1,92 @@
+"""
+Delivery side of the email outbox.
+
+``claim_batch`` leases due rows so several ``drain_outbox`` workers can run
+side by side; ``deliver_batch`` sends them and records the outcome. Failed
+rows are retried with exponential backoff until ``OUTBOX_MAX_ATTEMPTS``.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.utils import timezone
+
+from .mail import PooledEmailBackend, deliver_each
+from .models import OutboxEmail
+
+# Rows stuck in 'sending' past this lease (crashed worker) are claimed again.
+LEASE_SECONDS = 300
+
+
+def claim_batch(size=100):
+    """Lease up to ``size`` due rows and return them."""
+    now = timezone.now()
+    lease_until = now + timedelta(seconds=LEASE_SECONDS)
+    due = OutboxEmail.objects.filter(status__in=['pending', 'sending'], available_at__lte=now)
+    if db_connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            rows = list(due.order_by('id').select_for_update(skip_locked=True)[:size])
+            if rows:
+                OutboxEmail.objects.filter(id__in=[row.id for row in rows]).update(
+                    status='sending',
+                    available_at=lease_until,
+                )
+        return rows
+    # Without row locks (SQLite) a read-then-write transaction fails with "database is
+    # locked" when two workers race, so claim with one conditional UPDATE instead; the
+    # lease stamp identifies the candidates this worker won
+    candidates = list(due.order_by('id').values_list('id', flat=True)[:size])
+    if not candidates:
+        return []
+    due.filter(id__in=candidates).update(status='sending', available_at=lease_until)
+    return list(OutboxEmail.objects.filter(
+        id__in=candidates, status='sending', available_at=lease_until,
+    ).order_by('id'))
+
+
+def _send_all(messages):
+    """Send through the pool when it is the active backend, else one by one."""
+    backend = get_connection(fail_silently=False)
+    if isinstance(backend, PooledEmailBackend):
+        return deliver_each(messages)
+    outcomes = []
+    for message in messages:
+        try:
+            outcomes.append(backend.send_messages([message]))
+        except Exception as exc:
+            outcomes.append(exc)
+    return outcomes
+
+
+def deliver_batch(rows):
+    """Send leased rows and persist each outcome. Returns ``(sent, failed)``."""
+    if not rows:
+        return 0, 0
+    max_attempts = getattr(settings, 'OUTBOX_MAX_ATTEMPTS', 5)
+    backoff = getattr(settings, 'OUTBOX_RETRY_BACKOFF', 60)
+    messages = [
+        EmailMessage(row.subject, row.body, row.from_email or None, row.recipients.split(','))
+        for row in rows
+    ]
+    outcomes = _send_all(messages)
+
+    now = timezone.now()
+    sent_ids = []
+    failed = 0
+    for row, outcome in zip(rows, outcomes):
+        if not isinstance(outcome, Exception):
+            sent_ids.append(row.id)
+            continue
+        failed += 1
+        row.attempts += 1
+        row.last_error = str(outcome)[:1000]
+        if row.attempts >= max_attempts:
+            row.status = 'failed'
+        else:
+            row.status = 'pending'
+            row.available_at = now + timedelta(seconds=backoff * (2 ** (row.attempts - 1)))
+        row.save(update_fields=['attempts', 'last_error', 'status', 'available_at'])
+    if sent_ids:
+        OutboxEmail.objects.filter(id__in=sent_ids).update(status='sent', sent_at=now)
+    return len(sent_ids), failed
@@ -0,0 +1,161 @@
+"""
+Keyset (cursor) pagination shared by the template views and the REST API.
+
+Pages are addressed by an opaque cursor holding the sort value and ``id`` of
+the row at the page boundary, and fetched with a ``WHERE (col, id) > (...)``
+style filter instead of ``OFFSET``. Deep pages therefore cost the same as the
+first one. Totals come from ``cached_count`` rather than a ``COUNT(*)`` per
+request.
+"""
+import base64
+import datetime
+import decimal
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connections
+from django.db.models import Q
+
+from . import model_cache
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class _CursorEncoder(json.JSONEncoder):
+    """Lossless encoding of boundary values (datetimes keep their microseconds)."""
+
+    def default(self, o):
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        if isinstance(o, decimal.Decimal):
+            return str(o)
+        return super().default(o)
+
+
+def encode_cursor(values, backwards=False):
+    payload = json.dumps({'v': values, 'b': int(backwards)}, cls=_CursorEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return payload['v'], bool(payload.get('b'))
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor('Invalid cursor') from exc
+
+
+class KeysetPage:
+    """One page of rows; iterates like a ``Paginator`` page."""
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor=None, previous_cursor=None, count=None):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def _boundary_filter(model, field, descending, values, backwards):
+    """Rows strictly after (or, going backwards, before) the ``(field, id)`` boundary."""
+    raw_value, raw_id = values
+    value = model._meta.get_field(field).to_python(raw_value)
+    row_id = int(raw_id)
+    forward_op = 'lt' if descending else 'gt'
+    backward_op = 'gt' if descending else 'lt'
+    op = backward_op if backwards else forward_op
+    if field == 'id':
+        return Q(**{f'id__{op}': row_id})
+    return Q(**{f'{field}__{op}': value}) | Q(**{field: value, f'id__{op}': row_id})
+
+
+def paginate(queryset, ordering='id', cursor=None, per_page=12):
+    """
+    Return a ``KeysetPage`` of ``queryset`` ordered by ``ordering`` (one field,
+    optionally prefixed with ``-``) with ``id`` as the tie-breaker.
+    Raises ``InvalidCursor`` for tampered or stale cursors.
+    """
+    descending = ordering.startswith('-')
+    field = ordering.lstrip('-')
+    model = queryset.model
+    order_by = [ordering] if field == 'id' else [ordering, '-id' if descending else 'id']
+    reverse_order_by = [o[1:] if o.startswith('-') else f'-{o}' for o in order_by]
+
+    backwards = False
+    if cursor:
+        values, backwards = decode_cursor(cursor)
+        try:
+            queryset = queryset.filter(_boundary_filter(model, field, descending, values, backwards))
+        except Exception as exc:
+            raise InvalidCursor('Invalid cursor') from exc
+
+    queryset = queryset.order_by(*(reverse_order_by if backwards else order_by))
+    rows = list(queryset[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    def boundary(row):
+        return [getattr(row, field), row.pk]
+
+    has_next = has_more if not backwards else True
+    has_previous = bool(cursor) if not backwards else has_more
+    return KeysetPage(
+        rows,
+        has_next=has_next and bool(rows),
+        has_previous=has_previous and bool(rows),
+        next_cursor=encode_cursor(boundary(rows[-1])) if rows and has_next else None,
+        previous_cursor=encode_cursor(boundary(rows[0]), backwards=True) if rows and has_previous else None,
+    )
+
+
+def cached_count(queryset, timeout=None):
+    """
+    Row count for ``queryset``, cached per distinct query for ``timeout`` seconds
+    (``PAGINATION_COUNT_TIMEOUT``) or until the model's cache generation moves
+    on (books/model_cache.py), whichever comes first. Unfiltered PostgreSQL tables larger than
+    ``PAGINATION_ESTIMATE_THRESHOLD`` rows use the planner's ``reltuples``
+    estimate instead of ``COUNT(*)``.
+    """
+    if timeout is None:
+        timeout = getattr(settings, 'PAGINATION_COUNT_TIMEOUT', 60)
+    queryset = queryset.order_by()
+    query = queryset.query
+    try:
+        sql, params = query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    generation = model_cache.generations([queryset.model])
+    key = 'count:' + hashlib.md5(f'{sql}|{params}|{generation}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is not None:
+        return count
+    connection = connections[queryset.db]
+    count = None
+    if connection.vendor == 'postgresql' and not query.where and not query.extra_tables:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE relname = %s', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        if row and row[0] >= getattr(settings, 'PAGINATION_ESTIMATE_THRESHOLD', 100000):
+            count = row[0]
+    if count is None:
+        count = queryset.count()
+    cache.set(key, count, timeout)
+    return count
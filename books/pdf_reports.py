@@ -0,0 +1,205 @@
+"""
+PDF report renderers used by the background report jobs (books/report_jobs.py).
+
+Each renderer streams rows from the database into page-sized tables (see
+books/pdf_stream.py) and writes a complete PDF to a binary file object, so
+memory use does not grow with the number of rows. ``REPORTS`` maps a
+``ReportJob.kind`` to its renderer, download name and the models whose
+``DataVersion`` counters decide when a cached artifact is out of date.
+"""
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, TableStyle, Paragraph, Spacer
+
+from .models import Book, BookIssue
+from .pdf_stream import FlowableStream, SpoolingCanvas, page_tables
+
+ROW_CHUNK_SIZE = 2000  # Rows fetched per database round trip
+
+
+def _heading(styles, subtitle):
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#14b8a6'),
+        spaceAfter=30,
+        alignment=TA_CENTER
+    )
+    yield Paragraph("Library Management System", title_style)
+    yield Paragraph(subtitle, styles['Heading2'])
+    yield Spacer(1, 0.3*inch)
+
+
+def _table_style(header_color, header_size, body_size):
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor(header_color)),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, -1), body_size),
+        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
+    ])
+
+
+def _render(out, subtitle, header, rows, style, summary, **page_options):
+    """
+    Build a report of a title block, ``rows`` as page-sized tables and the
+    lines returned by ``summary()``. Only the current page is held in memory.
+    """
+    doc = SimpleDocTemplate(out, pagesize=A4, pageCompression=1, **page_options)
+    styles = getSampleStyleSheet()
+
+    def flowables():
+        yield from _heading(styles, subtitle)
+        yield from page_tables(doc, header, rows, style)
+        yield Spacer(1, 0.3*inch)
+        yield Paragraph('<br/>'.join(summary()), styles['Normal'])
+
+    doc.build(FlowableStream(flowables()), canvasmaker=SpoolingCanvas)
+
+
+def _generated_on():
+    return f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+
+
+def render_books(out):
+    """All books."""
+    books = Book.objects.order_by('id').values_list(
+        'id', 'title', 'author', 'isbn', 'category__name', 'quantity', 'available', 'price'
+    )
+    rows = (
+        [
+            str(book_id),
+            title[:30],  # Truncate long titles
+            author[:20],
+            isbn,
+            category or 'N/A',
+            str(quantity),
+            str(available),
+            f'${price}'
+        ]
+        for book_id, title, author, isbn, category, quantity, available, price
+        in books.iterator(chunk_size=ROW_CHUNK_SIZE)
+    )
+
+    def summary():
+        return [f"Total Books: {Book.objects.count()}", _generated_on()]
+
+    _render(
+        out, "Books Report",
+        ['ID', 'Title', 'Author', 'ISBN', 'Category', 'Qty', 'Available', 'Price'],
+        rows, _table_style('#14b8a6', 10, 8), summary,
+    )
+
+
+def render_issues(out):
+    """All book issues with fine totals."""
+    issues = BookIssue.objects.order_by('id').values_list(
+        'id', 'user__username', 'book__title', 'issue_date', 'return_date', 'status', 'fine_amount'
+    )
+    rows = (
+        [
+            str(issue_id),
+            username[:15],
+            title[:25],
+            issue_date.strftime('%Y-%m-%d'),
+            return_date.strftime('%Y-%m-%d'),
+            status,
+            f'${fine_amount}'
+        ]
+        for issue_id, username, title, issue_date, return_date, status, fine_amount
+        in issues.iterator(chunk_size=ROW_CHUNK_SIZE)
+    )
+
+    def summary():
+        totals = BookIssue.objects.aggregate(
+            count=Count('id'),
+            total_fines=Sum('fine_amount'),
+            unpaid_fines=Sum('fine_amount', filter=Q(payment_status='unpaid')),
+        )
+        return [
+            f"Total Issues: {totals['count']}",
+            f"Total Fines: ${totals['total_fines'] or 0:.2f}",
+            f"Unpaid Fines: ${totals['unpaid_fines'] or 0:.2f}",
+            _generated_on(),
+        ]
+
+    _render(
+        out, "Book Issues Report",
+        ['ID', 'User', 'Book', 'Issue Date', 'Return Date', 'Status', 'Fine'],
+        rows, _table_style('#14b8a6', 9, 7), summary,
+        leftMargin=0.5*inch, rightMargin=0.5*inch,
+    )
+
+
+def render_fines(out):
+    """Issues that carry a fine."""
+    fined = BookIssue.objects.filter(fine_amount__gt=0)
+    issues = fined.order_by('id').values_list(
+        'id', 'user__username', 'book__title', 'fine_amount', 'payment_status', 'return_date'
+    )
+    rows = (
+        [
+            str(issue_id),
+            username[:20],
+            title[:30],
+            f'${fine_amount}',
+            payment_status,
+            return_date.strftime('%Y-%m-%d')
+        ]
+        for issue_id, username, title, fine_amount, payment_status, return_date
+        in issues.iterator(chunk_size=ROW_CHUNK_SIZE)
+    )
+
+    def summary():
+        totals = fined.aggregate(
+            total_fines=Sum('fine_amount'),
+            paid_fines=Sum('fine_amount', filter=Q(payment_status='paid')),
+            unpaid_fines=Sum('fine_amount', filter=Q(payment_status='unpaid')),
+            users=Count('user', distinct=True),
+        )
+        return [
+            f"Total Fines: ${totals['total_fines'] or 0:.2f}",
+            f"Paid Fines: ${totals['paid_fines'] or 0:.2f}",
+            f"Unpaid Fines: ${totals['unpaid_fines'] or 0:.2f}",
+            f"Total Users with Fines: {totals['users']}",
+            _generated_on(),
+        ]
+
+    _render(
+        out, "Fines Report",
+        ['ID', 'User', 'Book', 'Fine Amount', 'Payment Status', 'Return Date'],
+        rows, _table_style('#ef4444', 10, 8), summary,
+    )
+
+
+REPORTS = {
+    'books': {
+        'render': render_books,
+        'filename': 'books_report',
+        'models': ['books.book', 'books.category'],
+    },
+    'issues': {
+        'render': render_issues,
+        'filename': 'issues_report',
+        'models': ['books.bookissue', 'books.book', settings.AUTH_USER_MODEL.lower()],
+    },
+    'fines': {
+        'render': render_fines,
+        'filename': 'fines_report',
+        'models': ['books.bookissue', 'books.book', settings.AUTH_USER_MODEL.lower()],
+    },
+}
@@ -0,0 +1,139 @@
+"""
+Memory-bounded rendering of long tabular PDF reports with reportlab.
+
+Left alone, reportlab holds every flowable in a list, lays out one table of
+all rows, keeps each finished page's content stream in memory, and joins the
+whole file in memory on save. Here each of those is bounded instead:
+
+* ``FlowableStream`` feeds ``doc.build`` from a generator, one flowable at a time.
+* ``page_tables`` cuts rows into tables sized to the space left in the current
+  frame, so no table ever needs splitting across pages.
+* ``SpoolingCanvas`` compresses each page's content when the page is finished
+  and parks it in a temporary file. On save it writes objects straight to the
+  output file instead of building the document in memory.
+
+What remains in memory per page is the small page dictionary. Written
+against reportlab 4.0 (pinned in requirements.txt).
+"""
+import tempfile
+import zlib
+from itertools import chain, islice
+
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFName, PDFStream
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import Table
+
+PROBE_ROWS = 40  # Rows used to measure column widths and row height
+
+
+class FlowableStream(list):
+    """A list for ``doc.build`` that pulls the next flowable from ``source`` on demand."""
+
+    def __init__(self, source):
+        super().__init__()
+        self._source = iter(source)
+
+    def __len__(self):
+        if self._source is not None and not list.__len__(self):
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+
+def page_tables(doc, header, rows, style):
+    """
+    Yield tables of ``rows`` (with ``header`` repeated on each), each holding as
+    many rows as fit in what is left of the current frame. Column widths and row
+    height are measured once on the first ``PROBE_ROWS`` rows and reused.
+    """
+    rows = iter(rows)
+    probe_rows = list(islice(rows, PROBE_ROWS))
+    probe = Table([header] + probe_rows, repeatRows=1)
+    probe.setStyle(style)
+    probe.wrap(doc.width, doc.height)
+    col_widths = probe._colWidths
+    header_height = probe._rowHeights[0]
+    row_height = max(probe._rowHeights[1:] or [header_height])
+    if not probe_rows:
+        yield probe
+        return
+
+    rows = chain(probe_rows, rows)
+    while True:
+        frame = doc.frame
+        count = int((frame._y - frame._y1p - header_height - 1) // row_height)
+        if count < 1:
+            count = int((frame._aH - header_height - 1) // row_height)
+        chunk = list(islice(rows, max(1, count)))
+        if not chunk:
+            return
+        table = Table([header] + chunk, colWidths=col_widths, repeatRows=1)
+        table.setStyle(style)
+        yield table
+
+
+class _SpooledPageContent(PDFStream):
+    """A page content stream that stays in the spool file until it is written out."""
+
+    def __init__(self, spool, offset, length):
+        super().__init__(content=b'')
+        self.dictionary['Filter'] = PDFArray([PDFName('FlateDecode')])
+        self.spool = spool
+        self.offset = offset
+        self.length = length
+
+    def format(self, document):
+        _write_through(document)
+        self.spool.seek(self.offset)
+        self.content = self.spool.read(self.length)
+        try:
+            return super().format(document)
+        finally:
+            self.content = b''
+
+
+def _write_through(document):
+    """
+    Point reportlab's output collector at the destination file, flushing what it
+    has gathered so far. Offsets are still counted by the collector, so the
+    cross-reference table stays correct.
+    """
+    collector = document.__accum__
+    out = document._spool_output
+    if collector.write != out.write:
+        for chunk in collector.strings:
+            out.write(chunk)
+        collector.strings.clear()
+        collector.write = out.write
+
+
+class SpoolingCanvas(Canvas):
+    """Canvas that spools finished pages to a temporary file; pass as ``canvasmaker``."""
+
+    def __init__(self, filename, *args, **kwargs):
+        if not hasattr(filename, 'write'):
+            raise TypeError('SpoolingCanvas needs an open binary file object')
+        super().__init__(filename, *args, **kwargs)
+        self._spool = tempfile.TemporaryFile()
+        self._doc._spool_output = filename
+
+    def showPage(self):
+        pages = self._doc.Pages.pages
+        first_new = len(pages)
+        super().showPage()
+        for page in pages[first_new:]:
+            if page.stream and not page.Contents:
+                data = page.stream
+                data = zlib.compress(data.encode('utf8') if isinstance(data, str) else data)
+                offset = self._spool.seek(0, 2)
+                self._spool.write(data)
+                page.Contents = _SpooledPageContent(self._spool, offset, len(data))
+                page.stream = None
+
+    def save(self):
+        try:
+            super().save()
+        finally:
+            self._spool.close()
@@ -0,0 +1,331 @@
+"""
+Reminder engine used by the ``send_notifications`` management command.
+
+All active loans inside the reminder window are read in keyset-ordered chunks,
+grouped into buckets in memory and written back with batched inserts. Every
+reminder is recorded in the ``NotificationDispatch`` ledger so a re-run on the
+same day skips loans that were already handled. Buckets marked ``collapse``
+keep one notification per loan that is refreshed each day instead of adding
+a new row.
+
+Users who chose digest reminder emails get no per-loan emails. Instead,
+``queue_digests`` runs at the end of the run and queues one email per user
+listing all of their reminders for the day. The ledger rows it covers are
+flagged in the same transaction, so a resumed run never sends a digest twice.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import BookIssue, Notification, NotificationDispatch, OutboxEmail
+from .notification_counts import record_created, refresh_unread_many
+
+
+# Bucket order matters: it is the order used for processing and the summary.
+BUCKETS = [
+    {
+        'key': 'due_in_two',
+        'label': '2 days before',
+        'notification_type': 'due_soon',
+        'style': 'SUCCESS',
+        'summary_style': 'SUCCESS',
+        'title': 'Book Due in 2 Days: {title}',
+        'message': 'Please return "{title}" by {due} to avoid fines.',
+        'subject': 'Reminder: Book "{title}" Due in 2 Days',
+        'body': """
+Hello {username},
+
+This is a reminder that the book "{title}" is due for return in 2 days ({due}).
+
+Please plan to return it on time to avoid late fees (₹5 per day).
+
+Thank you,
+Library Management System
+""",
+        'log': '✓ Sent 2-day reminder to {email}',
+        'digest_heading': 'Due in 2 days',
+        'digest_line': '"{title}" is due in 2 days ({due}).',
+    },
+    {
+        'key': 'due_tomorrow',
+        'label': '1 day before',
+        'notification_type': 'due_soon',
+        'style': 'WARNING',
+        'summary_style': 'SUCCESS',
+        'title': '⚠️ Due Tomorrow: {title}',
+        'message': 'URGENT: Return "{title}" by tomorrow ({due}) to avoid ₹5/day fine.',
+        'subject': '⚠️ Urgent: Book "{title}" Due Tomorrow',
+        'body': """
+Hello {username},
+
+URGENT REMINDER: The book "{title}" is due for return TOMORROW ({due}).
+
+Please return it on time to avoid late fees (₹5 per day starting the next day).
+
+Thank you,
+Library Management System
+""",
+        'log': '✓ Sent urgent 1-day reminder to {email}',
+        'digest_heading': 'Due tomorrow',
+        'digest_line': '"{title}" is due TOMORROW ({due}).',
+    },
+    {
+        'key': 'due_today',
+        'label': 'Due today',
+        'notification_type': 'due_soon',
+        'style': 'ERROR',
+        'summary_style': 'ERROR',
+        'title': '🚨 DUE TODAY: {title}',
+        'message': 'FINAL NOTICE: Return "{title}" TODAY ({due}) to avoid fines!',
+        'subject': '🚨 FINAL NOTICE: Book "{title}" Due TODAY',
+        'body': """
+Hello {username},
+
+FINAL NOTICE: The book "{title}" is due for return TODAY ({due}).
+
+Please return it before the library closes today to avoid late fees (₹5 per day starting tomorrow).
+
+Thank you,
+Library Management System
+""",
+        'log': '✓ Sent FINAL notice to {email}',
+        'digest_heading': 'Due today',
+        'digest_line': '"{title}" is due TODAY ({due}).',
+    },
+    {
+        'key': 'overdue',
+        'label': 'Overdue',
+        'notification_type': 'overdue',
+        'style': 'ERROR',
+        'summary_style': 'ERROR',
+        'title': '⛔ OVERDUE: {title}',
+        'message': '{days_overdue} days overdue. Fine: ₹{fine}. Please return immediately to avoid additional charges!',
+        'subject': '⛔ OVERDUE NOTICE: Book "{title}" - ₹{fine} Fine',
+        'body': """
+Hello {username},
+
+The book "{title}" is now {days_overdue} day(s) OVERDUE.
+
+Current fine: ₹{fine} (₹5 per day)
+Return due date was: {due}
+
+Please return the book IMMEDIATELY to avoid further charges.
+
+Thank you,
+Library Management System
+""",
+        'log': '✓ Sent overdue notice to {email} (₹{fine})',
+        'digest_heading': 'Overdue',
+        'digest_line': '"{title}" is {days_overdue} day(s) overdue (was due {due}). Fine so far: ₹{fine}.',
+        'collapse': True,
+    },
+]
+
+BUCKETS_BY_KEY = {bucket['key']: bucket for bucket in BUCKETS}
+
+FINE_PER_DAY = 5
+
+# Columns pulled for every active loan; plain tuples keep the scan cheap.
+LOAN_FIELDS = ('id', 'return_date', 'book__title', 'user_id', 'user__username', 'user__email', 'user__reminder_emails')
+
+
+def active_loans(today, after_id=0):
+    """Unreturned loans due on or before ``today + 2 days`` with ``id > after_id``."""
+    return BookIssue.objects.filter(
+        id__gt=after_id,
+        actual_return_date__isnull=True,
+        status__in=['approved', 'active'],
+        return_date__date__lte=today + timedelta(days=2),
+    ).order_by('id').values_list(*LOAN_FIELDS)
+
+
+def loan_chunks(today, after_id=0, size=500):
+    """Yield lists of loan rows, one keyset page at a time, starting after ``after_id``."""
+    while True:
+        rows = list(active_loans(today, after_id)[:size])
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def bucket_for(return_date, today):
+    """Return the bucket key for a due date, or ``None`` if outside the window."""
+    days_left = (timezone.localtime(return_date).date() - today).days
+    if days_left == 2:
+        return 'due_in_two'
+    if days_left == 1:
+        return 'due_tomorrow'
+    if days_left == 0:
+        return 'due_today'
+    if days_left < 0:
+        return 'overdue'
+    return None
+
+
+def loan_context(row, today):
+    """Template values shared by the notification and email of a loan row."""
+    issue_id, return_date, title, user_id, username, email, reminder_emails = row
+    due_date = timezone.localtime(return_date).date()
+    days_overdue = max((today - due_date).days, 0)
+    return {
+        'issue_id': issue_id,
+        'user_id': user_id,
+        'title': title,
+        'username': username,
+        'email': email,
+        'due': return_date.strftime('%B %d, %Y'),
+        'days_overdue': days_overdue,
+        'fine': days_overdue * FINE_PER_DAY,
+        'digest': reminder_emails == 'digest',
+    }
+
+
+def group_loans(rows, today):
+    """Split loan rows into ``{bucket_key: [context, ...]}`` in a single pass."""
+    grouped = {bucket['key']: [] for bucket in BUCKETS}
+    for row in rows:
+        key = bucket_for(row[1], today)
+        if key is not None:
+            grouped[key].append(loan_context(row, today))
+    return grouped
+
+
+def drop_dispatched(grouped, today):
+    """Remove loans whose reminder for ``today`` is already in the ledger."""
+    issue_ids = [ctx['issue_id'] for items in grouped.values() for ctx in items]
+    if not issue_ids:
+        return grouped
+    done = set(NotificationDispatch.objects.filter(
+        issue_id__in=issue_ids, run_date=today,
+    ).values_list('issue_id', 'kind'))
+    if not done:
+        return grouped
+    return {
+        key: [ctx for ctx in items if (ctx['issue_id'], key) not in done]
+        for key, items in grouped.items()
+    }
+
+
+def build_dispatch(bucket, ctx, today):
+    """Unsaved ledger row recording that ``bucket`` was sent for a loan today."""
+    return NotificationDispatch(issue_id=ctx['issue_id'], kind=bucket['key'], run_date=today)
+
+
+def build_notification(bucket, ctx):
+    """Unsaved ``Notification`` for one loan, ready for ``bulk_create``."""
+    return Notification(
+        user_id=ctx['user_id'],
+        notification_type=bucket['notification_type'],
+        title=bucket['title'].format(**ctx),
+        message=bucket['message'].format(**ctx),
+        link='/my-books/',
+        collapse_key=f"{bucket['key']}:{ctx['issue_id']}" if bucket.get('collapse') else None,
+    )
+
+
+def save_notifications(notifications, batch_size=None):
+    """
+    Write ``notifications`` built by ``build_notification``. One with a
+    ``collapse_key`` that already has a row refreshes that row (new text,
+    unread, moved to the top) instead of adding another.
+    """
+    keyed = {n.collapse_key: n for n in notifications if n.collapse_key}
+    existing = {
+        n.collapse_key: n for n in Notification.objects.filter(collapse_key__in=list(keyed))
+    } if keyed else {}
+    refreshed = []
+    for key, current in existing.items():
+        fresh = keyed[key]
+        current.title = fresh.title
+        current.message = fresh.message
+        current.created_at = fresh.created_at
+        current.is_read = False
+        refreshed.append(current)
+    Notification.objects.bulk_update(
+        refreshed, ['title', 'message', 'created_at', 'is_read'], batch_size=batch_size,
+    )
+    created = Notification.objects.bulk_create(
+        [n for n in notifications if n.collapse_key not in existing],
+        batch_size=batch_size,
+    )
+    # A refreshed row may or may not have been counted as unread before, so recount those users
+    refreshed_users = {n.user_id for n in refreshed}
+    record_created([n for n in created if n.user_id not in refreshed_users])
+    refresh_unread_many(refreshed_users)
+    return created, refreshed
+
+
+def build_email(bucket, ctx, connection=None):
+    """Unsent ``EmailMessage`` for one loan."""
+    return EmailMessage(
+        bucket['subject'].format(**ctx),
+        bucket['body'].format(**ctx),
+        settings.EMAIL_HOST_USER,
+        [ctx['email']],
+        connection=connection,
+    )
+
+
+def build_digest(username, email, reminders):
+    """Unsaved ``OutboxEmail`` listing one user's ``[(bucket, ctx), ...]`` reminders."""
+    sections = []
+    for bucket in BUCKETS:
+        lines = [bucket['digest_line'].format(**ctx) for item_bucket, ctx in reminders if item_bucket is bucket]
+        if lines:
+            sections.append({'heading': bucket['digest_heading'], 'lines': lines})
+    overdue = sum(1 for bucket, _ in reminders if bucket['key'] == 'overdue')
+    count = len(reminders)
+    subject = f'📚 Library Reminder: {count} book{"s" if count != 1 else ""} due or overdue'
+    if overdue:
+        subject = f'⛔ Library Reminder: {overdue} overdue, {count} in total'
+    body = render_to_string('emails/reminder_digest.txt', {
+        'username': username,
+        'sections': sections,
+        'fine_per_day': FINE_PER_DAY,
+    })
+    return OutboxEmail(subject=subject, body=body, from_email=settings.EMAIL_HOST_USER or '', recipients=email)
+
+
+def queue_digests(today, batch_size=500):
+    """
+    Queue one digest email per digest-mode user for today's ledger rows not yet
+    covered by a digest, ``batch_size`` users per transaction. Returns the
+    number of digests queued; ``drain_outbox`` delivers them.
+    """
+    pending = NotificationDispatch.objects.filter(
+        run_date=today,
+        in_digest=False,
+        issue__user__reminder_emails='digest',
+    ).exclude(issue__user__email='')
+    queued = 0
+    after_user = 0
+    while True:
+        user_ids = list(
+            pending.filter(issue__user_id__gt=after_user).order_by('issue__user_id')
+            .values_list('issue__user_id', flat=True).distinct()[:batch_size]
+        )
+        if not user_ids:
+            return queued
+        rows = pending.filter(issue__user_id__in=user_ids).order_by('issue__user_id', 'issue_id').values_list(
+            'pk', 'kind', *(f'issue__{field}' for field in LOAN_FIELDS)
+        )
+        by_user = {}
+        for pk, kind, *loan in rows:
+            ctx = loan_context(loan, today)
+            by_user.setdefault(ctx['user_id'], []).append((pk, BUCKETS_BY_KEY[kind], ctx))
+        with transaction.atomic():
+            OutboxEmail.objects.bulk_create([
+                build_digest(items[0][2]['username'], items[0][2]['email'],
+                             [(bucket, ctx) for _, bucket, ctx in items])
+                for items in by_user.values()
+            ])
+            NotificationDispatch.objects.filter(
+                pk__in=[pk for items in by_user.values() for pk, _, _ in items]
+            ).update(in_digest=True)
+        queued += len(by_user)
+        after_user = user_ids[-1]
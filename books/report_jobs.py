@@ -0,0 +1,114 @@
+"""
+Background PDF report jobs.
+
+``request_report`` returns the finished job for the current data version if
+one exists, otherwise the pending/running job for it (creating one if
+needed). The ``run_report_jobs`` worker claims pending jobs and renders them
+into ``REPORT_ARTIFACT_DIR``. Repeated downloads of an unchanged report are
+served from that file, and older artifacts of the same kind are pruned once a
+newer one is finished.
+"""
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection as db_connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DataVersion, ReportJob
+from .pdf_reports import REPORTS
+
+# Jobs stuck in 'running' longer than this (crashed worker) are claimed again.
+LEASE_SECONDS = 1800
+
+
+def artifact_dir():
+    return getattr(settings, 'REPORT_ARTIFACT_DIR', os.path.join(settings.BASE_DIR, 'var', 'reports'))
+
+
+def artifact_path(job):
+    return os.path.join(artifact_dir(), job.artifact)
+
+
+def data_version(kind):
+    return DataVersion.current(REPORTS[kind]['models'])
+
+
+def request_report(kind, user=None):
+    """The job answering a request for ``kind`` at the current data version."""
+    version = data_version(kind)
+    jobs = ReportJob.objects.filter(kind=kind, data_version=version)
+    done = jobs.filter(status='done').order_by('-finished_at').first()
+    if done and os.path.exists(artifact_path(done)):
+        return done
+    active = jobs.filter(status__in=['pending', 'running']).order_by('created_at').first()
+    if active:
+        return active
+    return ReportJob.objects.create(kind=kind, data_version=version, requested_by=user)
+
+
+def claim_job():
+    """Lease the oldest pending (or abandoned running) job, or return ``None``."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=LEASE_SECONDS)
+    claimable = ReportJob.objects.filter(Q(status='pending') | Q(status='running', started_at__lt=stale))
+    if db_connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = claimable.order_by('created_at').select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = 'running'
+            job.started_at = now
+            job.save(update_fields=['status', 'started_at'])
+        return job
+    # Without row locks (SQLite) claim with a conditional UPDATE; a rowcount of 0 means
+    # another worker got the job first, so try the next one
+    for job_id in claimable.order_by('created_at').values_list('id', flat=True)[:10]:
+        if claimable.filter(pk=job_id).update(status='running', started_at=now):
+            return ReportJob.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Render ``job`` to its artifact file and record the outcome."""
+    report = REPORTS[job.kind]
+    os.makedirs(artifact_dir(), exist_ok=True)
+    name = f"{job.kind}-{job.pk}.pdf"
+    final_path = os.path.join(artifact_dir(), name)
+    partial_path = final_path + '.part'
+    try:
+        with open(partial_path, 'wb') as out:
+            report['render'](out)
+        os.replace(partial_path, final_path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = 'failed'
+        job.error = traceback.format_exc()[-2000:]
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+    job.status = 'done'
+    job.artifact = name
+    job.error = ''
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'artifact', 'error', 'finished_at'])
+    prune(job.kind, keep=job)
+    return job
+
+
+def prune(kind, keep):
+    """Delete finished jobs of ``kind`` older than ``keep``, with their artifacts."""
+    older = ReportJob.objects.filter(kind=kind, status='done', finished_at__lt=keep.finished_at).exclude(pk=keep.pk)
+    for job in older:
+        path = artifact_path(job)
+        if job.artifact and os.path.exists(path):
+            os.remove(path)
+    older.delete()
+
+
+def download_name(job):
+    stamp = timezone.localtime(job.finished_at or job.created_at).strftime('%Y%m%d')
+    return f"{REPORTS[job.kind]['filename']}_{stamp}.pdf"
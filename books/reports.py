@@ -0,0 +1,156 @@
+"""
+Aggregate queries behind the admin reports.
+
+Every figure is computed by the database with grouped aggregates, so a report
+costs a fixed number of queries however much circulation history there is.
+Outstanding fines use the same rule as ``BookIssue.calculated_fine`` (whole
+overdue days x ``FINE_PER_DAY``), evaluated in SQL from ``return_date``.
+"""
+from datetime import date, datetime, time, timedelta
+
+from django.db.models import Case, Count, Func, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+
+from .models import Book, BookIssue
+from .reminders import FINE_PER_DAY
+
+
+class OverdueDays(Func):
+    """Whole days elapsed from a datetime column to ``now`` (MySQL by default)."""
+    output_field = IntegerField()
+
+    def __init__(self, expression, now, **extra):
+        super().__init__(expression, Value(now), **extra)
+
+    def _compile(self, compiler):
+        column, now = self.get_source_expressions()
+        return compiler.compile(column), compiler.compile(now)
+
+    def as_sql(self, compiler, connection, **extra_context):
+        (column_sql, column_params), (now_sql, now_params) = self._compile(compiler)
+        return f'TIMESTAMPDIFF(DAY, {column_sql}, {now_sql})', (*column_params, *now_params)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        (column_sql, column_params), (now_sql, now_params) = self._compile(compiler)
+        return f'CAST(julianday({now_sql}) - julianday({column_sql}) AS INTEGER)', (*now_params, *column_params)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        (column_sql, column_params), (now_sql, now_params) = self._compile(compiler)
+        return (
+            f'FLOOR(EXTRACT(EPOCH FROM ({now_sql} - {column_sql})) / 86400)::integer',
+            (*now_params, *column_params),
+        )
+
+
+def outstanding_fine(now):
+    """Fine accrued so far on an unreturned overdue loan, else 0."""
+    return Case(
+        When(
+            actual_return_date__isnull=True, return_date__lt=now,
+            then=OverdueDays('return_date', now) * FINE_PER_DAY,
+        ),
+        default=Value(0),
+        output_field=IntegerField(),
+    )
+
+
+def default_window(today=None):
+    """The last 12 calendar months, ending today."""
+    end = today or timezone.localdate()
+    year, month = end.year, end.month - 11
+    if month < 1:
+        year, month = year - 1, month + 12
+    return date(year, month, 1), end
+
+
+def parse_window(params, today=None):
+    """``(start_date, end_date)`` from ``start_date``/``end_date`` query parameters."""
+    parsed = {}
+    for key in ('start_date', 'end_date'):
+        try:
+            parsed[key] = datetime.strptime(params.get(key, ''), '%Y-%m-%d').date()
+        except ValueError:
+            pass
+    end = parsed.get('end_date') or default_window(today)[1]
+    start = parsed.get('start_date') or default_window(end)[0]
+    if start > end:
+        start, end = end, start
+    return start, end
+
+
+def window_bounds(start, end):
+    """Aware ``[start, end + 1 day)`` datetimes covering both dates in full."""
+    tz = timezone.get_current_timezone()
+    return (
+        timezone.make_aware(datetime.combine(start, time.min), tz),
+        timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min), tz),
+    )
+
+
+def month_starts(start, end):
+    """First day of every month touched by ``[start, end]``."""
+    months = []
+    current = start.replace(day=1)
+    while current <= end:
+        months.append(current)
+        current = (current + timedelta(days=32)).replace(day=1)
+    return months
+
+
+def circulation_summary(now=None):
+    """Active loans, overdue loans and outstanding fines in one query."""
+    now = now or timezone.now()
+    return BookIssue.objects.aggregate(
+        active_issues=Count('id', filter=Q(status__in=['approved', 'active'], actual_return_date__isnull=True)),
+        overdue_issues=Count('id', filter=Q(actual_return_date__isnull=True, return_date__lt=now)),
+        total_fines=Coalesce(Sum(outstanding_fine(now)), 0),
+    )
+
+
+def monthly_activity(start, end, now=None):
+    """
+    Issues made and outstanding fines per month of ``[start, end]``, as
+    ``(labels, issue_counts, fines)`` with empty months filled with zeros.
+    """
+    now = now or timezone.now()
+    lower, upper = window_bounds(start, end)
+    rows = (
+        BookIssue.objects
+        .filter(issue_date__gte=lower, issue_date__lt=upper)
+        .annotate(month=TruncMonth('issue_date'))
+        .values('month')
+        .annotate(issues=Count('id'), fines=Coalesce(Sum(outstanding_fine(now)), 0))
+        .order_by('month')
+    )
+    by_month = {}
+    for row in rows:
+        month = row['month']
+        if isinstance(month, datetime):
+            month = timezone.localtime(month).date() if timezone.is_aware(month) else month.date()
+        by_month[month] = row
+    labels, issues, fines = [], [], []
+    for month in month_starts(start, end):
+        row = by_month.get(month, {})
+        labels.append(month.strftime('%b %Y'))
+        issues.append(row.get('issues', 0))
+        fines.append(float(row.get('fines', 0)))
+    return labels, issues, fines
+
+
+def category_distribution(category_counts, limit=10):
+    """``(labels, counts)`` of the largest categories in a ``{name: count}`` mapping."""
+    largest = sorted(category_counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+    return [name for name, _ in largest], [count for _, count in largest]
+
+
+def top_books(start, end, limit=10):
+    """Books issued most often within ``[start, end]``, annotated with ``borrow_count``."""
+    lower, upper = window_bounds(start, end)
+    in_window = Q(bookissue__issue_date__gte=lower, bookissue__issue_date__lt=upper)
+    return (
+        Book.objects
+        .annotate(borrow_count=Count('bookissue', filter=in_window))
+        .filter(borrow_count__gt=0)
+        .order_by('-borrow_count', 'title')[:limit]
+    )
@@ -0,0 +1,267 @@
+"""
+Notification retention.
+
+``prune`` deletes notifications older than their type's TTL
+(``NOTIFICATION_RETENTION_DAYS``) in small batches, each in its own short
+transaction with a pause in between, so the table is never locked for long.
+Unread counters of the affected users are recounted per batch. Expired
+broadcasts and old reminder-ledger rows are removed the same way.
+
+On PostgreSQL the notification table can optionally be range-partitioned by
+month on ``created_at`` (``partition_notifications``). ``prune`` then drops
+whole partitions older than the longest TTL before the batched deletes. Rows
+for months without a partition yet land in a default partition and are moved
+into the month's partition when it is created.
+"""
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Broadcast, Notification, NotificationDispatch
+from .notification_counts import refresh_unread_many
+
+# Days kept per notification type; None keeps them forever
+DEFAULT_RETENTION_DAYS = {
+    'issue_approved': 90,
+    'issue_rejected': 90,
+    'due_soon': 14,
+    'overdue': 30,
+    'returned': 90,
+    'fine_added': 365,
+    'fine_paid': 365,
+    'hold_ready': 30,
+    'system': 90,
+}
+
+TABLE = Notification._meta.db_table
+
+
+def retention_days():
+    return {**DEFAULT_RETENTION_DAYS, **getattr(settings, 'NOTIFICATION_RETENTION_DAYS', {})}
+
+
+def _batches(queryset, batch_size, pause, fields=('pk',)):
+    """Yield ``values_list`` batches of ``queryset`` until it is empty, pausing between them."""
+    first = True
+    while True:
+        if not first and pause:
+            time.sleep(pause)
+        first = False
+        batch = list(queryset.values_list(*fields)[:batch_size])
+        if not batch:
+            return
+        yield batch
+
+
+def prune_notifications(now=None, batch_size=1000, pause=0.1, dry_run=False):
+    """Delete expired notifications; returns ``{notification_type: deleted}``."""
+    now = now or timezone.now()
+    deleted = {}
+    for notification_type, days in retention_days().items():
+        if days is None:
+            continue
+        expired = Notification.objects.filter(
+            notification_type=notification_type,
+            created_at__lt=now - timedelta(days=days),
+        )
+        if dry_run:
+            deleted[notification_type] = expired.count()
+            continue
+        deleted[notification_type] = 0
+        for batch in _batches(expired, batch_size, pause, ('pk', 'user_id', 'is_read')):
+            with transaction.atomic():
+                count, _ = Notification.objects.filter(pk__in=[pk for pk, _, _ in batch]).delete()
+                refresh_unread_many({user_id for _, user_id, is_read in batch if not is_read})
+            deleted[notification_type] += count
+    return deleted
+
+
+def prune_broadcasts(now=None, dry_run=False):
+    """Delete broadcasts past their expiry (they are no longer shown)."""
+    expired = Broadcast.objects.filter(expires_at__lt=now or timezone.now())
+    if dry_run:
+        return expired.count()
+    count = 0
+    for broadcast in expired:
+        broadcast.delete()
+        count += 1
+    return count
+
+
+def prune_ledger(now=None, batch_size=1000, pause=0.1, dry_run=False):
+    """Delete reminder-ledger rows older than ``NOTIFICATION_LEDGER_RETENTION_DAYS``."""
+    now = now or timezone.now()
+    days = getattr(settings, 'NOTIFICATION_LEDGER_RETENTION_DAYS', 30)
+    old = NotificationDispatch.objects.filter(run_date__lt=timezone.localdate(now) - timedelta(days=days))
+    if dry_run:
+        return old.count()
+    count = 0
+    for batch in _batches(old, batch_size, pause):
+        deleted, _ = NotificationDispatch.objects.filter(pk__in=[pk for pk, in batch]).delete()
+        count += deleted
+    return count
+
+
+# PostgreSQL monthly partitions ---------------------------------------------
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (day.replace(day=1) + timedelta(days=32)).replace(day=1)
+
+
+def _partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def _bound(month):
+    """SQL literal for midnight UTC at the start of ``month``."""
+    return f"'{month:%Y-%m-%d} 00:00:00+00'"
+
+
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE relname = %s", [TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def partitions():
+    """``[(name, upper bound or None for the default partition)]`` of the notification table."""
+    with connection.cursor() as cursor:
+        cursor.execute("""
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid)
+            FROM pg_inherits
+            JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE parent.relname = %s
+        """, [TABLE])
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        upper = None
+        if "TO ('" in bound:
+            upper = datetime.fromisoformat(bound.split("TO ('")[1].split("'")[0])
+            if timezone.is_naive(upper):
+                upper = upper.replace(tzinfo=dt_timezone.utc)
+        result.append((name, upper))
+    return result
+
+
+DEFAULT_PARTITION = f'{TABLE}_p_default'
+
+
+def _create_partition(cursor, name, month, default):
+    """
+    Create the partition for ``month``; returns how many rows it took over
+    from the ``default`` partition. PostgreSQL refuses a new partition while
+    the default one holds rows in its range, so those rows are moved across
+    with the default detached meanwhile.
+    """
+    lower, upper = _bound(month), _bound(_next_month(month))
+    in_range = f'created_at >= {lower} AND created_at < {upper}'
+    create = f'CREATE TABLE "{name}" PARTITION OF "{TABLE}" FOR VALUES FROM ({lower}) TO ({upper})'
+    if default:
+        cursor.execute(f'SELECT EXISTS (SELECT 1 FROM "{default}" WHERE {in_range})')
+        if cursor.fetchone()[0]:
+            cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{default}"')
+            cursor.execute(create)
+            cursor.execute(f'INSERT INTO "{name}" SELECT * FROM "{default}" WHERE {in_range}')
+            moved = cursor.rowcount
+            cursor.execute(f'DELETE FROM "{default}" WHERE {in_range}')
+            cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{default}" DEFAULT')
+            return moved
+    cursor.execute(create)
+    return 0
+
+
+def ensure_partitions(months_ahead=3, today=None):
+    """
+    Create monthly partitions from the current month to ``months_ahead``
+    months out. Returns ``[(name, rows moved from the default partition)]``
+    for the partitions created.
+    """
+    month = _month_start(today or timezone.localdate())
+    existing = {name for name, _ in partitions()}
+    default = DEFAULT_PARTITION if DEFAULT_PARTITION in existing else None
+    created = []
+    for _ in range(months_ahead + 1):
+        name = _partition_name(month)
+        if name not in existing:
+            with transaction.atomic(), connection.cursor() as cursor:
+                created.append((name, _create_partition(cursor, name, month, default)))
+        month = _next_month(month)
+    return created
+
+
+def convert_to_partitions(months_ahead=3, today=None):
+    """
+    Turn the notification table into a table partitioned by month on
+    ``created_at``. Existing rows stay where they are, attached as the
+    partition for everything before the current month. The primary key
+    becomes ``(id, created_at)``, since PostgreSQL requires the partition key
+    in every unique constraint.
+    """
+    month = _month_start(today or timezone.localdate())
+    legacy = f'{TABLE}_p_legacy'
+    user_table = Notification._meta.get_field('user').related_model._meta.db_table
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE "{TABLE}" IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) + 1 FROM "{TABLE}"')
+        next_id = cursor.fetchone()[0]
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{legacy}"')
+        cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE "{legacy}" ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'CREATE TABLE "{TABLE}" (LIKE "{legacy}" INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)')
+        cursor.execute(f'CREATE SEQUENCE "{TABLE}_part_id_seq" START {next_id} OWNED BY "{TABLE}".id')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ALTER COLUMN id SET DEFAULT nextval(\'"{TABLE}_part_id_seq"\')')
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, created_at)')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ADD FOREIGN KEY (user_id) REFERENCES "{user_table}" (id) '
+            'DEFERRABLE INITIALLY DEFERRED'
+        )
+        for index, columns in [
+            ('user_read', 'user_id, is_read'),
+            ('created', 'created_at DESC'),
+            ('type_created', 'notification_type, created_at'),
+            ('collapse', 'collapse_key'),
+        ]:
+            cursor.execute(f'CREATE INDEX "{TABLE}_{index}_part" ON "{TABLE}" ({columns})')
+        cursor.execute(
+            f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{legacy}" FOR VALUES FROM (MINVALUE) TO ({_bound(month)})'
+        )
+        cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+        ensure_partitions(months_ahead, today)
+
+
+def drop_expired_partitions(now=None, dry_run=False):
+    """
+    Drop monthly partitions that lie wholly before the longest retention
+    period; returns the dropped partition names.
+    """
+    days = [d for d in retention_days().values() if d is not None]
+    if len(days) < len(retention_days()) or not is_partitioned():
+        return []  # Some type is kept forever, or the table is not partitioned
+    cutoff = (now or timezone.now()) - timedelta(days=max(days))
+    dropped = []
+    for name, upper in partitions():
+        if upper is None or upper > cutoff:
+            continue
+        dropped.append(name)
+        if dry_run:
+            continue
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'SELECT DISTINCT user_id FROM "{name}" WHERE NOT is_read')
+            user_ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'DROP TABLE "{name}"')
+            refresh_unread_many(user_ids)
+    return dropped
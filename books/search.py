@@ -0,0 +1,167 @@
+"""
+Full-text catalog search.
+
+On SQLite the catalog is mirrored into an FTS5 table (``books_book_fts``); on
+PostgreSQL into a ``tsvector`` column with a GIN index (``books_book_search``).
+Both are created by migration 0006 and kept in sync by the ``Book`` signals in
+``books/signals.py``. Other databases, or SQLite builds without FTS5, fall
+back to the original ``icontains`` scan.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = 'books_book_fts'
+POSTGRES_TABLE = 'books_book_search'
+
+# Field weights: title and ISBN matches outrank author matches.
+POSTGRES_DOCUMENT = (
+    "setweight(to_tsvector('simple', coalesce(%s, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(%s, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(%s, '')), 'A')"
+)
+POSTGRES_DOCUMENT_COLUMNS = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(author, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(isbn, '')), 'A')"
+)
+
+_available = set()
+
+
+def backend():
+    """``'sqlite'``, ``'postgresql'`` or ``None`` when no index is usable."""
+    vendor = connection.vendor
+    if vendor not in ('sqlite', 'postgresql'):
+        return None
+    if vendor not in _available:
+        # Only a found table is remembered, so migrating later enables the index without a restart
+        table = SQLITE_TABLE if vendor == 'sqlite' else POSTGRES_TABLE
+        with connection.cursor() as cursor:
+            if table not in connection.introspection.table_names(cursor):
+                return None
+        _available.add(vendor)
+    return vendor
+
+
+def terms(query):
+    """Lower-cased word tokens of a user query; punctuation is dropped."""
+    return re.findall(r'\w+', query.lower())
+
+
+def search_books(queryset, query):
+    """
+    Filter a ``Book`` queryset to rows matching ``query``, annotated with
+    ``search_rank`` (higher is better). Every term must match as a prefix of
+    a word in the title, author or ISBN.
+    """
+    words = terms(query)
+    engine = backend()
+    if not words or engine is None:
+        return queryset.filter(
+            Q(title__icontains=query) |
+            Q(author__icontains=query) |
+            Q(isbn__icontains=query)
+        )
+    if engine == 'sqlite':
+        match = ' '.join(f'"{word}"*' for word in words)
+        matches = RawSQL(f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [match])
+        rank = RawSQL(
+            f'SELECT -bm25({SQLITE_TABLE}, 10.0, 5.0, 10.0) FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s AND {SQLITE_TABLE}.rowid = books_book.id',
+            [match], output_field=FloatField(),
+        )
+    else:
+        tsquery = ' & '.join(f'{word}:*' for word in words)
+        matches = RawSQL(
+            f"SELECT book_id FROM {POSTGRES_TABLE} WHERE document @@ to_tsquery('simple', %s)", [tsquery],
+        )
+        rank = RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) FROM {POSTGRES_TABLE} "
+            f'WHERE {POSTGRES_TABLE}.book_id = books_book.id',
+            [tsquery], output_field=FloatField(),
+        )
+    # One index lookup selects the matches; the rank subquery only runs for those rows
+    return queryset.filter(id__in=matches).annotate(search_rank=rank)
+
+
+def index_book(book):
+    """Insert or refresh one book's index entry."""
+    engine = backend()
+    if engine is None:
+        return
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [book.pk])
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, author, isbn) VALUES (%s, %s, %s, %s)',
+                [book.pk, book.title, book.author, book.isbn],
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (book_id, document) VALUES (%s, {POSTGRES_DOCUMENT}) '
+                f'ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document',
+                [book.pk, book.title, book.author, book.isbn],
+            )
+
+
+def index_books(book_ids):
+    """Refresh the index entries of many books with set-based statements."""
+    engine = backend()
+    book_ids = list(book_ids)
+    if engine is None or not book_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid IN ({placeholders})', book_ids)
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, author, isbn) '
+                f'SELECT id, title, author, isbn FROM books_book WHERE id IN ({placeholders})',
+                book_ids,
+            )
+        else:
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (book_id, document) '
+                f'SELECT id, {POSTGRES_DOCUMENT_COLUMNS} FROM books_book WHERE id IN ({placeholders}) '
+                f'ON CONFLICT (book_id) DO UPDATE SET document = EXCLUDED.document',
+                book_ids,
+            )
+
+
+def remove_book(book_id):
+    """Drop one book's index entry."""
+    engine = backend()
+    if engine is None:
+        return
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [book_id])
+        else:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE book_id = %s', [book_id])
+
+
+def rebuild():
+    """Rebuild the whole index from ``books_book``. Returns the number of rows indexed."""
+    engine = backend()
+    if engine is None:
+        return 0
+    with connection.cursor() as cursor:
+        if engine == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, author, isbn) '
+                f'SELECT id, title, author, isbn FROM books_book'
+            )
+            count = cursor.rowcount
+            cursor.execute(f"INSERT INTO {SQLITE_TABLE} ({SQLITE_TABLE}) VALUES ('optimize')")
+        else:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {POSTGRES_TABLE} (book_id, document) '
+                f'SELECT id, {POSTGRES_DOCUMENT_COLUMNS} FROM books_book'
+            )
+            count = cursor.rowcount
+    return count
@@ -0,0 +1,100 @@
+"""
+Model signal receivers for the books app. Connected in ``BooksConfig.ready``.
+"""
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import autocomplete, broadcasts, model_cache, search, stats
+from .models import Book, BookIssue, Broadcast, Category, DataVersion, Review
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Book)
+def index_saved_book(sender, instance, **kwargs):
+    """Keep the full-text and typeahead indexes in step with catalog edits."""
+    search.index_book(instance)
+    autocomplete.update_book(instance)
+
+
+@receiver(post_delete, sender=Book)
+def unindex_deleted_book(sender, instance, **kwargs):
+    search.remove_book(instance.pk)
+    autocomplete.remove_book(instance.pk)
+
+
+@receiver(post_delete, sender=Book)
+def count_deleted_book(sender, instance, **kwargs):
+    """Deletions leave no timestamp, so today's rollup counters record them."""
+    day_start = stats.start_of(timezone.localdate())
+    if instance.created_at and instance.created_at < day_start:
+        stats.record_removal(books_removed=1)
+
+
+@receiver(post_delete, sender=BookIssue)
+def count_deleted_issue(sender, instance, **kwargs):
+    day_start = stats.start_of(timezone.localdate())
+    open_at_start = instance.actual_return_date is None or instance.actual_return_date >= day_start
+    stats.record_removal(
+        open_issues_removed=int(open_at_start and instance.issue_date is not None and instance.issue_date < day_start),
+        overdue_issues_removed=int(open_at_start and instance.return_date is not None and instance.return_date < day_start),
+    )
+
+
+@receiver(post_delete, sender=User)
+def count_deleted_user(sender, instance, **kwargs):
+    day_start = stats.start_of(timezone.localdate())
+    if instance.date_joined and instance.date_joined < day_start:
+        stats.record_removal(users_removed=1, members_removed=int(not instance.is_staff))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=BookIssue)
+@receiver(post_delete, sender=BookIssue)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def bump_data_version(sender, update_fields=None, **kwargs):
+    """Invalidate cached report artifacts built from this model's rows."""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    name = sender._meta.label_lower
+    transaction.on_commit(lambda: DataVersion.bump(name))
+
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=BookIssue)
+@receiver(post_delete, sender=BookIssue)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_model_generation(sender, **kwargs):
+    """Retire query results cached from this model (books/model_cache.py)."""
+    model_cache.bump(sender)
+
+
+@receiver(post_delete, sender=Category)
+def bump_uncategorized_books(sender, **kwargs):
+    """Deleting a category un-files its books with an UPDATE that sends no ``Book`` signals."""
+    model_cache.bump(Book)
+
+
+@receiver(post_save, sender=BookIssue)
+@receiver(post_delete, sender=BookIssue)
+def refresh_borrower_broadcast_count(sender, instance, **kwargs):
+    """Loans decide the ``borrowers``/``overdue`` audiences, so the borrower's count may change."""
+    broadcasts.loans_changed(instance.user_id)
+
+
+@receiver(post_save, sender=Broadcast)
+@receiver(post_delete, sender=Broadcast)
+def refresh_broadcast_counts(sender, **kwargs):
+    """A new or removed broadcast changes every matching user's unread count."""
+    broadcasts.bump_version()
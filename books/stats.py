@@ -0,0 +1,170 @@
+"""
+Dashboard counters backed by the ``DailyStats`` rollup.
+
+Each ``DailyStats`` row holds the counters as they stood at the end of its
+day. ``current_stats()`` starts from the newest rolled-up row and adds only
+the changes since then: rows created, returned or falling overdue after that
+day, which the timestamp indexes on ``Book`` and ``BookIssue`` keep cheap.
+Overdue loans are counted live instead, since renewing a loan moves its due
+date without a timestamp. Without a rollup it falls back to counting the
+base tables.
+
+``rollup(day)`` anchors on a live snapshot minus the changes since the end of
+``day``, then walks backwards a day at a time to backfill older rows.
+Historic category counts ignore books that were since deleted or moved.
+"""
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, Q, Sum
+from django.utils import timezone
+
+from .models import Book, BookIssue, DailyStats
+
+User = get_user_model()
+
+GAUGES = ('total_books', 'total_users', 'total_members', 'open_issues', 'overdue_issues')
+REMOVAL_COUNTERS = {
+    'total_books': 'books_removed',
+    'total_users': 'users_removed',
+    'total_members': 'members_removed',
+    'open_issues': 'open_issues_removed',
+    'overdue_issues': 'overdue_issues_removed',
+}
+
+
+def start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min), timezone.get_current_timezone())
+
+
+def snapshot(now=None):
+    """Live counters straight from the base tables."""
+    now = now or timezone.now()
+    users = User.objects.aggregate(total=Count('id'), members=Count('id', filter=Q(is_staff=False)))
+    issues = BookIssue.objects.filter(actual_return_date__isnull=True).aggregate(
+        open=Count('id'),
+        overdue=Count('id', filter=Q(return_date__lt=now)),
+    )
+    categories = Book.objects.values('category__name').annotate(count=Count('id'))
+    return {
+        'total_books': Book.objects.count(),
+        'total_users': users['total'],
+        'total_members': users['members'],
+        'open_issues': issues['open'],
+        'overdue_issues': issues['overdue'],
+        'category_counts': {row['category__name'] or 'Uncategorized': row['count'] for row in categories},
+    }
+
+
+def changes(since, until):
+    """
+    Net change of every counter over ``[since, until)``, from rows timestamped
+    inside the window plus the removal counters of the days it covers.
+    """
+    users = User.objects.filter(date_joined__gte=since, date_joined__lt=until).aggregate(
+        total=Count('id'), members=Count('id', filter=Q(is_staff=False)),
+    )
+    # The outer filter lets each range use its column's index instead of scanning the table
+    issues = BookIssue.objects.filter(
+        Q(issue_date__gte=since, issue_date__lt=until) |
+        Q(actual_return_date__gte=since, actual_return_date__lt=until) |
+        Q(return_date__gte=since, return_date__lt=until)
+    ).aggregate(
+        opened=Count('id', filter=Q(issue_date__gte=since, issue_date__lt=until)),
+        returned=Count('id', filter=Q(
+            issue_date__lt=since, actual_return_date__gte=since, actual_return_date__lt=until,
+        )),
+        became_overdue=Count('id', filter=Q(return_date__gte=since, return_date__lt=until) & (
+            Q(actual_return_date__isnull=True) | Q(actual_return_date__gte=until)
+        )),
+        overdue_returned=Count('id', filter=Q(
+            return_date__lt=since, actual_return_date__gte=since, actual_return_date__lt=until,
+        )),
+    )
+    # Loans opened and closed inside the window never counted as open
+    opened_and_returned = BookIssue.objects.filter(
+        issue_date__gte=since, actual_return_date__lt=until,
+    ).count()
+    added = Book.objects.filter(created_at__gte=since, created_at__lt=until)
+    days = (timezone.localtime(since).date(), timezone.localtime(until - timedelta(microseconds=1)).date())
+    removed = DailyStats.objects.filter(date__range=days).aggregate(
+        **{field: Sum(field) for field in REMOVAL_COUNTERS.values()}
+    )
+    books_added = added.count()
+    delta = {
+        'total_books': books_added,
+        'total_users': users['total'],
+        'total_members': users['members'],
+        'open_issues': issues['opened'] - opened_and_returned - issues['returned'],
+        'overdue_issues': issues['became_overdue'] - issues['overdue_returned'],
+    }
+    for gauge, counter in REMOVAL_COUNTERS.items():
+        delta[gauge] -= removed[counter] or 0
+    delta['category_counts'] = {
+        row['category__name'] or 'Uncategorized': row['count']
+        for row in added.values('category__name').annotate(count=Count('id'))
+    }
+    delta['books_added'] = books_added
+    delta['issues_opened'] = issues['opened']
+    delta['issues_returned'] = issues['returned'] + opened_and_returned
+    return delta
+
+
+def _apply(counters, delta, sign=1):
+    result = {gauge: counters[gauge] + sign * delta[gauge] for gauge in GAUGES}
+    categories = dict(counters['category_counts'])
+    for name, count in delta['category_counts'].items():
+        categories[name] = categories.get(name, 0) + sign * count
+    result['category_counts'] = {name: count for name, count in categories.items() if count > 0}
+    return result
+
+
+def current_stats(now=None):
+    """Counters as of ``now``: the newest rollup plus the changes since its day ended."""
+    now = now or timezone.now()
+    latest = DailyStats.objects.filter(computed_at__isnull=False).order_by('-date').first()
+    if latest is None:
+        return snapshot(now)
+    base = {gauge: getattr(latest, gauge) for gauge in GAUGES}
+    base['category_counts'] = latest.category_counts
+    current = _apply(base, changes(start_of(latest.date + timedelta(days=1)), now))
+    # Renewals move return_date without leaving a timestamp, so a delta would drift
+    current['overdue_issues'] = overdue_count(now)
+    return current
+
+
+def overdue_count(now):
+    """Open loans past their due date, from the ``(actual_return_date, return_date)`` index."""
+    return BookIssue.objects.filter(actual_return_date__isnull=True, return_date__lt=now).count()
+
+
+def rollup(through, days=1, now=None):
+    """
+    Write finalized rows for the ``days`` days ending with ``through`` (which
+    must be before today). Returns the number of rows written.
+    """
+    now = now or timezone.now()
+    counters = _apply(snapshot(now), changes(start_of(through + timedelta(days=1)), now), sign=-1)
+    day = through
+    for _ in range(days):
+        day_changes = changes(start_of(day), start_of(day + timedelta(days=1)))
+        DailyStats.objects.update_or_create(date=day, defaults={
+            **counters,
+            'books_added': day_changes['books_added'],
+            'issues_opened': day_changes['issues_opened'],
+            'issues_returned': day_changes['issues_returned'],
+            'computed_at': now,
+        })
+        counters = _apply(counters, day_changes, sign=-1)
+        day -= timedelta(days=1)
+    return days
+
+
+def record_removal(**counters):
+    """Bump today's removal counters, e.g. ``record_removal(books_removed=1)``."""
+    counters = {field: amount for field, amount in counters.items() if amount}
+    if not counters:
+        return
+    today = timezone.localdate()
+    DailyStats.objects.get_or_create(date=today)
+    DailyStats.objects.filter(date=today).update(**{field: F(field) + amount for field, amount in counters.items()})
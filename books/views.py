@@ -1,22 +1,29 @@
+import os
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import JsonResponse, HttpResponseBadRequest, Http404, HttpResponse
+from django.urls import reverse
+from django.utils.http import url_has_allowed_host_and_scheme
+from django.http import JsonResponse, HttpResponseBadRequest, Http404, FileResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib import messages
 from django.utils import timezone
-from django.db.models import Q, Count, Avg, Sum
-from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Value
+from django.db.models.functions import Coalesce
 from datetime import datetime, timedelta
-from .models import Book, BookIssue, Review, Reservation, Category, Notification
+from .models import Book, BookIssue, Review, Reservation, Category, Notification, OutboxEmail, ReportJob, Broadcast
+from . import autocomplete, broadcasts, catalog_grid, circulation, exports, model_cache, report_jobs, reports, stats
+from .notification_counts import with_read_state
+from .pagination import InvalidCursor, cached_count, paginate
 from api.serializers import (
     BookSerializer, BookIssueSerializer, ReviewSerializer,
     ReservationSerializer, CategorySerializer
 )
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.conf import settings
 from django_ratelimit.decorators import ratelimit
 
@@ -38,11 +45,13 @@ class IsAdminOrReadOnly(permissions.BasePermission):
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
+    ordering_fields = ['id', 'name']
     permission_classes = [IsAdminOrReadOnly]
 
 class BookViewSet(viewsets.ModelViewSet):
     queryset = Book.objects.all()
     serializer_class = BookSerializer
+    ordering_fields = ['id', 'title', 'author', 'created_at', 'publication_date']
     permission_classes = [IsAdminOrReadOnly]
     
     @action(detail=True, methods=['post'])
@@ -50,57 +59,55 @@ class BookViewSet(viewsets.ModelViewSet):
         book = self.get_object()
         user = request.user
         
-        if book.available > 0:
-            reservation = Reservation.objects.create(
-                book=book,
-                user=user,
-                status='pending'
-            )
-            book.available -= 1
-            book.save()
-            
-            # Send email notification
-            send_mail(
-                'Book Reservation Confirmation',
-                f'Your reservation for {book.title} has been confirmed.',
-                settings.EMAIL_HOST_USER,
-                [user.email],
-                fail_silently=False,
+        try:
+            with transaction.atomic():
+                hold = circulation.reserve(user, book)
+                if hold.status == 'waiting':
+                    position = circulation.queue_position(hold)
+                    message = f'You are number {position} in line for {book.title}. We will let you know when a copy is ready.'
+                else:
+                    message = f'Your reservation for {book.title} has been confirmed.'
+                
+                # Queue email notification (delivered by drain_outbox)
+                OutboxEmail.enqueue(
+                    'Book Reservation Confirmation',
+                    message,
+                    settings.EMAIL_HOST_USER,
+                    [user.email],
+                )
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'You already have a reservation for this book'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            
-            return Response({'status': 'reservation created'})
-        return Response(
-            {'error': 'Book not available'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        if hold.status == 'waiting':
+            return Response({'status': 'added to hold queue', 'position': position})
+        return Response({'status': 'reservation created'})
 
 class BookIssueViewSet(viewsets.ModelViewSet):
     queryset = BookIssue.objects.all()
     serializer_class = BookIssueSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'issue_date', 'return_date']
     
     @action(detail=True, methods=['post'])
     def return_book(self, request, pk=None):
         book_issue = self.get_object()
-        book_issue.actual_return_date = timezone.now()
-        
-        # Calculate fine if overdue
-        if book_issue.actual_return_date > book_issue.return_date:
-            days_overdue = (book_issue.actual_return_date - book_issue.return_date).days
-            book_issue.fine_amount = days_overdue * 1.0  # $1 per day
-            book_issue.payment_status = 'overdue'
-        
-        book_issue.save()
-        
-        # Update book availability
-        book = book_issue.book
-        book.available += 1
-        book.save()
-        
+        try:
+            # Records the return and fine and puts the copy back
+            circulation.return_issue(book_issue)
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'Book already returned'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         return Response({'status': 'book returned', 'fine_amount': book_issue.fine_amount})
 
 class ReviewViewSet(viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'rating', 'created_at']
     
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
@@ -108,24 +115,20 @@ class ReviewViewSet(viewsets.ModelViewSet):
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
+    ordering = '-id'
+    ordering_fields = ['id', 'reservation_date']
     
     @action(detail=True, methods=['post'])
     def cancel(self, request, pk=None):
         reservation = self.get_object()
-        if reservation.status == 'pending':
-            reservation.status = 'cancelled'
-            reservation.save()
-            
-            # Update book availability
-            book = reservation.book
-            book.available += 1
-            book.save()
-            
-            return Response({'status': 'reservation cancelled'})
-        return Response(
-            {'error': 'Cannot cancel this reservation'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        try:
+            circulation.cancel_reservation(reservation)
+        except circulation.InvalidState:
+            return Response(
+                {'error': 'Cannot cancel this reservation'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response({'status': 'reservation cancelled'})
 
 
 # Template-based Views
@@ -224,7 +227,8 @@ def dashboard_view(request):
     user = request.user
     
     # Get statistics
-    total_books = Book.objects.count()
+    # One cached count; the full rollup counters are only needed on the admin pages
+    total_books = cached_count(Book.objects.all())
     books_issued = BookIssue.objects.filter(
         user=user,
         actual_return_date__isnull=True
@@ -269,10 +273,13 @@ def book_detail_view(request, book_id: int):
     """Display book details or 'Book details not added' message"""
     try:
         book = Book.objects.get(id=book_id)
+        hold = circulation.open_hold(request.user, book.id) if request.user.is_authenticated else None
         # For now, show a simple message
         context = {
             'book': book,
-            'message': 'Book details not added'
+            'message': 'Book details not added',
+            'hold': hold,
+            'hold_position': circulation.queue_position(hold) if hold and hold.status == 'waiting' else None,
         }
         return render(request, 'book_detail.html', context)
     except Book.DoesNotExist:
@@ -281,62 +288,36 @@ def book_detail_view(request, book_id: int):
 
 @login_required
 def book_list_view(request):
-    """Books listing with filters and search"""
-    books = Book.objects.all()
-    
-    # Search
+    """Books listing with filters and search; the grid is cached per filter set (books/catalog_grid.py)"""
+    filters = catalog_grid.normalize_filters(request.GET)
+    grid = catalog_grid.grid(filters)
     search_query = request.GET.get('search', '') or request.GET.get('q', '')
-    if search_query:
-        books = books.filter(
-            Q(title__icontains=search_query) |
-            Q(author__icontains=search_query) |
-            Q(isbn__icontains=search_query)
-        )
-    
-    # Category filter
-    category_id = request.GET.get('category', '')
-    if category_id:
-        books = books.filter(category_id=category_id)
-    
-    # Availability filter
-    availability = request.GET.get('availability', '')
-    if availability == 'available':
-        books = books.filter(available__gt=0)
-    elif availability == 'unavailable':
-        books = books.filter(available=0)
-    
-    # Sorting
-    sort_by = request.GET.get('sort', 'title')
-    if sort_by in ['title', 'author', 'created_at']:
-        books = books.order_by(sort_by)
-    elif sort_by in ['-title', '-author', '-created_at']:
-        books = books.order_by(sort_by)
-    elif sort_by in ['newest', '-created_at']:
-        books = books.order_by('-created_at') if hasattr(Book, 'created_at') else books.order_by('-id')
-    elif sort_by in ['oldest', 'created_at']:
-        books = books.order_by('created_at') if hasattr(Book, 'created_at') else books.order_by('id')
-    
-    # Pagination
-    paginator = Paginator(books, 12)  # 12 books per page
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
-    
-    # Get all categories for filter
-    categories = Category.objects.all()
     
     context = {
-        'books': page_obj,
-        'categories': categories,
+        'catalog_grid': grid['html'],
+        'categories': model_cache.cached_list('categories', Category.objects.all()),
         'search_query': search_query,
-        'selected_category': category_id,
-        'selected_availability': availability,
-        'selected_sort': sort_by,
-        'total_books': books.count(),
+        'selected_category': filters['category'],
+        'selected_availability': filters['availability'],
+        'selected_sort': request.GET.get('sort') or ('relevance' if search_query else 'title'),
+        'total_books': grid['total'],
     }
     
     return render(request, 'book_list.html', context)
 
 
+@login_required
+def book_autocomplete_view(request):
+    """Typeahead suggestions for the catalog search box (JSON)."""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    results = autocomplete.get_index().lookup(query, limit) if query else []
+    return JsonResponse({'query': query, 'results': results})
+
+
 @login_required
 def my_books_view(request):
     """User's issued books"""
@@ -390,23 +371,12 @@ def issue_book_view(request, book_id: int):
 
     status_value = 'active' if request.user.is_staff else 'requested'
 
-    # If admin (or auto-approve), ensure availability
-    if status_value in ['active', 'approved']:
-        if book.available <= 0:
-            messages.error(request, 'Book is not available.')
-            return redirect('book_list')
-
-    issue = BookIssue.objects.create(
-        book=book,
-        user=request.user,
-        return_date=aware,
-        status=status_value,
-    )
-
-    # Decrement availability when immediately activated
-    if status_value in ['active', 'approved']:
-        book.available = max(0, book.available - 1)
-        book.save()
+    # Admins issue immediately, which takes a copy if one is left
+    try:
+        circulation.checkout(request.user, book, aware, status=status_value)
+    except circulation.NotAvailable:
+        messages.error(request, 'Book is not available.')
+        return redirect('book_list')
 
     if status_value == 'requested':
         messages.success(request, f'Request submitted for "{book.title}". Awaiting approval.')
@@ -415,6 +385,37 @@ def issue_book_view(request, book_id: int):
     return redirect('my_books')
 
 
+@login_required
+def place_hold_view(request, book_id: int):
+    """Reserve a book: a copy is set aside now if one is free, otherwise join its hold queue."""
+    if request.method != 'POST':
+        return HttpResponseBadRequest('Invalid method')
+    book = get_object_or_404(Book, id=book_id)
+    try:
+        hold = circulation.reserve(request.user, book)
+    except circulation.InvalidState:
+        messages.info(request, f'You already have a hold on "{book.title}".')
+        return redirect('book_detail', book_id=book.id)
+    if hold.status == 'waiting':
+        messages.success(request, f'You are number {circulation.queue_position(hold)} in line for "{book.title}".')
+    else:
+        messages.success(request, f'A copy of "{book.title}" is set aside for you.')
+    return redirect('book_detail', book_id=book.id)
+
+
+@login_required
+def cancel_hold_view(request, hold_id: int):
+    if request.method != 'POST':
+        return HttpResponseBadRequest('Invalid method')
+    hold = get_object_or_404(Reservation, id=hold_id, user=request.user)
+    try:
+        circulation.cancel_reservation(hold)
+        messages.success(request, f'Hold on "{hold.book.title}" cancelled.')
+    except circulation.InvalidState:
+        messages.info(request, 'This hold is no longer open.')
+    return redirect('book_detail', book_id=hold.book_id)
+
+
 @login_required
 def renew_book_view(request, issue_id: int):
     if request.method != 'POST':
@@ -435,14 +436,11 @@ def return_book_view(request, issue_id: int):
     if request.method != 'POST':
         return JsonResponse({'success': False, 'message': 'Invalid method'}, status=400)
     issue = get_object_or_404(BookIssue, id=issue_id, user=request.user)
-    if issue.actual_return_date:
-        return JsonResponse({'success': False, 'message': 'Already returned'}, status=400)
-
     # finalize and increment availability
-    issue.finalize_return()
-    book = issue.book
-    book.available = book.available + 1
-    book.save()
+    try:
+        circulation.return_issue(issue)
+    except circulation.InvalidState:
+        return JsonResponse({'success': False, 'message': 'Already returned'}, status=400)
     return JsonResponse({'success': True, 'fine': float(issue.fine_amount)})
 
 
@@ -471,40 +469,35 @@ def approve_issue_view(request, issue_id: int):
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
     issue = get_object_or_404(BookIssue, id=issue_id)
-    if issue.status not in ['requested', 'rejected']:
+    book = issue.book
+    try:
+        with transaction.atomic():
+            circulation.approve(issue)
+
+            # Create notification for user
+            Notification.create_notification(
+                user=issue.user,
+                notification_type='issue_approved',
+                title=f'Book Issue Approved: {book.title}',
+                message=f'Your request for "{book.title}" has been approved. Return by {issue.return_date.strftime("%B %d, %Y") if issue.return_date else "N/A"}.',
+                link='/my-books/'
+            )
+
+            # Queue email (delivered by drain_outbox)
+            return_date_str = issue.return_date.strftime("%B %d, %Y") if issue.return_date else "soon"
+            OutboxEmail.enqueue(
+                f'Book Issue Approved: {book.title}',
+                f'Hello {issue.user.username},\n\nYour request for "{book.title}" has been approved.\n\nPlease return it by {return_date_str}.\n\nThank you,\nLibrary Management',
+                settings.EMAIL_HOST_USER,
+                [issue.user.email],
+            )
+    except circulation.InvalidState:
         messages.info(request, 'Issue not in a state to approve.')
         return redirect('admin_panel')
-    book = issue.book
-    if book.available <= 0:
+    except circulation.NotAvailable:
         messages.error(request, 'Book not available to approve.')
         return redirect('admin_panel')
-    issue.status = 'active'
-    book.available -= 1
-    book.save()
-    issue.save()
-    
-    # Create notification for user
-    Notification.create_notification(
-        user=issue.user,
-        notification_type='issue_approved',
-        title=f'Book Issue Approved: {book.title}',
-        message=f'Your request for "{book.title}" has been approved. Return by {issue.return_date.strftime("%B %d, %Y") if issue.return_date else "N/A"}.',
-        link='/my-books/'
-    )
-    
-    # Send email
-    try:
-        return_date_str = issue.return_date.strftime("%B %d, %Y") if issue.return_date else "soon"
-        send_mail(
-            f'Book Issue Approved: {book.title}',
-            f'Hello {issue.user.username},\n\nYour request for "{book.title}" has been approved.\n\nPlease return it by {return_date_str}.\n\nThank you,\nLibrary Management',
-            settings.EMAIL_HOST_USER,
-            [issue.user.email],
-            fail_silently=True
-        )
-    except:
-        pass
-    
+
     messages.success(request, 'Issue approved.')
     return redirect('admin_panel')
 
@@ -518,29 +511,26 @@ def reject_issue_view(request, issue_id: int):
     if issue.status != 'requested':
         messages.info(request, 'Only requested issues can be rejected.')
         return redirect('admin_panel')
-    issue.status = 'rejected'
-    issue.save()
-    
-    # Create notification for user
-    Notification.create_notification(
-        user=issue.user,
-        notification_type='issue_rejected',
-        title=f'Book Issue Rejected: {issue.book.title}',
-        message=f'Your request for "{issue.book.title}" has been rejected. Please contact the library for details.',
-        link='/books/'
-    )
-    
-    # Send email
-    try:
-        send_mail(
+    with transaction.atomic():
+        issue.status = 'rejected'
+        issue.save()
+        
+        # Create notification for user
+        Notification.create_notification(
+            user=issue.user,
+            notification_type='issue_rejected',
+            title=f'Book Issue Rejected: {issue.book.title}',
+            message=f'Your request for "{issue.book.title}" has been rejected. Please contact the library for details.',
+            link='/books/'
+        )
+        
+        # Queue email (delivered by drain_outbox)
+        OutboxEmail.enqueue(
             f'Book Issue Rejected: {issue.book.title}',
             f'Hello {issue.user.username},\n\nYour request for "{issue.book.title}" has been rejected.\n\nPlease contact the library for more information.\n\nThank you,\nLibrary Management',
             settings.EMAIL_HOST_USER,
             [issue.user.email],
-            fail_silently=True
         )
-    except:
-        pass
     
     messages.success(request, 'Issue rejected.')
     return redirect('admin_panel')
@@ -588,7 +578,8 @@ def add_book_view(request):
                 price=price,
                 publication_date=publication_date,
                 description=description,
-                cover_image=cover
+                cover_image=cover,
+                cover_state='pending' if cover else '',
             )
             messages.success(request, f'Book "{book.title}" added successfully.')
             return redirect('admin_books')
@@ -624,15 +615,18 @@ def admin_panel_view(request):
     
     # Get all data for admin
     books = Book.objects.all().select_related('category')
-    categories = Category.objects.all()
+    categories = model_cache.cached_list(
+        'category_counts', Category.objects.annotate(book_count=Count('book')), models=[Category, Book],
+    )
     users = User.objects.all()
     book_issues = BookIssue.objects.all().select_related('user', 'book').order_by('-issue_date')
     
     # Statistics
-    total_books = books.count()
-    total_users = users.count()
-    total_issued = book_issues.filter(actual_return_date__isnull=True).count()
-    total_categories = categories.count()
+    counters = stats.current_stats()
+    total_books = counters['total_books']
+    total_users = counters['total_users']
+    total_issued = counters['open_issues']
+    total_categories = len(categories)
     
     context = {
         'books': books,
@@ -656,10 +650,11 @@ def admin_dashboard_view(request):
     if not request.user.is_staff:
         messages.error(request, 'You do not have permission to access the admin dashboard.')
         return redirect('dashboard')
-    total_books = Book.objects.count()
-    total_users = User.objects.count()
-    total_issued = BookIssue.objects.filter(actual_return_date__isnull=True).count()
-    overdue = BookIssue.objects.filter(actual_return_date__isnull=True, return_date__lt=timezone.now()).count()
+    counters = stats.current_stats()
+    total_books = counters['total_books']
+    total_users = counters['total_users']
+    total_issued = counters['open_issues']
+    overdue = counters['overdue_issues']
     recent_issues = BookIssue.objects.select_related('book','user').order_by('-issue_date')[:10]
     pending_requests = BookIssue.objects.filter(status='requested').select_related('book', 'user').order_by('-issue_date')
     context = {
@@ -673,13 +668,21 @@ def admin_dashboard_view(request):
     return render(request, 'admin/dashboard.html', context)
 
 
+ADMIN_PAGE_SIZE = 50
+
+
 @login_required
 def admin_books_view(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    books = Book.objects.all().select_related('category').order_by('-id')
-    categories = Category.objects.all()
+    queryset = Book.objects.all().select_related('category')
+    try:
+        books = paginate(queryset, '-id', request.GET.get('cursor'), ADMIN_PAGE_SIZE)
+    except InvalidCursor:
+        books = paginate(queryset, '-id', None, ADMIN_PAGE_SIZE)
+    books.count = cached_count(Book.objects.all())
+    categories = model_cache.cached_list('categories', Category.objects.all())
     return render(request, 'admin/books.html', {'books': books, 'categories': categories})
 
 
@@ -709,10 +712,12 @@ def edit_book_view(request, book_id):
         book.publication_date = request.POST.get('publication_date', book.publication_date)
         book.description = request.POST.get('description', book.description)
         if 'cover_image' in request.FILES:
-            book.cover_image = request.FILES['cover_image']
+            book.set_cover(request.FILES['cover_image'])
         
         try:
             book.save()
+            # Copies added by the edit go to patrons waiting in the hold queue first
+            circulation.promote(book.pk)
             messages.success(request, f'Book "{book.title}" updated successfully.')
         except Exception as e:
             messages.error(request, f'Error updating book: {str(e)}')
@@ -740,7 +745,11 @@ def admin_users_view(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    users = User.objects.all().order_by('-date_joined')
+    try:
+        users = paginate(User.objects.all(), '-date_joined', request.GET.get('cursor'), ADMIN_PAGE_SIZE)
+    except InvalidCursor:
+        users = paginate(User.objects.all(), '-date_joined', None, ADMIN_PAGE_SIZE)
+    users.count = cached_count(User.objects.all())
     return render(request, 'admin/users.html', {'users': users})
 
 
@@ -770,7 +779,7 @@ def admin_categories_view(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    categories = Category.objects.all().order_by('name')
+    categories = model_cache.cached_list('categories', Category.objects.order_by('name'))
     return render(request, 'admin/categories.html', {'categories': categories})
 
 
@@ -803,14 +812,66 @@ def delete_category_view(request, category_id):
     return redirect('admin_categories')
 
 
+def _is_local_link(request, link):
+    """Broadcast links may only send recipients to pages on this site."""
+    return url_has_allowed_host_and_scheme(link, allowed_hosts={request.get_host()}, require_https=request.is_secure())
+
+
+@login_required
+def admin_broadcasts_view(request):
+    """Send announcements to an audience without a notification row per user."""
+    if not request.user.is_staff:
+        messages.error(request, 'Permission denied.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        title = request.POST.get('title', '').strip()
+        message = request.POST.get('message', '').strip()
+        audience = request.POST.get('audience', 'all')
+        if not title or not message or audience not in dict(Broadcast.AUDIENCE_CHOICES):
+            messages.error(request, 'Title, message and a valid audience are required.')
+            return redirect('admin_broadcasts')
+        link = request.POST.get('link', '').strip()
+        if link and not _is_local_link(request, link):
+            messages.error(request, 'The link must point to a page on this site.')
+            return redirect('admin_broadcasts')
+        expires_in = request.POST.get('expires_in_days')
+        Broadcast.objects.create(
+            title=title,
+            message=message,
+            link=link or None,
+            audience=audience,
+            created_by=request.user,
+            expires_at=timezone.now() + timedelta(days=int(expires_in)) if expires_in and expires_in.isdigit() else None,
+        )
+        messages.success(request, 'Announcement sent.')
+        return redirect('admin_broadcasts')
+    return render(request, 'admin/broadcasts.html', {
+        'broadcasts': Broadcast.objects.select_related('created_by').annotate(read_count=Count('reads'))[:50],
+        'audiences': Broadcast.AUDIENCE_CHOICES,
+    })
+
+
+@login_required
+def delete_broadcast_view(request, broadcast_id):
+    if not request.user.is_staff:
+        messages.error(request, 'Permission denied.')
+        return redirect('dashboard')
+    if request.method == 'POST':
+        broadcast = get_object_or_404(Broadcast, id=broadcast_id)
+        broadcast.delete()
+        messages.success(request, f'Announcement "{broadcast.title}" deleted.')
+    return redirect('admin_broadcasts')
+
+
 @login_required
 def admin_fines_view(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
     overdue_issues = BookIssue.objects.filter(actual_return_date__isnull=True, return_date__lt=timezone.now()).select_related('book','user')
-    total_overdue = overdue_issues.count()
-    total_amount = sum([(i.calculated_fine or 0) for i in overdue_issues])
+    summary = reports.circulation_summary()
+    total_overdue = summary['overdue_issues']
+    total_amount = summary['total_fines']
     return render(request, 'admin/fines.html', {'overdue_issues': overdue_issues, 'total_overdue': total_overdue, 'total_amount': total_amount})
 
 
@@ -820,130 +881,59 @@ def admin_reports_view(request):
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
     
-    from django.db.models import Count, Sum, Q
-    from datetime import datetime, timedelta
     import json
-    
-    # Date range filters (default: last 12 months)
-    end_date = datetime.now().date()
-    start_date = end_date - timedelta(days=365)
-    
-    # Get date range from request if provided
-    if request.GET.get('start_date'):
-        try:
-            start_date = datetime.strptime(request.GET.get('start_date'), '%Y-%m-%d').date()
-        except ValueError:
-            pass
-    if request.GET.get('end_date'):
-        try:
-            end_date = datetime.strptime(request.GET.get('end_date'), '%Y-%m-%d').date()
-        except ValueError:
-            pass
-    
+
+    # Reporting window; defaults to the last 12 months
+    start_date, end_date = reports.parse_window(request.GET)
+    now = timezone.now()
+
     # Key statistics
-    total_books = Book.objects.count()
-    total_users = User.objects.filter(is_staff=False).count()
-    active_issues = BookIssue.objects.filter(status__in=['approved', 'active'], actual_return_date__isnull=True).count()
-    
-    # Calculate total fines from overdue books
-    overdue_issues = BookIssue.objects.filter(actual_return_date__isnull=True, return_date__lt=timezone.now())
-    total_fines = sum([(issue.calculated_fine or 0) for issue in overdue_issues])
+    counters = stats.current_stats(now)
+    total_books = counters['total_books']
+    total_users = counters['total_members']
+    summary = reports.circulation_summary(now)
+    total_fines = summary['total_fines']
     unpaid_fines = total_fines  # For now, consider all overdue fines as unpaid
-    
-    # Monthly issues - simplified approach without TruncMonth
-    monthly_issues = []
-    issues_labels = []
-    issues_data = []
-    
-    # Get last 12 months data
-    for i in range(11, -1, -1):
-        month_date = end_date - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-        if i == 0:
-            month_end = end_date
-        else:
-            next_month = month_start + timedelta(days=32)
-            month_end = next_month.replace(day=1) - timedelta(days=1)
-        
-        count = BookIssue.objects.filter(
-            issue_date__gte=month_start,
-            issue_date__lte=month_end
-        ).count()
-        
-        issues_labels.append(month_start.strftime('%b %Y'))
-        issues_data.append(count)
-    
-    # Monthly fines - simplified
-    fines_labels = issues_labels.copy()
-    fines_data = []
-    
-    for i in range(11, -1, -1):
-        month_date = end_date - timedelta(days=30*i)
-        month_start = month_date.replace(day=1)
-        if i == 0:
-            month_end = end_date
-        else:
-            next_month = month_start + timedelta(days=32)
-            month_end = next_month.replace(day=1) - timedelta(days=1)
-        
-        month_issues = BookIssue.objects.filter(
-            issue_date__gte=month_start,
-            issue_date__lte=month_end,
-            return_date__lt=timezone.now()
-        )
-        
-        month_fine = sum([(issue.calculated_fine or 0) for issue in month_issues])
-        fines_data.append(float(month_fine))
-    
-    # Book category distribution
-    category_distribution = Book.objects.values('category__name').annotate(
-        count=Count('id')
-    ).order_by('-count')[:10]
-    
-    category_labels = [item['category__name'] or 'Uncategorized' for item in category_distribution]
-    category_data = [item['count'] for item in category_distribution]
-    
-    # Top borrowed books
-    top_books = Book.objects.annotate(
-        borrow_count=Count('bookissue')
-    ).order_by('-borrow_count')[:10]
-    
+
+    # Issues and outstanding fines per month, grouped in the database
+    issues_labels, issues_data, fines_data = reports.monthly_activity(start_date, end_date, now)
+    category_labels, category_data = reports.category_distribution(counters['category_counts'])
+
     context = {
         'total_books': total_books,
         'total_users': total_users,
-        'active_issues': active_issues,
+        'active_issues': summary['active_issues'],
         'total_fines': total_fines,
         'unpaid_fines': unpaid_fines,
         'start_date': start_date,
         'end_date': end_date,
         'issues_labels': json.dumps(issues_labels),
         'issues_data': json.dumps(issues_data),
-        'fines_labels': json.dumps(fines_labels),
+        'fines_labels': json.dumps(issues_labels),
         'fines_data': json.dumps(fines_data),
         'category_labels': json.dumps(category_labels),
         'category_data': json.dumps(category_data),
-        'top_books': top_books,
+        'top_books': reports.top_books(start_date, end_date),
     }
     
     return render(request, 'admin/reports.html', context)
 
 
-# CSV Exports
-import csv
-from django.http import HttpResponse
-
+# CSV Exports (streamed; see books/exports.py)
 @login_required
 def export_books_csv(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename=books.csv'
-    writer = csv.writer(response)
-    writer.writerow(['ID','Title','Author','ISBN','Category','Quantity','Available','Price','PublicationDate'])
-    for b in Book.objects.select_related('category').all():
-        writer.writerow([b.id, b.title, b.author, b.isbn, b.category.name if b.category else '', b.quantity, b.available, b.price, b.publication_date])
-    return response
+    rows = Book.objects.order_by('id').values_list(
+        'id', 'title', 'author', 'isbn', Coalesce('category__name', Value('')),
+        'quantity', 'available', 'price', 'publication_date'
+    )
+    return exports.csv_response(
+        request, 'books.csv',
+        ['ID','Title','Author','ISBN','Category','Quantity','Available','Price','PublicationDate'],
+        rows.iterator(chunk_size=exports.CHUNK_SIZE),
+    )
 
 
 @login_required
@@ -951,13 +941,15 @@ def export_issues_csv(request):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename=issues.csv'
-    writer = csv.writer(response)
-    writer.writerow(['ID','User','Book','IssueDate','ReturnDate','ReturnedAt','Fine','PaymentStatus','Status'])
-    for i in BookIssue.objects.select_related('book','user').all():
-        writer.writerow([i.id, i.user.username, i.book.title, i.issue_date, i.return_date, i.actual_return_date, i.fine_amount, i.payment_status, i.status])
-    return response
+    rows = BookIssue.objects.order_by('id').values_list(
+        'id', 'user__username', 'book__title', 'issue_date', 'return_date', 'actual_return_date',
+        'fine_amount', 'payment_status', 'status'
+    )
+    return exports.csv_response(
+        request, 'issues.csv',
+        ['ID','User','Book','IssueDate','ReturnDate','ReturnedAt','Fine','PaymentStatus','Status'],
+        rows.iterator(chunk_size=exports.CHUNK_SIZE),
+    )
 
 
 # Admin user actions
@@ -981,261 +973,106 @@ def mark_all_read_view(request):
     """Mark all notifications as read for the current user."""
     if request.method == 'POST':
         Notification.mark_all_read(request.user)
+        broadcasts.mark_all_read(request.user)
         return JsonResponse({'status': 'success', 'message': 'All notifications marked as read'})
     return JsonResponse({'status': 'error', 'message': 'Invalid request method'}, status=400)
 
 
+@login_required
+def notification_read_view(request, notification_id: int):
+    """Mark one notification as read and follow its link."""
+    notification = get_object_or_404(Notification, id=notification_id, user=request.user)
+    notification.mark_read()
+    return redirect(notification.link or 'notifications_list')
+
+
+@login_required
+def broadcast_read_view(request, broadcast_id: int):
+    """Mark a broadcast as read for the current user and follow its link."""
+    broadcast = get_object_or_404(broadcasts.visible(request.user), id=broadcast_id)
+    broadcasts.mark_read(request.user, broadcast)
+    if broadcast.link and _is_local_link(request, broadcast.link):
+        return redirect(broadcast.link)
+    return redirect('notifications_list')
+
+
 @login_required
 def notifications_list_view(request):
     """Display all notifications for the current user."""
-    notifications = request.user.notifications.all().order_by('-created_at')
+    notifications = with_read_state(request.user.notifications.all(), request.user.pk).order_by('-created_at')
+    notifications = broadcasts.merge(request.user, notifications)
     return render(request, 'notifications.html', {
         'notifications': notifications
     })
 
 
-# PDF Export views
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER, TA_LEFT
-from io import BytesIO
+# PDF Export views (rendered in the background; see books/report_jobs.py)
+def _report_download(job):
+    return FileResponse(
+        open(report_jobs.artifact_path(job), 'rb'),
+        content_type='application/pdf',
+        as_attachment=True,
+        filename=report_jobs.download_name(job),
+    )
 
-@login_required
-def export_books_pdf(request):
-    """Export all books as PDF report."""
+
+def _export_pdf(request, kind):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    
-    # Create buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#14b8a6'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("Library Management System", title_style))
-    elements.append(Paragraph("Books Report", styles['Heading2']))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Table data
-    books = Book.objects.select_related('category').all()
-    data = [['ID', 'Title', 'Author', 'ISBN', 'Category', 'Qty', 'Available', 'Price']]
-    
-    for book in books:
-        data.append([
-            str(book.id),
-            book.title[:30],  # Truncate long titles
-            book.author[:20],
-            book.isbn,
-            book.category.name if book.category else 'N/A',
-            str(book.quantity),
-            str(book.available),
-            f'${book.price}'
-        ])
-    
-    # Create table
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#14b8a6')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 0.3*inch))
-    elements.append(Paragraph(f"Total Books: {books.count()}", styles['Normal']))
-    elements.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return response
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=books_report_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    job = report_jobs.request_report(kind, request.user)
+    if job.status == 'done':
+        return _report_download(job)
+    return redirect('report_job', job_id=job.id)
+
+
+@login_required
+def export_books_pdf(request):
+    """Export all books as PDF report."""
+    return _export_pdf(request, 'books')
 
 
 @login_required
 def export_issues_pdf(request):
     """Export all book issues as PDF report."""
+    return _export_pdf(request, 'issues')
+
+
+@login_required
+def export_fines_pdf(request):
+    """Export fines report as PDF."""
+    return _export_pdf(request, 'fines')
+
+
+@login_required
+def report_job_view(request, job_id):
+    """Progress page for a queued report; polls report_job_status_view."""
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    
-    # Create buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, leftMargin=0.5*inch, rightMargin=0.5*inch)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#14b8a6'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("Library Management System", title_style))
-    elements.append(Paragraph("Book Issues Report", styles['Heading2']))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Table data
-    issues = BookIssue.objects.select_related('book', 'user').all()
-    data = [['ID', 'User', 'Book', 'Issue Date', 'Return Date', 'Status', 'Fine']]
-    
-    for issue in issues:
-        data.append([
-            str(issue.id),
-            issue.user.username[:15],
-            issue.book.title[:25],
-            issue.issue_date.strftime('%Y-%m-%d'),
-            issue.return_date.strftime('%Y-%m-%d'),
-            issue.status,
-            f'${issue.fine_amount}'
-        ])
-    
-    # Create table
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#14b8a6')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 9),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 7),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Statistics
-    total_fines = BookIssue.objects.aggregate(Sum('fine_amount'))['fine_amount__sum'] or 0
-    unpaid_fines = BookIssue.objects.filter(payment_status='unpaid').aggregate(Sum('fine_amount'))['fine_amount__sum'] or 0
-    
-    stats_text = f"""
-    Total Issues: {issues.count()}<br/>
-    Total Fines: ${total_fines:.2f}<br/>
-    Unpaid Fines: ${unpaid_fines:.2f}<br/>
-    Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-    """
-    elements.append(Paragraph(stats_text, styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return response
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=issues_report_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    job = get_object_or_404(ReportJob, id=job_id)
+    return render(request, 'admin/report_job.html', {'job': job})
 
 
 @login_required
-def export_fines_pdf(request):
-    """Export fines report as PDF."""
+def report_job_status_view(request, job_id):
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Permission denied'}, status=403)
+    job = get_object_or_404(ReportJob, id=job_id)
+    return JsonResponse({
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'download_url': reverse('report_job_download', args=[job.id]) if job.status == 'done' else None,
+    })
+
+
+@login_required
+def report_job_download_view(request, job_id):
     if not request.user.is_staff:
         messages.error(request, 'Permission denied.')
         return redirect('dashboard')
-    
-    # Create buffer
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    elements = []
-    styles = getSampleStyleSheet()
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        textColor=colors.HexColor('#14b8a6'),
-        spaceAfter=30,
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("Library Management System", title_style))
-    elements.append(Paragraph("Fines Report", styles['Heading2']))
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Table data - only issues with fines
-    issues = BookIssue.objects.filter(fine_amount__gt=0).select_related('book', 'user')
-    data = [['ID', 'User', 'Book', 'Fine Amount', 'Payment Status', 'Return Date']]
-    
-    for issue in issues:
-        data.append([
-            str(issue.id),
-            issue.user.username[:20],
-            issue.book.title[:30],
-            f'${issue.fine_amount}',
-            issue.payment_status,
-            issue.return_date.strftime('%Y-%m-%d')
-        ])
-    
-    # Create table
-    table = Table(data, repeatRows=1)
-    table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#ef4444')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, 0), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 1), (-1, -1), 8),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.lightgrey]),
-    ]))
-    
-    elements.append(table)
-    elements.append(Spacer(1, 0.3*inch))
-    
-    # Statistics
-    total_fines = issues.aggregate(Sum('fine_amount'))['fine_amount__sum'] or 0
-    paid_fines = issues.filter(payment_status='paid').aggregate(Sum('fine_amount'))['fine_amount__sum'] or 0
-    unpaid_fines = issues.filter(payment_status='unpaid').aggregate(Sum('fine_amount'))['fine_amount__sum'] or 0
-    
-    stats_text = f"""
-    Total Fines: ${total_fines:.2f}<br/>
-    Paid Fines: ${paid_fines:.2f}<br/>
-    Unpaid Fines: ${unpaid_fines:.2f}<br/>
-    Total Users with Fines: {issues.values('user').distinct().count()}<br/>
-    Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M')}
-    """
-    elements.append(Paragraph(stats_text, styles['Normal']))
-    
-    # Build PDF
-    doc.build(elements)
-    
-    # Return response
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename=fines_report_{datetime.now().strftime("%Y%m%d")}.pdf'
-    return response
+    job = get_object_or_404(ReportJob, id=job_id, status='done')
+    if not os.path.exists(report_jobs.artifact_path(job)):
+        raise Http404('Report file is no longer available')
+    return _report_download(job)
@@ -118,10 +118,33 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
     'PAGE_SIZE': 10
 }
 
+# Two-tier cache (books/cache_backend.py): a SQLite file shared by every worker on the
+# host (rate limits, counts) behind a per-process LRU for generation-stamped entries
+CACHES = {
+    'default': {
+        'BACKEND': 'books.cache_backend.TwoTierCache',
+        'LOCATION': config('CACHE_LOCATION', default=os.path.join(BASE_DIR, 'var', 'cache.sqlite3')),
+        'OPTIONS': {
+            'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=50000, cast=int),
+            'FRONT_MAX_ENTRIES': config('CACHE_FRONT_MAX_ENTRIES', default=2000, cast=int),
+            'FRONT_KEY_PREFIXES': ['modelcache:v:'],
+        },
+    }
+}
+
+# Query results cached under per-model generations (books/model_cache.py) are
+# never stale, so this only bounds how long unreachable entries linger
+MODEL_CACHE_TIMEOUT = config('MODEL_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Pagination: list totals are cached this many seconds; unfiltered PostgreSQL
+# tables above the threshold report the planner's row estimate instead.
+PAGINATION_COUNT_TIMEOUT = config('PAGINATION_COUNT_TIMEOUT', default=60, cast=int)
+PAGINATION_ESTIMATE_THRESHOLD = config('PAGINATION_ESTIMATE_THRESHOLD', default=100000, cast=int)
+
 # JWT Settings
 from datetime import timedelta
 SIMPLE_JWT = {
@@ -159,10 +182,17 @@ CORS_ALLOW_METHODS = [
 ]
 
 # Email settings
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# All mail goes through a pool of persistent SMTP connections (books/mail.py)
+EMAIL_BACKEND = 'books.mail.PooledEmailBackend'
+EMAIL_POOL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+EMAIL_POOL_SIZE = config('EMAIL_POOL_SIZE', default=4, cast=int)
+EMAIL_POOL_IDLE_TIMEOUT = config('EMAIL_POOL_IDLE_TIMEOUT', default=60, cast=int)
+EMAIL_MAX_RETRIES = config('EMAIL_MAX_RETRIES', default=3, cast=int)
+EMAIL_RETRY_BACKOFF = config('EMAIL_RETRY_BACKOFF', default=0.5, cast=float)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=int)
 EMAIL_HOST = config('EMAIL_HOST', default='smtp.gmail.com')
 EMAIL_PORT = config('EMAIL_PORT', default=587, cast=int)
-EMAIL_USE_TLS = True
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=True, cast=bool)
 EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
 EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
 
@@ -190,6 +220,39 @@ if not DEBUG:
     X_FRAME_OPTIONS = 'DENY'
     SECURE_REFERRER_POLICY = 'same-origin'
 
+# Catalog typeahead: rebuild each worker's in-memory prefix index after this many seconds
+AUTOCOMPLETE_MAX_AGE = config('AUTOCOMPLETE_MAX_AGE', default=900, cast=int)
+
+# CSV exports are gzip-compressed on the fly for clients that accept it
+EXPORT_GZIP = config('EXPORT_GZIP', default=True, cast=bool)
+
+# Finished PDF reports (books/report_jobs.py); kept outside MEDIA_ROOT so they are never public
+REPORT_ARTIFACT_DIR = config('REPORT_ARTIFACT_DIR', default=os.path.join(BASE_DIR, 'var', 'reports'))
+
+# Seconds a user's unread-notification count stays cached (books/notification_counts.py)
+NOTIFICATION_COUNT_TIMEOUT = config('NOTIFICATION_COUNT_TIMEOUT', default=3600, cast=int)
+
+# How "mark all as read" is stored: 'rows' flags every unread notification,
+# 'watermark' only moves the user's last_read_at (a single row write)
+NOTIFICATION_READ_TRACKING = config('NOTIFICATION_READ_TRACKING', default='rows')
+
+# Days notifications are kept per type before prune_notifications deletes them
+# (None keeps them forever; unlisted types use books/retention.py defaults)
+NOTIFICATION_RETENTION_DAYS = {
+    'due_soon': 14,
+    'overdue': 30,
+    'system': 90,
+}
+NOTIFICATION_LEDGER_RETENTION_DAYS = config('NOTIFICATION_LEDGER_RETENTION_DAYS', default=30, cast=int)
+
+# Avatar uploads: size limit, and whether the original is kept once build_avatar_variants
+# has written the resized, EXIF-free variants (users/avatars.py)
+AVATAR_MAX_UPLOAD_MB = config('AVATAR_MAX_UPLOAD_MB', default=5, cast=int)
+AVATAR_KEEP_ORIGINAL = config('AVATAR_KEEP_ORIGINAL', default=False, cast=bool)
+
+# Days a copy set aside for a hold waits for pickup before it passes to the next in line
+HOLD_PICKUP_DAYS = config('HOLD_PICKUP_DAYS', default=3, cast=int)
+
 # Rate Limiting Settings
 RATELIMIT_ENABLE = config('RATELIMIT_ENABLE', default=True, cast=bool)
 RATELIMIT_USE_CACHE = 'default'
@@ -4,8 +4,8 @@ from rest_framework.routers import DefaultRouter
 from api import views, auth_views
 from books.views import (
     login_view, register_view, logout_view, dashboard_view,
-    book_list_view, book_detail_view, my_books_view, admin_panel_view,
-    issue_book_view, renew_book_view, return_book_view,
+    book_list_view, book_detail_view, book_autocomplete_view, my_books_view, admin_panel_view,
+    issue_book_view, place_hold_view, cancel_hold_view, renew_book_view, return_book_view,
     pay_fine_view, approve_issue_view, reject_issue_view,
     add_book_view, add_category_view,
     admin_dashboard_view, admin_books_view, admin_users_view,
@@ -13,8 +13,10 @@ from books.views import (
     export_books_csv, export_issues_csv, toggle_user_status_view,
     edit_book_view, delete_book_view, edit_category_view, delete_category_view,
     edit_user_view,
-    mark_all_read_view, notifications_list_view,
-    export_books_pdf, export_issues_pdf, export_fines_pdf
+    mark_all_read_view, notification_read_view, notifications_list_view,
+    broadcast_read_view, admin_broadcasts_view, delete_broadcast_view,
+    export_books_pdf, export_issues_pdf, export_fines_pdf,
+    report_job_view, report_job_status_view, report_job_download_view
 )
 from users.views import profile_view
 from users.password_reset import forgot_password_view, reset_password_view
@@ -37,10 +39,13 @@ urlpatterns = [
     path('forgot-password/', forgot_password_view, name='forgot_password'),
     path('reset-password/<uidb64>/<token>/', reset_password_view, name='reset_password'),
     path('notifications/mark-all-read/', mark_all_read_view, name='mark_all_read'),
+    path('notifications/<int:notification_id>/read/', notification_read_view, name='notification_read'),
+    path('notifications/broadcasts/<int:broadcast_id>/read/', broadcast_read_view, name='broadcast_read'),
     path('notifications/', notifications_list_view, name='notifications_list'),
     path('dashboard/', dashboard_view, name='dashboard'),
     path('books/', book_list_view, name='book_list'),
     path('books/<int:book_id>/', book_detail_view, name='book_detail'),
+    path('books/autocomplete/', book_autocomplete_view, name='book_autocomplete'),
     path('search/', book_list_view, name='search'),
     path('my-books/', my_books_view, name='my_books'),
     path('profile/', profile_view, name='user_profile'),
@@ -53,6 +58,8 @@ urlpatterns = [
     path('admin/categories/', admin_categories_view, name='admin_categories'),
     path('admin/fines/', admin_fines_view, name='admin_fines'),
     path('admin/reports/', admin_reports_view, name='admin_reports'),
+    path('admin/broadcasts/', admin_broadcasts_view, name='admin_broadcasts'),
+    path('admin/broadcasts/<int:broadcast_id>/delete/', delete_broadcast_view, name='delete_broadcast'),
     path('admin/books/add/', add_book_view, name='add_book'),
     path('admin/books/<int:book_id>/edit/', edit_book_view, name='edit_book'),
     path('admin/books/<int:book_id>/delete/', delete_book_view, name='delete_book'),
@@ -66,6 +73,9 @@ urlpatterns = [
     path('admin/export/books.pdf', export_books_pdf, name='export_books_pdf'),
     path('admin/export/issues.pdf', export_issues_pdf, name='export_issues_pdf'),
     path('admin/export/fines.pdf', export_fines_pdf, name='export_fines_pdf'),
+    path('admin/export/jobs/<int:job_id>/', report_job_view, name='report_job'),
+    path('admin/export/jobs/<int:job_id>/status/', report_job_status_view, name='report_job_status'),
+    path('admin/export/jobs/<int:job_id>/download/', report_job_download_view, name='report_job_download'),
     
     # Django Built-in Admin (MUST be after custom admin URLs)
     path('admin/', admin.site.urls),
@@ -74,6 +84,8 @@ urlpatterns = [
     path('books/<int:book_id>/request-issue/', issue_book_view, name='issue_book'),
     path('books/renew/<int:issue_id>/', renew_book_view, name='renew_book'),
     path('books/return/<int:issue_id>/', return_book_view, name='return_book'),
+    path('books/<int:book_id>/hold/', place_hold_view, name='place_hold'),
+    path('holds/<int:hold_id>/cancel/', cancel_hold_view, name='cancel_hold'),
     # Legacy alias used by existing JS
     path('books/<int:book_id>/issue/', issue_book_view, name='issue_book_legacy'),
     path('pay-fine/', pay_fine_view, name='pay_fine'),
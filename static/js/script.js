@@ -172,14 +172,21 @@
         if (globalSearch) {
             let searchTimeout;
             
+            // Suggestions are shown through a <datalist> bound to the input
+            const suggestions = document.createElement('datalist');
+            suggestions.id = 'globalSearchSuggestions';
+            globalSearch.after(suggestions);
+            globalSearch.setAttribute('list', suggestions.id);
+            globalSearch.setAttribute('autocomplete', 'off');
+            
             globalSearch.addEventListener('input', function(e) {
                 clearTimeout(searchTimeout);
                 const query = e.target.value.trim();
                 
                 if (query.length >= 2) {
                     searchTimeout = setTimeout(() => {
-                        performSearch(query);
-                    }, 500);
+                        performSearch(query, suggestions);
+                    }, 150);
                 }
             });
             
@@ -195,10 +202,22 @@
         }
     }
 
-    function performSearch(query) {
-        // AJAX search implementation
-        console.log('Searching for:', query);
-        // You can implement live search results here
+    function performSearch(query, suggestions) {
+        // Typeahead suggestions from the in-memory prefix index
+        fetch(`/books/autocomplete/?q=${encodeURIComponent(query)}`, {
+            headers: { 'X-Requested-With': 'XMLHttpRequest' }
+        })
+            .then(response => response.ok ? response.json() : { results: [] })
+            .then(data => {
+                suggestions.innerHTML = '';
+                data.results.forEach(book => {
+                    const option = document.createElement('option');
+                    option.value = book.title;
+                    option.label = `${book.author} · ${book.isbn}`;
+                    suggestions.appendChild(option);
+                });
+            })
+            .catch(() => {});
     }
 
     // ============================================
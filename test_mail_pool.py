@@ -0,0 +1,168 @@
+"""
+Pooled SMTP Delivery Check
+Sends mail through books/mail.py to a local aiosmtpd server and checks the
+connection reuse, retries and permanent failures.
+
+Needs aiosmtpd (pip install aiosmtpd); no real mail server is contacted.
+"""
+import os
+import smtplib
+import socket
+import sys
+import threading
+
+import django
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'library_management.settings')
+django.setup()
+
+from aiosmtpd.controller import Controller
+from django.core.mail import EmailMessage
+from django.test import override_settings
+
+from books import mail
+
+
+class Recorder:
+    """aiosmtpd handler that records deliveries and can answer with scripted replies."""
+
+    def __init__(self, replies=()):
+        self.replies = list(replies)  # Consumed one per DATA; '250' sends normally
+        self.delivered = []
+        self.peers = set()
+        self.lock = threading.Lock()
+
+    async def handle_DATA(self, server, session, envelope):
+        with self.lock:
+            self.peers.add(session.peer)
+            reply = self.replies.pop(0) if self.replies else '250 OK'
+            if reply.startswith('250'):
+                self.delivered.append(envelope.rcpt_tos)
+        return reply
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def message(to='reader@example.com'):
+    return EmailMessage('Due soon', 'Your book is due tomorrow.', 'library@example.com', [to])
+
+
+def smtp_settings(port, **extra):
+    return override_settings(**{
+        'EMAIL_HOST': '127.0.0.1', 'EMAIL_PORT': port, 'EMAIL_USE_TLS': False, 'EMAIL_USE_SSL': False,
+        'EMAIL_HOST_USER': '', 'EMAIL_HOST_PASSWORD': '', 'EMAIL_TIMEOUT': 5,
+        'EMAIL_MAX_RETRIES': 3, 'EMAIL_RETRY_BACKOFF': 0.05, **extra,
+    })
+
+
+def serve(handler, port):
+    controller = Controller(handler, hostname='127.0.0.1', port=port)
+    controller.start()
+    return controller
+
+
+def check_pool_reuses_connections():
+    handler, port = Recorder(), free_port()
+    controller = serve(handler, port)
+    try:
+        with smtp_settings(port):
+            pool = mail.ConnectionPool(size=2)
+            for n in range(5):
+                assert mail.send_with_retry(message(f'reader{n}@example.com'), pool) == 1
+            pool.close_all()
+    finally:
+        controller.stop()
+    assert len(handler.delivered) == 5, handler.delivered
+    assert len(handler.peers) == 1, handler.peers  # Sequential sends share one connection
+    print('✓ 5 messages over 1 pooled connection')
+
+
+def check_transient_reply_is_retried():
+    handler, port = Recorder(['421 Service not available, closing channel']), free_port()
+    controller = serve(handler, port)
+    try:
+        with smtp_settings(port):
+            pool = mail.ConnectionPool(size=1)
+            assert mail.send_with_retry(message(), pool) == 1
+            pool.close_all()
+    finally:
+        controller.stop()
+    assert len(handler.delivered) == 1, handler.delivered
+    assert len(handler.peers) == 2, handler.peers  # The failed connection was discarded
+    print('✓ 421 reply retried on a fresh connection, delivered once')
+
+
+def check_refused_connection_is_retried():
+    handler, port = Recorder(), free_port()
+    started = []
+    # Nothing listens on the port for the first attempt; the server comes up during the backoff
+    timer = threading.Timer(0.05, lambda: started.append(serve(handler, port)))
+    timer.start()
+    try:
+        with smtp_settings(port, EMAIL_RETRY_BACKOFF=0.5):
+            pool = mail.ConnectionPool(size=1)
+            assert mail.send_with_retry(message(), pool) == 1
+            pool.close_all()
+    finally:
+        timer.join()
+        for controller in started:
+            controller.stop()
+    assert len(handler.delivered) == 1, handler.delivered
+    print('✓ Refused connection retried once the server was up')
+
+
+def check_permanent_failure_is_not_retried():
+    handler, port = Recorder(['550 Mailbox unavailable', '250 OK']), free_port()
+    controller = serve(handler, port)
+    try:
+        with smtp_settings(port):
+            pool = mail.ConnectionPool(size=1)
+            try:
+                mail.send_with_retry(message(), pool)
+            except smtplib.SMTPDataError as exc:
+                assert exc.smtp_code == 550, exc
+            else:
+                raise AssertionError('550 reply did not raise')
+            pool.close_all()
+    finally:
+        controller.stop()
+    assert handler.delivered == [] and handler.replies == ['250 OK'], handler.replies
+    print('✓ 550 reply raised without a retry')
+
+
+def check_backend_sends_batches():
+    handler, port = Recorder(), free_port()
+    controller = serve(handler, port)
+    try:
+        with smtp_settings(port, EMAIL_POOL_SIZE=2):
+            mail._pool = mail._executor = None  # Pick up this server and pool size
+            backend = mail.PooledEmailBackend()
+            sent = backend.send_messages([message(f'reader{n}@example.com') for n in range(10)])
+            mail.get_pool().close_all()
+            mail._pool = mail._executor = None
+    finally:
+        controller.stop()
+    assert sent == 10 and len(handler.delivered) == 10, (sent, handler.delivered)
+    assert len(handler.peers) <= 2, handler.peers
+    print(f'✓ Batch of 10 sent over {len(handler.peers)} connection(s)')
+
+
+def main():
+    print('\n' + '=' * 60)
+    print('POOLED SMTP DELIVERY')
+    print('=' * 60)
+    check_pool_reuses_connections()
+    check_transient_reply_is_retried()
+    check_refused_connection_is_retried()
+    check_permanent_failure_is_not_retried()
+    check_backend_sends_batches()
+    print('\n✓ All mail pool checks passed')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Avatar normalization.
+
+The profile page only stores the upload and marks it ``pending``. The
+``build_avatar_variants`` worker decodes it, applies its EXIF orientation,
+centre-crops it square and writes small and large WebP/JPEG variants without
+any metadata (books/images.py). Unless ``AVATAR_KEEP_ORIGINAL`` is set, the
+original is then deleted and ``profile_picture`` points at the large JPEG, so
+each user costs a few kilobytes of storage.
+"""
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from books import images
+
+User = get_user_model()
+
+# Square sizes in pixels: the header badge and the profile page, both at 2x
+SIZES = {
+    'small': (64, 64),
+    'large': (320, 320),
+}
+
+VARIANT_DIR = 'profile_pictures/variants'
+
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg'}
+
+
+def keep_original():
+    return getattr(settings, 'AVATAR_KEEP_ORIGINAL', False)
+
+
+def pending():
+    """Users with an uploaded avatar that has not been normalized yet."""
+    return User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True).filter(avatar_state='pending')
+
+
+def with_avatars():
+    return User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True)
+
+
+def build(source):
+    """Render and store the variants of avatar ``source``; returns the ``avatar_variants`` value."""
+    with default_storage.open(source, 'rb') as fileobj:
+        rendered = images.render_variants(fileobj, SIZES, crop=True)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    variants = {'source': source, 'sizes': {}}
+    for size, result in rendered.items():
+        variants['sizes'][size] = {
+            fmt: default_storage.save(f'{VARIANT_DIR}/{stem}-{size}.{extension}', ContentFile(result[fmt]))
+            for fmt, extension in EXTENSIONS.items()
+        }
+    return variants
+
+
+def files(variants):
+    return [name for entry in (variants or {}).get('sizes', {}).values() for name in entry.values()]
+
+
+def delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            pass
+
+
+def normalize(user_id, source, previous=None):
+    """
+    Build ``user_id``'s variants from ``source`` and store them unless the
+    avatar changed meanwhile; returns ``True`` if stored. Decoding errors
+    mark the avatar ``failed`` and are re-raised.
+    """
+    current = User.objects.filter(pk=user_id, profile_picture=source)
+    try:
+        variants = build(source)
+    except Exception:
+        current.update(avatar_state='failed')
+        raise
+    picture = source
+    if not keep_original():
+        picture = variants['source'] = variants['sizes']['large']['jpeg']
+    if not current.update(profile_picture=picture, avatar_variants=variants, avatar_state='ready'):
+        delete_files(files(variants))  # Superseded by a newer upload, which is pending again
+        return False
+    stale = set(files(previous)) - set(files(variants))
+    if picture != source:
+        stale.add(source)
+    delete_files(stale - {picture})
+    return True
+
+
+def process(users, batch_size=100, progress=None):
+    """
+    Normalize the avatars of queryset ``users`` in id order.
+    ``progress(user_id, source, error)`` is called per user. Returns
+    ``(built, failed)``.
+    """
+    built = failed = 0
+    after_id = 0
+    while True:
+        batch = list(
+            users.filter(pk__gt=after_id).order_by('pk')
+            .values_list('pk', 'profile_picture', 'avatar_variants')[:batch_size]
+        )
+        if not batch:
+            return built, failed
+        after_id = batch[-1][0]
+        for user_id, source, previous in batch:
+            error = None
+            try:
+                built += normalize(user_id, source, previous)
+            except Exception as exc:
+                failed += 1
+                error = f'{type(exc).__name__}: {exc}'
+            if progress:
+                progress(user_id, source, error)
+
+
+def sources(user):
+    """Variant URLs by size and format for ``user``, or ``None`` if not built from the current avatar."""
+    variants = user.avatar_variants or {}
+    if not user.profile_picture or variants.get('source') != user.profile_picture.name or not variants.get('sizes'):
+        return None
+    return {
+        size: {fmt: default_storage.url(name) for fmt, name in entry.items()}
+        for size, entry in variants['sizes'].items()
+    }
@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+from users import avatars
+
+
+class Command(BaseCommand):
+    help = ('Normalize uploaded avatars: strip EXIF, crop square and write small/large WebP/JPEG variants '
+            '(runs as a polling worker with --watch)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='Users read per query (default: 100)')
+        parser.add_argument('--all', action='store_true', help='Rebuild every avatar, e.g. after changing the sizes')
+        parser.add_argument('--watch', action='store_true', help='Keep polling for new uploads')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --watch (default: 5)')
+
+    def handle(self, *args, **options):
+        def progress(user_id, source, error):
+            if error:
+                self.stdout.write(self.style.ERROR(f'✗ User #{user_id} ({source}): {error}'))
+            elif options['verbosity'] > 1:
+                self.stdout.write(f'✓ User #{user_id} ({source})')
+
+        total_built = total_failed = 0
+        try:
+            while True:
+                users = avatars.with_avatars() if options['all'] else avatars.pending()
+                if users.exists():
+                    started = time.monotonic()
+                    built, failed = avatars.process(users, batch_size=max(1, options['batch_size']), progress=progress)
+                    total_built += built
+                    total_failed += failed
+                    self.stdout.write(self.style.SUCCESS(
+                        f'✓ Normalized {built} avatar(s), {failed} failed in {time.monotonic() - started:.1f}s'
+                    ))
+                options['all'] = False  # A full rebuild happens once; later polls only pick up new uploads
+                if not options['watch']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('\nStopping avatar worker...')
+        self.stdout.write(self.style.SUCCESS(f'📊 Normalized: {total_built}, failed: {total_failed}'))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='reminder_emails',
+            field=models.CharField(choices=[('digest', 'One daily digest'), ('each', 'One email per book')], default='each', max_length=10),
+        ),
+    ]
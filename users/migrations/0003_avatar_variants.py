@@ -0,0 +1,30 @@
+# Generated by Django 5.2.8 on 2026-10-18 05:32
+
+from django.db import migrations, models
+
+
+def queue_existing_avatars(apps, schema_editor):
+    """Existing avatars are normalized by the first build_avatar_variants run."""
+    User = apps.get_model('users', 'CustomUser')
+    User.objects.exclude(profile_picture='').exclude(profile_picture__isnull=True).update(avatar_state='pending')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_reminder_emails'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_state',
+            field=models.CharField(blank=True, choices=[('', 'No variants'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], db_index=True, default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='avatar_variants',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(queue_existing_avatars, migrations.RunPython.noop),
+    ]
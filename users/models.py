@@ -17,6 +17,41 @@ class CustomUser(AbstractUser):
 		default='student'
 	)
 	profile_picture = models.ImageField(upload_to='profile_pictures/', null=True, blank=True)
+	# Small square WebP/JPEG copies built off the request path (users/avatars.py)
+	avatar_variants = models.JSONField(default=dict, blank=True)
+	avatar_state = models.CharField(
+		max_length=10,
+		choices=[
+			('', 'No variants'),
+			('pending', 'Pending'),
+			('ready', 'Ready'),
+			('failed', 'Failed')
+		],
+		default='',
+		blank=True,
+		db_index=True
+	)
+	reminder_emails = models.CharField(
+		max_length=10,
+		choices=[
+			('digest', 'One daily digest'),
+			('each', 'One email per book')
+		],
+		# Digests are opt-in: they are sent by the outbox worker (drain_outbox)
+		default='each'
+	)
 
 	def __str__(self):
 		return self.username
+
+	def set_avatar(self, upload):
+		"""Replace the avatar; ``build_avatar_variants`` resizes it in the background."""
+		self.profile_picture = upload
+		self.avatar_state = 'pending' if upload else ''
+
+	@property
+	def avatar_sources(self):
+		"""``{'small': {'webp': url, 'jpeg': url}, 'large': {...}}``, or ``None`` until the variants are built."""
+		from .avatars import sources
+
+		return sources(self)
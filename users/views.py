@@ -4,6 +4,7 @@ from api.serializers import UserSerializer
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.conf import settings
 
 User = get_user_model()
 
@@ -20,9 +21,24 @@ def profile_view(request):
         user.last_name = request.POST.get('last_name', user.last_name)
         user.phone_number = request.POST.get('phone_number', user.phone_number)
         user.address = request.POST.get('address', user.address)
+        reminder_emails = request.POST.get('reminder_emails')
+        if reminder_emails in dict(User._meta.get_field('reminder_emails').choices):
+            user.reminder_emails = reminder_emails
+        fields = ['first_name', 'last_name', 'phone_number', 'address', 'reminder_emails']
         if 'avatar' in request.FILES:
-            user.profile_picture = request.FILES['avatar']
-        user.save()
+            avatar = request.FILES['avatar']
+            max_mb = getattr(settings, 'AVATAR_MAX_UPLOAD_MB', 5)
+            if avatar.size > max_mb * 1024 * 1024:
+                messages.error(request, f'Avatar images can be at most {max_mb} MB.')
+                return redirect('user_profile')
+            # Resized and stripped of EXIF by build_avatar_variants
+            user.set_avatar(avatar)
+            fields += ['profile_picture', 'avatar_state']
+        # Only the edited columns, so a concurrent avatar build is not overwritten
+        user.save(update_fields=fields)
         messages.success(request, 'Profile updated successfully.')
         return redirect('user_profile')
-    return render(request, 'profile.html', {'user_obj': user})
+    return render(request, 'profile.html', {
+        'user_obj': user,
+        'reminder_email_choices': User._meta.get_field('reminder_emails').choices,
+    })